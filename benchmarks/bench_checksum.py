@@ -0,0 +1,52 @@
+# bench_checksum.py - Compares the checksum verification in checksum.py against the
+# original string-based implementation on responses of increasing size.
+
+from timeit import Timer
+
+from veeder_root_tls_socket_library.checksum import compute_checksum, verify_checksum
+
+def legacy_verify_checksum(byte_response: bytes) -> bool:
+    """
+    The original implementation of _data_integrity_check(), kept for comparison.
+    """
+
+    response = byte_response.decode()
+    message  = response[:-5]
+    checksum = response[-5:-1]
+    integrity_threshold = "0b10000000000000000"
+
+    message_sum = sum(ord(char) for char in message) & 0xFFFF
+    checksum_int = int(checksum, 16)
+
+    return bin(message_sum + checksum_int) == integrity_threshold
+
+def make_response(size: int) -> bytes:
+    """
+    Builds a response with a valid checksum and roughly size bytes of data.
+    """
+
+    message = b"\x01i21B00" + (b"42CBE1C143D81D45" * (size // 16 + 1))[:size] + b"&&"
+    return message + b"%04X" % compute_checksum(message) + b"\x03"
+
+def time_call(function, response: bytes) -> float:
+    """
+    Returns the best time in microseconds for a single call of function.
+    """
+
+    timer = Timer(lambda: function(response))
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e6
+
+if __name__ == "__main__":
+    print(f"{'bytes':>8}  {'legacy (us)':>12}  {'new (us)':>10}  {'speedup':>8}")
+
+    for size in (32, 512, 4096, 16384, 65536):
+        response = make_response(size)
+
+        assert legacy_verify_checksum(response) and verify_checksum(response)
+
+        legacy = time_call(legacy_verify_checksum, response)
+        new    = time_call(verify_checksum, response)
+
+        print(f"{size:>8}  {legacy:>12.2f}  {new:>10.2f}  {legacy / new:>7.1f}x")
@@ -0,0 +1,300 @@
+# run_benchmarks.py - Measures the performance of the sockets, framing, checksum, float decoding
+# and every tls_3xx parser, and writes the results as JSON so releases can be compared.
+#
+# Usage: python benchmarks/run_benchmarks.py [--quick] [--output results.json]
+#                                             [--compare baseline.json] [--threshold 0.25]
+
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import sys
+import threading
+from datetime import datetime, timezone
+from importlib import metadata
+from time import perf_counter
+from timeit import Timer
+
+from bench_checksum import make_response
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.checksum import verify_checksum
+from veeder_root_tls_socket_library.fleet import FleetPoller
+from veeder_root_tls_socket_library.format import _hex_to_float, _hex_to_floats
+from veeder_root_tls_socket_library.protocol import FrameReader
+from veeder_root_tls_socket_library.simulator import TlsSimulator, start_fleet
+from veeder_root_tls_socket_library.socket import TlsSocket
+
+def best_time(function, repeat: int) -> float:
+    """
+    Returns the best time in seconds for a single call of function.
+    """
+
+    timer = Timer(function)
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+def latency_summary(samples: list) -> dict:
+    """
+    Summarises latency samples given in seconds as microsecond percentiles.
+    """
+
+    samples = sorted(samples)
+
+    return {
+        "median_us": statistics.median(samples) * 1e6,
+        "p95_us":    samples[int(len(samples) * 0.95) - 1] * 1e6,
+        "p99_us":    samples[int(len(samples) * 0.99) - 1] * 1e6
+    }
+
+def count_records(data: dict) -> int:
+    """
+    Counts the records in a parsed report, whether they are stored as a list
+    of records, a list of groups, or a dict of record lists.
+    """
+
+    count = 0
+
+    for value in data.values():
+        if isinstance(value, dict): value = list(value.values())
+        if not isinstance(value, list): continue
+
+        for item in value:
+            if   isinstance(item, list): count += len(item)
+            elif isinstance(item, dict) and any(isinstance(inner, list) for inner in item.values()):
+                count += sum(len(inner) for inner in item.values() if isinstance(inner, list))
+            else: count += 1
+
+    return count
+
+def bench_checksum(repeat: int) -> list:
+    results = []
+
+    for size in (32, 512, 4096, 65536, 1048576):
+        response = make_response(size)
+        seconds = best_time(lambda: verify_checksum(response), repeat)
+
+        results.append({
+            "name":  f"checksum.verify_checksum[{size}]",
+            "unit":  "MB/s",
+            "value": len(response) / seconds / 1e6
+        })
+
+    return results
+
+def bench_framing(repeat: int) -> list:
+    # Frames are fed in chunks the size of a typical read, the same as a
+    # socket would, but without any network in the way.
+    results = []
+
+    for size, chunk_size in ((32, 1200), (4096, 1200), (65536, 65536), (1048576, 65536)):
+        frame = make_response(size)
+        stream = frame * max(1, 65536 // len(frame))
+        chunks = [stream[position:position + chunk_size] for position in range(0, len(stream), chunk_size)]
+        reader = FrameReader()
+
+        def run():
+            for chunk in chunks:
+                reader.feed(chunk)
+
+                while reader.next_response() is not None: pass
+
+        seconds = best_time(run, repeat)
+
+        results.append({
+            "name":  f"protocol.FrameReader[{size}]",
+            "unit":  "MB/s",
+            "value": len(stream) / seconds / 1e6
+        })
+
+    return results
+
+def bench_floats(repeat: int) -> list:
+    single = "42CBE1C1"
+    batch = single * 64
+
+    return [
+        {
+            "name":  "format._hex_to_float",
+            "unit":  "calls/s",
+            "value": 1 / best_time(lambda: _hex_to_float(single), repeat)
+        },
+        {
+            "name":  "format._hex_to_floats[64]",
+            "unit":  "floats/s",
+            "value": 64 / best_time(lambda: _hex_to_floats(batch), repeat)
+        }
+    ]
+
+def bench_parsers(repeat: int, tanks: int, deliveries: int) -> list:
+    # Large synthetic responses come from the simulator, so every parser is
+    # measured on data with the same layout a TLS system would send.
+    simulator = TlsSimulator(tanks=tanks, deliveries=deliveries, seed=0)
+    codes = sorted(name[9:] for name in dir(tls_3xx) if name.startswith("function_"))
+    results = []
+
+    for code in codes:
+        response = simulator.respond(f"i{code}00")[7:-7].decode()
+        parser = getattr(tls_3xx, f"function_{code}")
+        records = count_records(parser(response))
+        seconds = best_time(lambda: parser(response), repeat)
+
+        results.append({
+            "name":    f"tls_3xx.function_{code}",
+            "unit":    "records/s",
+            "value":   records / seconds,
+            "records": records,
+            "bytes":   len(response)
+        })
+
+    return results
+
+def bench_sync_socket(port: int, commands: int) -> dict:
+    tls = TlsSocket("127.0.0.1", port)
+    samples = []
+
+    try:
+        for _ in range(0, commands):
+            start = perf_counter()
+            tls.execute("i20100")
+            samples.append(perf_counter() - start)
+
+    finally:
+        tls.close()
+
+    return {"name": "socket.TlsSocket.execute", "unit": "us", **latency_summary(samples)}
+
+async def bench_async_socket(port: int, commands: int) -> dict:
+    samples = []
+
+    async with AsyncTlsSocket("127.0.0.1", port) as tls:
+        for _ in range(0, commands):
+            start = perf_counter()
+            await tls.execute("i20100")
+            samples.append(perf_counter() - start)
+
+    return {"name": "async_socket.AsyncTlsSocket.execute", "unit": "us", **latency_summary(samples)}
+
+async def bench_fleet(gauges: int) -> dict:
+    simulators = await start_fleet(gauges, seed=0)
+
+    try:
+        fleet = [("127.0.0.1", simulator.port, ["i20100", "i20200"]) for simulator in simulators]
+
+        start = perf_counter()
+        results = [result async for result in FleetPoller(fleet, concurrency=100)]
+        seconds = perf_counter() - start
+
+    finally:
+        for simulator in simulators: await simulator.close()
+
+    if not all(result["success"] for result in results):
+        raise RuntimeError("Fleet benchmark had failed polls.")
+
+    return {"name": f"fleet.FleetPoller[{gauges}]", "unit": "gauges/s", "value": gauges / seconds}
+
+def bench_sockets(commands: int, gauges: int) -> list:
+    # The simulator runs on its own event loop in a background thread so the
+    # synchronous socket has something to talk to.
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    simulator = asyncio.run_coroutine_threadsafe(TlsSimulator(seed=0).start(), loop).result()
+
+    try:
+        results = [
+            bench_sync_socket(simulator.port, commands),
+            asyncio.run(bench_async_socket(simulator.port, commands)),
+            asyncio.run(bench_fleet(gauges))
+        ]
+
+    finally:
+        asyncio.run_coroutine_threadsafe(simulator.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+
+    return results
+
+def compare(results: list, baseline_path: str, threshold: float) -> list:
+    """
+    Prints how much slower (+) or faster (-) each benchmark is than the
+    baseline, and returns the names of those that slowed down by more than
+    the threshold. Throughputs regress when they fall, latencies when they
+    rise.
+    """
+
+    with open(baseline_path) as file:
+        baseline = {result["name"]: result for result in json.load(file)["results"]}
+
+    regressions = []
+
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None: continue
+
+        if result["unit"] == "us":
+            change = result["median_us"] / previous["median_us"] - 1
+        else:
+            change = previous["value"] / result["value"] - 1
+
+        print(f"{result['name']:<45} {change:+8.1%}", file=sys.stderr)
+
+        if change > threshold: regressions.append(result["name"])
+
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the Veeder-Root TLS socket library.")
+    parser.add_argument("--quick", action="store_true", help="Smaller inputs and fewer repeats.")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of stdout.")
+    parser.add_argument("--compare", help="A previous JSON result file to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Fraction a benchmark may slow down before --compare fails.")
+    arguments = parser.parse_args()
+
+    repeat = 3 if arguments.quick else 7
+
+    results = [
+        *bench_checksum(repeat),
+        *bench_framing(repeat),
+        *bench_floats(repeat),
+        *bench_parsers(repeat, tanks=4 if arguments.quick else 12, deliveries=10 if arguments.quick else 100),
+        *bench_sockets(commands=200 if arguments.quick else 2000, gauges=50 if arguments.quick else 500)
+    ]
+
+    try:
+        version = metadata.version("veeder_root_tls_socket_library")
+    except metadata.PackageNotFoundError:
+        version = "unknown"
+
+    report = {
+        "meta": {
+            "version":   version,
+            "python":    platform.python_version(),
+            "platform":  platform.platform(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "quick":     arguments.quick
+        },
+        "results": results
+    }
+
+    if arguments.output:
+        with open(arguments.output, "w") as file: json.dump(report, file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if arguments.compare:
+        regressions = compare(results, arguments.compare, arguments.threshold)
+
+        if regressions:
+            print(f"Regressed beyond {arguments.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,34 @@
 # devices manufactured by Veeder-Root.
 
 import asyncio
+import codecs
+from time import perf_counter
+
+from veeder_root_tls_socket_library.checksum import _byte_sum, verify_checksum
+from veeder_root_tls_socket_library.observer import _command_event
+from veeder_root_tls_socket_library.parsing import parse
+from veeder_root_tls_socket_library.protocol import ERROR_RESPONSE, check_frame, encode_command
+
+# The longest response readuntil() will wait for. The StreamReader default of
+# 64 KiB is smaller than some history reports, e.g. function 21B.
+_STREAM_LIMIT = 2 ** 24
+
+class _CountingStreamReader(asyncio.StreamReader):
+    """
+    A StreamReader that counts the chunks received since the counters were
+    last reset and when the first of them arrived, for observers.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.chunks = 0
+        self.first_byte = None
+
+    def feed_data(self, data: bytes):
+        if not self.chunks: self.first_byte = perf_counter()
+        self.chunks += 1
+
+        super().feed_data(data)
 
 class AsyncTlsSocket:
     """
@@ -10,34 +38,100 @@ class AsyncTlsSocket:
 
     execute() - Used to send a command and view the output in accordance with 
     Veeder-Root Serial Interface Manual 576013-635.
+
+    execute_many() - Used to send several commands at once and view the output
+    of each of them.
+
+    execute_and_parse() - Used to send a command and parse the output with
+    the tls_3xx function for its function code.
+
+    stream() - Used to send a command and receive its output in chunks as it
+    arrives, for responses too large to wait on.
+
+    connect() - Opens the connection to the TLS system.
+
+    close() - Closes the connection to the TLS system.
     """
 
-    def __init__(self, host: str, port: int = 10001, timeout: float = 4.0):
+    def __init__(self, host: str, port: int = 10001, timeout: float = 4.0, observer = None):
+        """
+        host - The address of the TLS system.
+
+        port - The port the TLS system listens on.
+
+        timeout - The amount of seconds to wait on connecting or on a response.
+        The connection is closed if a response times out, as it could still
+        arrive later.
+
+        observer - An optional TlsObserver that is told how long connecting
+        and each command took, and how many bytes were received.
+        """
+
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.observer = observer
         self.reader = None
         self.writer = None
+        self._streaming = False
 
     # Allows usage of 'async with AsyncTLSSocket(...) as tls:'
     async def __aenter__(self):
+        return await self.connect()
+
+    # Ensures the connection is cleanly closed upon exiting the block.
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def connect(self):
+        """
+        Opens the connection to the TLS system. This is done for you when
+        using 'async with', but is available for long-lived connections.
+        """
+
+        started = perf_counter() if self.observer is not None else None
+
         try:
             # Enforce the strict timeout on the initial connection.
-            self.reader, self.writer = await asyncio.wait_for(
-                asyncio.open_connection(self.host, self.port),
-                timeout=self.timeout
-            )
+            self.reader, self.writer = await asyncio.wait_for(self._open_connection(), timeout=self.timeout)
 
-            return self
-        
         except asyncio.TimeoutError:
-            raise TimeoutError(f"[{self.host}] Connection timed out after {self.timeout} seconds.")
+            error = TimeoutError(f"[{self.host}] Connection timed out after {self.timeout} seconds.")
+            if self.observer is not None: self._observe_connect(started, error)
+            raise error
 
         except Exception as e:
-            raise ConnectionError(f"[{self.host}] Connection failed: {e}")
+            error = ConnectionError(f"[{self.host}] Connection failed: {e}")
+            if self.observer is not None: self._observe_connect(started, error)
+            raise error
+
+        if self.observer is not None: self._observe_connect(started, None)
+
+        self._streaming = False
+
+        return self
+
+    async def _open_connection(self) -> tuple:
+        """
+        Does the same as asyncio.open_connection(), but with a reader that
+        counts chunks when there is an observer to report them to.
+        """
+
+        if self.observer is None:
+            return await asyncio.open_connection(self.host, self.port, limit=_STREAM_LIMIT)
+
+        loop = asyncio.get_running_loop()
+        reader = _CountingStreamReader(limit=_STREAM_LIMIT, loop=loop)
+        protocol = asyncio.StreamReaderProtocol(reader, loop=loop)
+        transport, _ = await loop.create_connection(lambda: protocol, self.host, self.port)
+
+        return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+    async def close(self):
+        """
+        Closes the connection to the TLS system.
+        """
 
-    # Ensures the connection is cleanly closed upon exiting the block.
-    async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.writer:
             self.writer.close()
             await self.writer.wait_closed()
@@ -55,10 +149,44 @@ class AsyncTlsSocket:
         etx - This has a default value (ASCII code 001) and should only be 
         changed if your ATG is set to use a different end of transmission.
         """
-        
+
+        return await self._execute(command, etx, None)
+
+    async def execute_and_parse(self,
+                                command: str,
+                                etx: bytes = b"\x03",
+                                **kwargs):
+        """
+        Sends a command the same way as execute(), then parses the response
+        with the tls_3xx function for the function code echoed back by the
+        TLS system. The response is parsed straight from the bytes it was
+        received in, without decoding it to a string first.
+
+        command - The function code you would like to execute, e.g. "i20100".
+
+        etx - The same as for execute().
+
+        kwargs - Passed through to the parser, e.g. compact=True. Options that
+        the parser doesn't take are left out, and options that no parser
+        takes raise a TypeError.
+        """
+
+        return await self._execute(command, etx, kwargs)
+
+    async def _execute(self, command: str, etx: bytes, kwargs: dict):
+        """
+        Sends a command and returns its response, or the parsed response if
+        kwargs is not None.
+        """
+
         if not self.writer or not self.reader:
             raise ConnectionError("Socket is not connected. Use 'async with' context.")
 
+        if self._streaming: self._abandon()
+
+        if self.writer.is_closing():
+            raise ConnectionError(f"[{self.host}] Connection is closed.")
+
         # Validating function arguments prior to executing any commands.
         if not command:              raise ValueError("Argument 'command' cannot be empty.")
         if not type(command) == str: raise ValueError("Argument 'command' must be a string.")
@@ -66,15 +194,14 @@ class AsyncTlsSocket:
         if not etx:                  raise ValueError("Argument 'etx' cannot be empty.")
         if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
 
-        # Setting up foundational variables.
-        soh = b"\x01"
-        end = b"\r\n" # Fixes an error when executing command i72E.
-
         # For the purposes of this socket, it doesn't make sense to ever use
         # display commands. We set the command to lowercase even if the user
         # explicitly uses I to indicate a display command. Use the synchronous
         # socket if you want the display command outputs.
-        byte_command = soh + bytes(command.lower(), "utf-8") + end
+        byte_command = encode_command(command.lower())
+
+        if self.observer is not None:
+            return await self._execute_observed(command, byte_command, kwargs)
         
         try:
             # Write non-blocking.
@@ -86,59 +213,380 @@ class AsyncTlsSocket:
                 self.reader.readuntil(b'\x03'),
                 timeout=self.timeout
             )
-            
+
+            if kwargs is not None: return parse(byte_response, **kwargs)
+
             return await self._handle_response(byte_response)
             
         except asyncio.TimeoutError:
+            self._abandon()
             raise TimeoutError(f"[{self.host}] Read operation timed out.")
-    
-    async def _handle_response(self, byte_response: bytes) -> str:
+
+    async def _execute_observed(self, command: str, byte_command: bytes, kwargs: dict = None):
         """
-        Handles responses from the TLS system after executing a command.
+        Does the same as execute(), but also records the time to first byte
+        and the amount of reads for the observer. Anything received after the
+        response is left in the reader, the same as without an observer.
 
-        byte_response - Response from the TLS system.
+        command - The command as it was given to execute().
 
-        byte_command - The command that was executed to get the response.
+        byte_command - The framed command to send.
 
-        is_display - Used to determine if the command uses Display format.
+        kwargs - Options to parse the response with, or None to return it as
+        a string.
+        """
+
+        reader = self.reader
+        counting = isinstance(reader, _CountingStreamReader)
+        byte_response = None
+        first_byte = checked = error = None
+        chunks = length = 0
+        started = perf_counter()
+
+        if counting: reader.chunks, reader.first_byte = 0, None
+
+        try:
+            self.writer.write(byte_command)
+            await self.writer.drain()
+
+            byte_response = await asyncio.wait_for(reader.readuntil(b'\x03'), timeout=self.timeout)
+
+            checked = perf_counter()
+            length = len(byte_response)
+
+            # The response may have been received before it was asked for.
+            if counting: chunks, first_byte = reader.chunks, reader.first_byte
+            if first_byte is None: first_byte = checked
+
+            if kwargs is not None: return parse(byte_response, **kwargs)
+
+            return await self._handle_response(byte_response)
+
+        except asyncio.TimeoutError:
+            self._abandon()
+            error = TimeoutError(f"[{self.host}] Read operation timed out.")
+            raise error
+
+        except Exception as exception:
+            error = exception
+            raise
+
+        finally:
+            self.observer.on_command(_command_event(
+                self.host, self.port, command, len(byte_command), length,
+                started, first_byte, checked, chunks, error, byte_response
+            ))
+
+    def _observe_connect(self, started: float, error: Exception):
+        self.observer.on_connect({
+            "host":         self.host,
+            "port":         self.port,
+            "connect_time": perf_counter() - started,
+            "error":        error
+        })
+
+    def _abandon(self):
+        """
+        Closes the connection after a read timed out or a stream was left
+        before the end of its response. The rest of the response may still
+        arrive, and would otherwise be read as the response to the next
+        command.
+        """
+
+        self.writer.close()
+
+    def _is_open(self) -> bool:
+        """
+        A connection is unusable once the other end has closed it or the
+        transport is shutting down.
+        """
+
+        if self.writer is None or self.reader is None or self._streaming: return False
+
+        return not (self.writer.is_closing() or self.reader.at_eof())
+
+    def _has_unread(self) -> bool:
+        """
+        Whether data was received that no command has read yet, e.g. a late
+        response to a command that timed out.
+        """
+
+        # StreamReader has no public way to peek at its buffer.
+        return self.reader is not None and len(self.reader._buffer) > 0
+
+    def _unread(self, data: bytes):
+        """
+        Puts back data that was read past the end of a response, so that the
+        next command reads it the same as after readuntil().
+        """
+
+        # StreamReader has no public way to put data back either.
+        if data: self.reader._buffer[:0] = data
+
+    async def execute_many(self,
+                           commands: list,
+                           etx: bytes = b"\x03") -> list:
+        """
+        Sends several commands to a socket connection in a single write and
+        reads back their responses, rather than waiting for each response
+        before sending the next command.
+
+        Returns a list with an entry per command, in the same order as the
+        commands. Each entry is either the response or the exception raised
+        for that command, so one failing command does not abort the batch.
+        If a response times out, it and every command after it get a
+        TimeoutError and the connection is closed.
+
+        commands - The function codes you would like to execute.
+        Make sure these are in computer format.
+
+        etx - This has a default value (ASCII code 001) and should only be 
+        changed if your ATG is set to use a different end of transmission.
         """
 
+        if not self.writer or not self.reader:
+            raise ConnectionError("Socket is not connected. Use 'async with' context.")
+
+        if self._streaming: self._abandon()
+
+        if self.writer.is_closing():
+            raise ConnectionError(f"[{self.host}] Connection is closed.")
+
+        # Validating function arguments prior to executing any commands.
+        for command in commands:
+            if not command:              raise ValueError("Argument 'commands' cannot contain empty commands.")
+            if not type(command) == str: raise ValueError("Argument 'commands' must only contain strings.")
+
+        if not etx:                  raise ValueError("Argument 'etx' cannot be empty.")
+        if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
+
+        byte_commands = [encode_command(command.lower()) for command in commands]
+        results = [None] * len(byte_commands)
+
+        # Responses arrive back to back, so only their total times and sizes
+        # are recorded for the observer.
+        observer = self.observer
+        started = perf_counter() if observer is not None else None
+        received = [(None, None)] * len(byte_commands)
+
+        # Write the whole batch at once.
+        self.writer.write(b"".join(byte_commands))
+        await self.writer.drain()
+
+        # Match each response to its command by the command echoed back in the
+        # response header. The TLS system answers commands in the order they
+        # were sent, so commands skipped over by a response never got one.
+        index = 0
+
+        while index < len(byte_commands):
+            try:
+                byte_response = await asyncio.wait_for(
+                    self.reader.readuntil(etx),
+                    timeout=self.timeout
+                )
+
+            except asyncio.TimeoutError:
+                self._abandon()
+                error = TimeoutError(f"[{self.host}] Read operation timed out.")
+                results[index:] = [error] * (len(byte_commands) - index)
+                break
+
+            match = self._match_response(byte_response, byte_commands, index)
+
+            for skipped in range(index, match):
+                results[skipped] = ValueError("No response received for this command.")
+
+            if observer is not None: received[match] = (byte_response, perf_counter())
+
+            try:                           results[match] = await self._handle_response(byte_response)
+            except ValueError as error:    results[match] = error
+
+            index = match + 1
+
+        if observer is not None:
+            for command, byte_command, result, (byte_response, checked) in zip(
+                commands, byte_commands, results, received
+            ):
+                event = _command_event(
+                    self.host, self.port, command, len(byte_command), len(byte_response or b""),
+                    started, None, checked, None, result if isinstance(result, Exception) else None,
+                    byte_response
+                )
+
+                # Every event shares the batch's start and end, so report the
+                # time each response arrived rather than when the batch ended.
+                if checked is not None:
+                    event["total_time"] = checked - started
+                    event["checksum_time"] = None
+
+                observer.on_command(event)
+
+        return results
+
+    async def stream(self,
+                     command: str,
+                     etx: bytes = b"\x03",
+                     chunk_size: int = 65536):
+        """
+        Sends a command and yields its response data as it arrives, rather
+        than waiting for the end of transmission. The start of header,
+        command, checksum and end of transmission are removed, so joining
+        the yielded strings gives the same output as execute().
+
+        The checksum can only be verified once the whole response has been
+        received. If a ValueError is raised at the end of iteration, the data
+        that was already yielded should be discarded.
+
+        command - The function code you would like to execute. 
+        Make sure this is in computer format.
+
+        etx - This has a default value (ASCII code 001) and should only be 
+        changed if your ATG is set to use a different end of transmission.
+
+        chunk_size - The maximum amount of bytes read from the socket at once.
+
+        The connection is closed if the stream is left before the end of the
+        response, e.g. by breaking out of the loop, as the rest of the
+        response would otherwise be read as the response to the next command.
+        """
+
+        if not self.writer or not self.reader:
+            raise ConnectionError("Socket is not connected. Use 'async with' context.")
+
+        if self._streaming: self._abandon()
+
+        if self.writer.is_closing():
+            raise ConnectionError(f"[{self.host}] Connection is closed.")
+
+        # Validating function arguments prior to executing any commands.
+        if not command:              raise ValueError("Argument 'command' cannot be empty.")
+        if not type(command) == str: raise ValueError("Argument 'command' must be a string.")
+
+        if not etx:                  raise ValueError("Argument 'etx' cannot be empty.")
+        if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
+
+        # Setting up foundational variables.
+        header_length = 7  # Start of header and the echoed command.
+        trailer_length = 6 # Checksum separator and checksum.
+
+        byte_command = encode_command(command.lower())
+        writer = self.writer
+
+        # Multi-byte characters may be split between reads.
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        pending = b""
+        total = 0
+        header_received = False
+
+        # Cleared once the whole response has been read. Until then, another
+        # command on this connection would read the rest of the response.
+        self._streaming = True
+
+        try:
+            writer.write(byte_command)
+            await writer.drain()
+
+            while True:
+                try:
+                    data = await asyncio.wait_for(self.reader.read(chunk_size), timeout=self.timeout)
+
+                except asyncio.TimeoutError:
+                    raise TimeoutError(f"[{self.host}] Read operation timed out.")
+
+                if not data:
+                    raise ConnectionError(f"[{self.host}] Connection closed by the TLS system.")
+
+                pending += data
+                position = pending.find(etx)
+
+                if position != -1: break
+
+                # Hold back anything that could still turn out to be the
+                # header or the checksum, and pass the rest on as it arrives.
+                start = 0 if header_received else header_length
+
+                if len(pending) - trailer_length <= start: continue
+
+                chunk = pending[:-trailer_length]
+                pending = pending[-trailer_length:]
+                total += _byte_sum(chunk)
+                header_received = True
+
+                text = decoder.decode(chunk[start:])
+                if text: yield text
+
+            frame = pending[:position + len(etx)]
+            self._unread(pending[position + len(etx):])
+            self._streaming = False
+
+        finally:
+            # A loop that breaks out of the stream only closes it once the
+            # generator is finalized, by which time the socket may have
+            # connected again, so only the connection it read from is closed.
+            if self._streaming and self.writer is writer:
+                self._streaming = False
+                writer.close()
+
         # Validate that the generic error was not returned.
-        if b"\x019999FF1B" in byte_response: 
+        if not header_received and ERROR_RESPONSE in frame:
             raise ValueError("Unsupported command for this server.")
 
         # Validate that the checksum is present and valid.
-        checksum_separator = b"&&"
-        checksum_separator_position  = byte_response[-7:-5]
-
-        if checksum_separator not in checksum_separator_position:
+        if frame[-7:-5] != b"&&":
             raise ValueError("Checksum missing from command response.")
 
-        if not await self._data_integrity_check(byte_response):
+        total += _byte_sum(frame[:-5])
+
+        if (total & 0xFFFF) + int(frame[-5:-1], 16) != 0x10000:
             raise ValueError("Data integrity invalidated due to invalid checksum.")
-        
-        # Removes SOH, command, checksum, and ETX from being shown in output.
-        response = byte_response.decode("utf-8")[7:][:-7]
 
-        return response
+        text = decoder.decode(frame[0 if header_received else header_length:-7], final=True)
+        if text: yield text
+
+    def _match_response(self, byte_response: bytes, byte_commands: list, index: int) -> int:
+        """
+        Finds the command a response belongs to, starting from the oldest
+        command that has not been answered yet.
+
+        byte_response - Response from the TLS system.
+
+        byte_commands - Every command that was sent, in order.
+
+        index - Position of the oldest command that has not been answered.
+        """
+
+        # Generic error responses do not echo the command back, so they can
+        # only belong to the oldest unanswered command.
+        echo = byte_response[1:7]
+
+        if byte_response.startswith(ERROR_RESPONSE[:5]): return index
+
+        for position in range(index, len(byte_commands)):
+            if echo in byte_commands[position]: return position
+
+        return index
+
+    async def _handle_response(self, byte_response: bytes) -> str:
+        """
+        Handles responses from the TLS system after executing a command.
+
+        byte_response - Response from the TLS system.
+
+        byte_command - The command that was executed to get the response.
+
+        is_display - Used to determine if the command uses Display format.
+        """
+
+        # Removes SOH, command, checksum, and ETX from being shown in output.
+        return str(check_frame(byte_response), "utf-8")
 
     async def _data_integrity_check(self, byte_response: bytes) -> bool:
         """
         Verifies whether or not a command response retains its integrity
         after transmission by comparing it against the response checksum.
 
-        response - Full command response up the checksum itself. Must include
-        the start of header, command, response data, and the && separator.
+        byte_response - Full command response, from the start of header
+        through the end of transmission.
         """
 
-        response = byte_response.decode()
-        message  = response[:-5]
-        checksum = response[-5:-1]
-        integrity_threshold = "0b10000000000000000"
-
-        # Calculate the 16-bit binary count of the message.
-        message_sum = sum(ord(char) for char in message) & 0xFFFF
-        checksum_int = int(checksum, 16)
-
-        # Compare sum of checksum and message to expected result.
-        return bin(message_sum + checksum_int) == integrity_threshold
\ No newline at end of file
+        return verify_checksum(byte_response)
\ No newline at end of file
@@ -0,0 +1,447 @@
+# buffered_socket.py - An asynchronous socket for TLS automatic tank gauges built directly
+# on asyncio.BufferedProtocol, for pollers running very large amounts of commands.
+
+from collections import deque
+from time import perf_counter
+import asyncio
+import codecs
+
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.observer import _command_event
+from veeder_root_tls_socket_library.parsing import parse
+from veeder_root_tls_socket_library.protocol import ERROR_RESPONSE, FrameReader, check_frame, encode_command
+
+# Starting size of the receive buffer of each connection. It doubles whenever
+# a response doesn't fit and keeps its size for later responses.
+_INITIAL_BUFFER_SIZE = 16384
+
+class _TlsProtocol(asyncio.BufferedProtocol):
+    """
+    Receives responses straight into the buffer of a FrameReader, which is
+    kept for the life of the connection, and resolves the future of the
+    command each response belongs to. Commands are answered in the order they
+    were sent.
+
+    Futures are resolved with a (result, error, response size, frame) tuple,
+    where the result is either the response data or, for commands that asked
+    for it, the parsed response, and error is the exception raised instead.
+    The frame is a copy of the response if keep_frames is set, e.g. for an
+    observer, otherwise None. Futures of commands that never got a response
+    raise their error instead.
+
+    While partial is set to a (future, callback) tuple and that future is the
+    oldest unanswered command, the callback is given the part of its response
+    received so far after every read.
+    """
+
+    def __init__(self, host: str):
+        self.host = host
+        self.keep_frames = False
+        self.reader = FrameReader(initial_size=_INITIAL_BUFFER_SIZE)
+        self.transport = None
+        self.closed = asyncio.get_running_loop().create_future()
+        self.partial = None
+
+        self._waiters = deque()
+
+    def expect(self, byte_command: bytes, kwargs: dict = None) -> asyncio.Future:
+        """
+        Returns a future for the response to a command about to be sent.
+
+        kwargs - Options to parse the response with, or None to return it as
+        a string.
+        """
+
+        if self.transport is None or self.transport.is_closing():
+            raise ConnectionError(f"[{self.host}] Connection closed by the TLS system.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((byte_command, future, kwargs))
+
+        return future
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        error = ConnectionError(f"[{self.host}] Connection closed by the TLS system.")
+
+        while self._waiters:
+            _, future, _ = self._waiters.popleft()
+            if not future.done(): future.set_exception(error)
+
+        if not self.closed.done(): self.closed.set_result(None)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self.reader.get_buffer(sizehint)
+
+    def buffer_updated(self, nbytes: int):
+        reader = self.reader
+        reader.buffer_updated(nbytes)
+
+        frame = reader.next_frame()
+
+        while frame is not None:
+            self._resolve(frame)
+            frame = reader.next_frame()
+
+        partial = self.partial
+
+        if partial is not None and self._waiters and self._waiters[0][1] is partial[0]:
+            partial[1](reader.pending())
+
+    def _resolve(self, frame: memoryview):
+        if not self._waiters: return
+
+        copy = bytes(frame) if self.keep_frames else None
+
+        # Generic error responses do not echo the command back, so they can
+        # only belong to the oldest unanswered command.
+        if frame[:9] == ERROR_RESPONSE:
+            _, future, _ = self._waiters.popleft()
+            error = ValueError("Unsupported command for this server.")
+
+            if not future.done(): future.set_result((None, error, len(frame), copy))
+            return
+
+        # Commands skipped over by a response never got one.
+        echo = bytes(frame[1:7])
+        index = next((index for index, (byte_command, _, _) in enumerate(self._waiters) if echo in byte_command), 0)
+
+        for _ in range(0, index):
+            _, future, _ = self._waiters.popleft()
+            if not future.done(): future.set_exception(ValueError("No response received for this command."))
+
+        _, future, kwargs = self._waiters.popleft()
+        if future.done(): return
+
+        # Responses are parsed where they were received. Any error raised by a
+        # parser belongs to its command, not to the connection.
+        try:
+            if kwargs is None: result = str(check_frame(frame), "utf-8")
+            else:              result = parse(frame, **kwargs)
+
+            future.set_result((result, None, len(frame), copy))
+
+        except Exception as error:
+            future.set_result((None, error, len(frame), copy))
+
+class BufferedAsyncTlsSocket(AsyncTlsSocket):
+    """
+    Works the same as AsyncTlsSocket, but receives responses with an
+    asyncio.BufferedProtocol instead of a StreamReader. Responses are read
+    straight into a buffer that is kept for the life of the connection,
+    verified where they were received, and handed to the waiting command, so
+    each response costs fewer copies and allocations.
+
+    execute() - Used to send a command and view the output in accordance with
+    Veeder-Root Serial Interface Manual 576013-635.
+
+    execute_many() - Used to send several commands at once and view the output
+    of each of them.
+
+    execute_and_parse() - Used to send a command and parse the output with
+    the tls_3xx function for its function code.
+
+    connect() - Opens the connection to the TLS system.
+
+    close() - Closes the connection to the TLS system.
+
+    stream() - Used to send a command and view the output as it arrives.
+
+    Observers are told when each response arrived, but not the time to its
+    first byte or how many reads it took.
+    """
+
+    def __init__(self, host: str, port: int = 10001, timeout: float = 4.0, observer = None):
+        """
+        host - The address of the TLS system.
+
+        port - The port the TLS system listens on.
+
+        timeout - The amount of seconds to wait on connecting or on a response.
+        The connection is closed if a response times out, the same as for
+        AsyncTlsSocket.
+
+        observer - An optional TlsObserver that is told how long connecting
+        and each command took, and how many bytes were received.
+        """
+
+        super().__init__(host, port, timeout, observer)
+        self.transport = None
+        self.protocol = None
+
+    async def connect(self):
+        """
+        Opens the connection to the TLS system. This is done for you when
+        using 'async with', but is available for long-lived connections.
+        """
+
+        loop = asyncio.get_running_loop()
+        started = perf_counter() if self.observer is not None else None
+
+        try:
+            self.transport, self.protocol = await asyncio.wait_for(
+                loop.create_connection(lambda: _TlsProtocol(self.host), self.host, self.port),
+                timeout=self.timeout
+            )
+
+        except asyncio.TimeoutError:
+            error = TimeoutError(f"[{self.host}] Connection timed out after {self.timeout} seconds.")
+            if self.observer is not None: self._observe_connect(started, error)
+            raise error
+
+        except Exception as e:
+            error = ConnectionError(f"[{self.host}] Connection failed: {e}")
+            if self.observer is not None: self._observe_connect(started, error)
+            raise error
+
+        if self.observer is not None: self._observe_connect(started, None)
+
+        return self
+
+    async def close(self):
+        """
+        Closes the connection to the TLS system.
+        """
+
+        if self.transport:
+            self.transport.close()
+            await self.protocol.closed
+
+    async def execute(self,
+                      command: str,
+                      etx: bytes = b"\x03") -> str:
+        """
+        Sends a command to a socket connection using the command
+        format from the Veeder-Root Serial Interface Manual 576013-635.
+
+        command - The function code you would like to execute.
+        Make sure this is in computer format.
+
+        etx - This has a default value (ASCII code 001) and should only be
+        changed if your ATG is set to use a different end of transmission.
+        """
+
+        return (await self._send([command], etx, raise_errors=True))[0]
+
+    async def execute_and_parse(self,
+                                command: str,
+                                etx: bytes = b"\x03",
+                                **kwargs):
+        """
+        Sends a command the same way as execute(), then parses the response
+        with the tls_3xx function for the function code echoed back by the
+        TLS system. The response is parsed where it was received in the
+        buffer, without copying or decoding it first.
+
+        command - The function code you would like to execute, e.g. "i20100".
+
+        etx - The same as for execute().
+
+        kwargs - Passed through to the parser, e.g. compact=True. Options that
+        the parser doesn't take are left out, and options that no parser
+        takes raise a TypeError.
+        """
+
+        return (await self._send([command], etx, raise_errors=True, kwargs=kwargs))[0]
+
+    async def execute_many(self,
+                           commands: list,
+                           etx: bytes = b"\x03") -> list:
+        """
+        Sends several commands to a socket connection in a single write and
+        waits for their responses, rather than waiting for each response
+        before sending the next command.
+
+        Returns a list with an entry per command, in the same order as the
+        commands. Each entry is either the response or the exception raised
+        for that command, so one failing command does not abort the batch.
+
+        commands - The function codes you would like to execute.
+        Make sure these are in computer format.
+
+        etx - This has a default value (ASCII code 001) and should only be
+        changed if your ATG is set to use a different end of transmission.
+        """
+
+        for command in commands:
+            if not command:              raise ValueError("Argument 'commands' cannot contain empty commands.")
+            if not type(command) == str: raise ValueError("Argument 'commands' must only contain strings.")
+
+        return await self._send(commands, etx, raise_errors=False)
+
+    async def stream(self,
+                     command: str,
+                     etx: bytes = b"\x03",
+                     chunk_size: int = 65536):
+        """
+        Sends a command and yields its response data as it arrives, rather
+        than waiting for the end of transmission. The start of header,
+        command, checksum and end of transmission are removed, so joining
+        the yielded strings gives the same output as execute().
+
+        The checksum can only be verified once the whole response has been
+        received. If a ValueError is raised at the end of iteration, the data
+        that was already yielded should be discarded.
+
+        command - The function code you would like to execute.
+        Make sure this is in computer format.
+
+        etx - This has a default value (ASCII code 001) and should only be
+        changed if your ATG is set to use a different end of transmission.
+
+        chunk_size - Only kept for compatibility with AsyncTlsSocket. Data is
+        yielded as the protocol receives it.
+        """
+
+        if not self.transport or not self.protocol:
+            raise ConnectionError("Socket is not connected. Use 'async with' context.")
+
+        # Validating function arguments prior to executing any commands.
+        if not command:              raise ValueError("Argument 'command' cannot be empty.")
+        if not type(command) == str: raise ValueError("Argument 'command' must be a string.")
+
+        if not etx:                  raise ValueError("Argument 'etx' cannot be empty.")
+        if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
+
+        header_length = 7  # Start of header and the echoed command.
+        trailer_length = 6 # Checksum separator and checksum.
+
+        byte_command = encode_command(command.lower())
+        protocol = self.protocol
+        protocol.reader.etx = etx
+
+        future = protocol.expect(byte_command)
+        chunks = asyncio.Queue()
+        streamed = header_length
+
+        def progress(pending: memoryview):
+            nonlocal streamed
+
+            # Hold back anything that could still turn out to be the checksum.
+            end = len(pending) - trailer_length
+
+            if end > streamed:
+                chunks.put_nowait(bytes(pending[streamed:end]))
+                streamed = end
+
+        protocol.partial = (future, progress)
+        future.add_done_callback(lambda _: chunks.put_nowait(None))
+
+        # Multi-byte characters may be split between reads.
+        decoder = codecs.getincrementaldecoder("utf-8")()
+
+        try:
+            self.transport.write(byte_command)
+
+            while True:
+                try:
+                    data = await asyncio.wait_for(chunks.get(), timeout=self.timeout)
+
+                except asyncio.TimeoutError:
+                    future.cancel()
+                    self._abandon()
+                    raise TimeoutError(f"[{self.host}] Read operation timed out.")
+
+                if data is None: break
+
+                text = decoder.decode(data)
+                if text: yield text
+
+        finally:
+            if protocol.partial is not None and protocol.partial[0] is future: protocol.partial = None
+
+        result, error, _, _ = future.result()
+        if error is not None: raise error
+
+        # The response was verified as a whole, so only the part of it that
+        # wasn't yielded yet is left to decode.
+        text = decoder.decode(result.encode()[streamed - header_length:], final=True)
+        if text: yield text
+
+    async def _send(self, commands: list, etx: bytes, raise_errors: bool, kwargs: dict = None) -> list:
+        """
+        Writes every command at once and waits for each response in turn,
+        allowing timeout seconds for each of them.
+
+        raise_errors - Raise the exception of a failed command rather than
+        returning it in its place.
+
+        kwargs - Options to parse each response with, or None to return the
+        responses as strings.
+        """
+
+        if not self.transport or not self.protocol:
+            raise ConnectionError("Socket is not connected. Use 'async with' context.")
+
+        if raise_errors:
+            if not commands[0]:              raise ValueError("Argument 'command' cannot be empty.")
+            if not type(commands[0]) == str: raise ValueError("Argument 'command' must be a string.")
+
+        if not etx:                  raise ValueError("Argument 'etx' cannot be empty.")
+        if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
+
+        # Display format responses have no checksum, so every command is sent
+        # in computer format, the same as AsyncTlsSocket does.
+        byte_commands = [encode_command(command.lower()) for command in commands]
+
+        protocol = self.protocol
+        protocol.reader.etx = etx
+        protocol.keep_frames = self.observer is not None
+        futures = [protocol.expect(byte_command, kwargs) for byte_command in byte_commands]
+        results = []
+
+        observer = self.observer
+        started = perf_counter() if observer is not None else None
+
+        self.transport.write(b"".join(byte_commands))
+
+        for index, future in enumerate(futures):
+            error = frame = None
+            size = 0
+
+            try:
+                result, error, size, frame = await asyncio.wait_for(future, timeout=self.timeout)
+                if error is None: results.append(result)
+
+            except asyncio.TimeoutError:
+                # Nobody waits on the commands left once the connection is closed.
+                for future in futures[index:]: future.cancel()
+
+                self._abandon()
+                error = TimeoutError(f"[{self.host}] Read operation timed out.")
+
+            except ValueError as exception:
+                error = exception
+
+            if observer is not None:
+                observer.on_command(_command_event(
+                    self.host, self.port, commands[index], len(byte_commands[index]), size,
+                    started, None, None, None, error, frame
+                ))
+
+            if error is None: continue
+
+            if raise_errors: raise error
+
+            results.append(error)
+
+            # The connection was closed, so nothing after a timed out response
+            # can arrive either.
+            if isinstance(error, TimeoutError):
+                results.extend([error] * (len(futures) - index - 1))
+                break
+
+        return results
+
+    def _abandon(self):
+        # Commands still waiting on a response fail once the connection is
+        # lost, rather than being answered by a late response.
+        self.transport.close()
+
+    def _is_open(self) -> bool:
+        return self.transport is not None and not self.transport.is_closing()
+
+    def _has_unread(self) -> bool:
+        return self.protocol is not None and len(self.protocol.reader.pending()) > 0
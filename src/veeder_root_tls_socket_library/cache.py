@@ -0,0 +1,315 @@
+# cache.py - Caches responses to read-only commands so callers can share recent reports.
+
+from collections import OrderedDict
+from time import monotonic
+import asyncio
+import threading
+
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool, TlsSocketPool
+
+# Seconds to keep responses for, by function code. Inventory changes as fuel
+# is sold, whereas tank labels and product codes are practically static.
+DEFAULT_TTLS = {
+    "201": 30.0,
+    "202": 300.0,
+    "602": 86400.0
+}
+
+class _CacheStore:
+    """
+    Keeps responses in least recently used order and evicts the oldest once
+    the total length of the cached responses exceeds max_size. Callers must
+    hold the lock of the cache that owns the store.
+    """
+
+    def __init__(self, ttls: dict, default_ttl: float, max_size: int):
+        if max_size < 1: raise ValueError("Argument 'max_size' must be at least 1.")
+
+        self.ttls = {code.upper(): ttl for code, ttl in (DEFAULT_TTLS if ttls is None else ttls).items()}
+        self.default_ttl = default_ttl
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def ttl(self, command: str) -> float:
+        # Only inquiry commands are read-only; setup and control commands
+        # change the TLS system and must always reach it.
+        if not command or command[0] not in "iI": return 0
+
+        return self.ttls.get(command[1:4].upper(), self.default_ttl)
+
+    def get(self, key: tuple):
+        entry = self._entries.get(key)
+
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None: self.remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+
+        return entry[1]
+
+    def put(self, key: tuple, response: str, ttl: float):
+        if len(response) > self.max_size: return
+
+        self.remove(key)
+        self._entries[key] = (monotonic() + ttl, response)
+        self.size += len(response)
+
+        while self.size > self.max_size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def remove(self, key: tuple):
+        entry = self._entries.pop(key, None)
+        if entry is not None: self.size -= len(entry[1])
+
+    def invalidate(self, host: str, port: int, command: str):
+        for key in [key for key in self._entries if _matches(key, host, port, command)]:
+            self.remove(key)
+
+class TlsResponseCache:
+    """
+    Caches responses to inquiry commands per (ip, port, command) in front of
+    a TlsSocketPool. Each function code has its own time to live, the least
+    recently used responses are evicted once max_size is reached, and threads
+    asking for the same response at once share a single request to the TLS
+    system rather than each sending the command.
+
+    execute() - Returns a cached response, or executes the command through the
+    pool and caches its response.
+
+    invalidate() - Drops cached responses, e.g. after changing a setup value.
+
+    clear() - Drops every cached response.
+
+    Setup and control commands, error responses and exceptions are never
+    cached.
+    """
+
+    def __init__(self,
+                 pool: TlsSocketPool = None,
+                 ttls: dict = None,
+                 default_ttl: float = 0.0,
+                 max_size: int = 16777216):
+        """
+        pool - The TlsSocketPool used to execute commands. A new pool is
+        created if this is not given.
+
+        ttls - Maps function codes (e.g. "201") to the amount of seconds their
+        responses are cached for. Defaults to DEFAULT_TTLS.
+
+        default_ttl - Seconds to cache inquiry commands missing from ttls for.
+        These are not cached by default.
+
+        max_size - The maximum total length of the cached responses.
+        """
+
+        self.pool = pool if pool is not None else TlsSocketPool()
+        self._store = _CacheStore(ttls, default_ttl, max_size)
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    @property
+    def hits(self) -> int: return self._store.hits
+
+    @property
+    def misses(self) -> int: return self._store.misses
+
+    def execute(self, ip: str, port: int, command: str, **kwargs) -> str:
+        """
+        Returns the cached response to a command if it has not expired, or
+        else executes the command and caches its response.
+
+        ip - IP address of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+
+        command - The function code you would like to execute.
+
+        kwargs - Passed through to TlsSocketPool.execute(). Responses are
+        cached separately for each set of options, and raw responses are not
+        cached since they are views of the socket's buffer.
+        """
+
+        ttl = self._store.ttl(command)
+        if ttl <= 0 or kwargs.get("raw"): return self.pool.execute(ip, port, command, **kwargs)
+
+        key = _key(ip, port, command, kwargs)
+
+        with self._lock:
+            response = self._store.get(key)
+            if response is not None: return response
+
+            flight = self._in_flight.get(key)
+            leader = flight is None
+
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None: raise flight.error
+            return flight.response
+
+        try:
+            flight.response = self.pool.execute(ip, port, command, **kwargs)
+
+            with self._lock: self._store.put(key, flight.response, ttl)
+
+            return flight.response
+
+        except BaseException as exception:
+            flight.error = exception
+            raise
+
+        finally:
+            with self._lock: del self._in_flight[key]
+            flight.done.set()
+
+    def invalidate(self, ip: str = None, port: int = None, command: str = None):
+        """
+        Drops the cached responses that match every argument given. With no
+        arguments, this does the same as clear().
+        """
+
+        with self._lock: self._store.invalidate(ip, port, command)
+
+    def clear(self):
+        """
+        Drops every cached response.
+        """
+
+        self.invalidate()
+
+class AsyncTlsResponseCache:
+    """
+    Caches responses to inquiry commands per (host, port, command) in front of
+    an AsyncTlsSocketPool. Each function code has its own time to live, the
+    least recently used responses are evicted once max_size is reached, and
+    coroutines asking for the same response at once share a single request to
+    the TLS system rather than each sending the command.
+
+    execute() - Returns a cached response, or executes the command through the
+    pool and caches its response.
+
+    invalidate() - Drops cached responses, e.g. after changing a setup value.
+
+    clear() - Drops every cached response.
+
+    Setup and control commands, error responses and exceptions are never
+    cached.
+    """
+
+    def __init__(self,
+                 pool: AsyncTlsSocketPool = None,
+                 ttls: dict = None,
+                 default_ttl: float = 0.0,
+                 max_size: int = 16777216):
+        """
+        pool - The AsyncTlsSocketPool used to execute commands. A new pool is
+        created if this is not given.
+
+        ttls - Maps function codes (e.g. "201") to the amount of seconds their
+        responses are cached for. Defaults to DEFAULT_TTLS.
+
+        default_ttl - Seconds to cache inquiry commands missing from ttls for.
+        These are not cached by default.
+
+        max_size - The maximum total length of the cached responses.
+        """
+
+        self.pool = pool if pool is not None else AsyncTlsSocketPool()
+        self._store = _CacheStore(ttls, default_ttl, max_size)
+        self._in_flight = {}
+
+    @property
+    def hits(self) -> int: return self._store.hits
+
+    @property
+    def misses(self) -> int: return self._store.misses
+
+    async def execute(self, host: str, port: int, command: str, **kwargs) -> str:
+        """
+        Returns the cached response to a command if it has not expired, or
+        else executes the command and caches its response.
+
+        host - IP address or hostname of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+
+        command - The function code you would like to execute.
+
+        kwargs - Passed through to AsyncTlsSocketPool.execute(). Responses
+        are cached separately for each set of options.
+        """
+
+        ttl = self._store.ttl(command)
+        if ttl <= 0: return await self.pool.execute(host, port, command, **kwargs)
+
+        key = _key(host, port, command, kwargs)
+
+        response = self._store.get(key)
+        if response is not None: return response
+
+        task = self._in_flight.get(key)
+
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(key, ttl, kwargs))
+            self._in_flight[key] = task
+
+        # Shielded so that a caller being cancelled does not cancel the
+        # request for everyone else waiting on it.
+        return await asyncio.shield(task)
+
+    def invalidate(self, host: str = None, port: int = None, command: str = None):
+        """
+        Drops the cached responses that match every argument given. With no
+        arguments, this does the same as clear().
+        """
+
+        self._store.invalidate(host, port, command)
+
+    def clear(self):
+        """
+        Drops every cached response.
+        """
+
+        self.invalidate()
+
+    async def _fetch(self, key: tuple, ttl: float, kwargs: dict) -> str:
+        try:
+            response = await self.pool.execute(*key[:3], **kwargs)
+            self._store.put(key, response, ttl)
+
+            return response
+
+        finally:
+            del self._in_flight[key]
+
+class _Flight:
+    """
+    A request to a TLS system that other threads are waiting on.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.response = None
+        self.error = None
+
+def _key(host: str, port: int, command: str, kwargs: dict) -> tuple:
+    # Options such as etx can change the response, whereas the rest only change
+    # how it is read.
+    options = tuple(sorted((name, value) for name, value in kwargs.items()
+                           if name not in ("data_size", "retries", "timeout")))
+
+    return (host, port, command, options)
+
+def _matches(key: tuple, host: str, port: int, command: str) -> bool:
+    return ((host is None or key[0] == host) and
+            (port is None or key[1] == port) and
+            (command is None or key[2] == command))
@@ -0,0 +1,455 @@
+# capture.py - Archives the raw responses of TLS automatic tank gauges, and parses them
+# again later across several processes, e.g. to backfill history after a parser is fixed.
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from time import time
+import argparse
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+
+from veeder_root_tls_socket_library.observer import TlsObserver
+from veeder_root_tls_socket_library.parsing import _PARSERS, _check_options, parse
+from veeder_root_tls_socket_library.schema import record_type
+from veeder_root_tls_socket_library.storage import _CODES, TlsStore
+
+# Segment files are a series of blocks, each a header followed by a batch of
+# frames compressed together with zlib. Each frame is stored in its block as
+# a header followed by the host, the command and the frame itself.
+_SUFFIX = ".tlsc"
+_BLOCK_MAGIC = b"TLSC"
+_BLOCK_HEADER = struct.Struct("<4sIII")  # Magic, compressed length, length, frame count.
+_FRAME_HEADER = struct.Struct("<dHHHI")  # Receive time, port, host, command and frame lengths.
+
+# The most blocks handed to each worker process ahead of the one being read.
+_BLOCKS_PER_WORKER = 4
+
+CapturedFrame = record_type("CapturedFrame", ["received", "host", "port", "command", "frame"])
+
+class FrameArchive:
+    """
+    Appends raw responses to compressed segment files in a directory. Frames
+    are gathered into blocks of about block_size bytes that are compressed
+    together, and a new segment is started once the current one reaches
+    segment_size bytes. Segment names start with the time they were created
+    and the process id, so several processes can share a directory and the
+    segments sort in the order they were written.
+
+    append() - Adds a response to the archive.
+
+    flush() - Writes out the block being gathered.
+
+    close() - Writes out the block being gathered and closes the segment.
+
+    Frames in the block being gathered are lost if the process dies before
+    it is written. Blocks are only ever appended, so a segment cut short can
+    still be read up to its last whole block. An archive can be shared by
+    several threads.
+    """
+
+    def __init__(self,
+                 directory: str,
+                 segment_size: int = 64 * 2 ** 20,
+                 block_size: int = 2 ** 20,
+                 level: int = 1):
+        """
+        directory - Where segments are written. Created if it doesn't exist.
+
+        segment_size - The size in bytes a segment is closed at.
+
+        block_size - The amount of uncompressed bytes gathered before they
+        are compressed and written.
+
+        level - The zlib compression level, from 1 (fastest) to 9 (smallest).
+        Responses are mostly hex digits, so higher levels save little space
+        for the time they take on the thread or event loop running the socket.
+        """
+
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.block_size = block_size
+        self.level = level
+
+        self._lock = threading.Lock()
+        self._block = bytearray()
+        self._count = 0
+        self._file = None
+        self._sequence = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, host: str, port: int, command: str, frame, received: float = None):
+        """
+        Adds a response to the archive.
+
+        host, port - The TLS system the response came from.
+
+        command - The command that was sent, e.g. "i20100".
+
+        frame - Bytes, bytearray or memoryview of the response, from the
+        start of header through the end of transmission.
+
+        received - When the response arrived, as returned by time.time().
+        Defaults to now.
+        """
+
+        host = bytes(host, "utf-8")
+        command = bytes(command, "utf-8")
+        header = _FRAME_HEADER.pack(
+            time() if received is None else received, port, len(host), len(command), len(frame)
+        )
+
+        with self._lock:
+            block = self._block
+            block += header
+            block += host
+            block += command
+            block += frame
+            self._count += 1
+
+            if len(block) >= self.block_size: self._write_block()
+
+    def flush(self):
+        """
+        Writes out the block being gathered, so that readers can see it.
+        """
+
+        with self._lock:
+            if self._count: self._write_block()
+
+    def close(self):
+        """
+        Writes out the block being gathered and closes the segment.
+        """
+
+        with self._lock:
+            if self._count: self._write_block()
+
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write_block(self):
+        compressed = zlib.compress(self._block, self.level)
+
+        if self._file is not None and self._file.tell() >= self.segment_size:
+            self._file.close()
+            self._file = None
+
+        if self._file is None:
+            name = f"{datetime.now():%Y%m%dT%H%M%S}-{os.getpid()}-{self._sequence:04}{_SUFFIX}"
+            self._file = open(os.path.join(self.directory, name), "ab")
+            self._sequence += 1
+
+        self._file.write(_BLOCK_HEADER.pack(_BLOCK_MAGIC, len(compressed), len(self._block), self._count))
+        self._file.write(compressed)
+        self._file.flush()
+
+        self._block = bytearray()
+        self._count = 0
+
+class FrameCapture(TlsObserver):
+    """
+    An observer that appends the response to every command to a FrameArchive,
+    including responses that failed their checksum or could not be parsed,
+    so that they can be parsed again later with reparse(). Pass it to any of
+    the sockets, pools or pollers that take an observer.
+
+    Every event is also passed on to another observer if one is given, e.g.
+    a MetricsObserver, as a socket only takes a single observer.
+    """
+
+    def __init__(self, archive: FrameArchive, observer = None):
+        """
+        archive - The FrameArchive to append responses to.
+
+        observer - An optional TlsObserver to pass every event on to.
+        """
+
+        self.archive = archive
+        self.observer = observer
+
+    def on_connect(self, event: dict):
+        if self.observer is not None: self.observer.on_connect(event)
+
+    def on_command(self, event: dict):
+        frame = event.get("frame")
+
+        if frame is not None:
+            self.archive.append(event["host"], event["port"], event["command"], frame)
+
+        if self.observer is not None: self.observer.on_command(event)
+
+def iter_frames(sources):
+    """
+    Yields every frame in one or more segments, in the order they were
+    written, as CapturedFrame named tuples of (received, host, port, command,
+    frame). The frame is the response as it was received, as bytes.
+
+    sources - A directory of segments, a segment file, or a list of either.
+    """
+
+    for path in _segments(sources):
+        mapped = _map(path)
+
+        try:
+            for offset in _scan(mapped):
+                for received, host, port, command, frame in _frames(_decompress(mapped, offset)):
+                    yield CapturedFrame(received, host, port, command, bytes(frame))
+
+        finally:
+            if isinstance(mapped, mmap.mmap): mapped.close()
+
+def reparse(sources, processes: int = None, codes = None, **kwargs):
+    """
+    Parses every captured frame again with the current tls_3xx parsers and
+    yields a dict per frame, in the order they were captured. Blocks of
+    frames are spread across worker processes, each of which maps the segment
+    and parses whole blocks, so that only the parsed results are sent back.
+
+    Each dict has these keys:
+
+    host, port, command - Where the response came from and what was sent.
+
+    received - When the response arrived, as returned by time.time().
+
+    result - The parsed response, or the exception raised for it, e.g. for
+    a response that failed its checksum.
+
+    sources - A directory of segments, a segment file, or a list of either.
+
+    processes - The amount of worker processes. Defaults to the amount of
+    CPU cores. Set to 1 to parse in this process instead.
+
+    codes - Only parse responses to these function codes, e.g. ["201"].
+    Responses to commands without a parser are always left out.
+
+    kwargs - Passed through to each parser, e.g. compact=True. Options that a
+    parser doesn't take are left out, and options that no parser takes raise
+    a TypeError. Compact records are slower to send back from the workers
+    than dicts, as their types are rebuilt for every record.
+    """
+
+    if processes is None: processes = os.cpu_count() or 1
+
+    if processes < 1: raise ValueError("Argument 'processes' must be at least 1.")
+
+    _check_options(kwargs)
+
+    units = [(path, offset) for path in _segments(sources) for offset in _offsets(path)]
+    work = partial(_reparse_block, codes=None if codes is None else {code.upper() for code in codes}, kwargs=kwargs)
+
+    if processes == 1:
+        for unit in units: yield from _results(work(unit))
+        return
+
+    # Only a few blocks are handed out ahead of the one being read, so that
+    # results don't pile up faster than the caller uses them.
+    executor = ProcessPoolExecutor(processes)
+    pending = deque()
+
+    try:
+        for unit in units:
+            pending.append(executor.submit(work, unit))
+
+            if len(pending) >= processes * _BLOCKS_PER_WORKER:
+                yield from _results(pending.popleft().result())
+
+        while pending:
+            yield from _results(pending.popleft().result())
+
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+def _results(block: list):
+    for received, host, port, command, result in block:
+        yield {
+            "host":     host,
+            "port":     port,
+            "command":  command,
+            "received": received,
+            "result":   result
+        }
+
+def _reparse_block(unit: tuple, codes: set, kwargs: dict) -> list:
+    path, offset = unit
+    mapped = _map(path)
+
+    try:
+        raw = _decompress(mapped, offset)
+    finally:
+        if isinstance(mapped, mmap.mmap): mapped.close()
+
+    results = []
+
+    for received, host, port, command, frame in _frames(raw):
+        code = command[1:4].upper()
+
+        if code not in _PARSERS or (codes is not None and code not in codes): continue
+
+        try:                       result = parse(frame, **kwargs)
+        except Exception as error: result = error
+
+        results.append((received, host, port, command, result))
+
+    return results
+
+def _segments(sources) -> list:
+    if isinstance(sources, (str, os.PathLike)): sources = [sources]
+
+    paths = []
+
+    for source in sources:
+        if os.path.isdir(source):
+            paths += sorted(
+                os.path.join(source, name) for name in os.listdir(source) if name.endswith(_SUFFIX)
+            )
+        else:
+            paths.append(source)
+
+    return paths
+
+def _map(path: str):
+    """
+    Maps a segment into memory, so that blocks are read straight from the
+    page cache rather than read into memory in full.
+    """
+
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0: return b""
+
+        return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+def _offsets(path: str) -> list:
+    mapped = _map(path)
+
+    try:
+        return _scan(mapped)
+    finally:
+        if isinstance(mapped, mmap.mmap): mapped.close()
+
+def _scan(mapped) -> list:
+    """
+    Returns the offset of every whole block in a segment.
+    """
+
+    offsets = []
+    offset = 0
+
+    while offset + _BLOCK_HEADER.size <= len(mapped):
+        magic, compressed, _, _ = _BLOCK_HEADER.unpack_from(mapped, offset)
+
+        if magic != _BLOCK_MAGIC:
+            raise ValueError(f"Segment is corrupt at byte {offset}.")
+
+        end = offset + _BLOCK_HEADER.size + compressed
+
+        # The last block was cut short, e.g. by the process being killed.
+        if end > len(mapped): break
+
+        offsets.append(offset)
+        offset = end
+
+    return offsets
+
+def _decompress(mapped, offset: int) -> bytes:
+    _, compressed, length, _ = _BLOCK_HEADER.unpack_from(mapped, offset)
+    start = offset + _BLOCK_HEADER.size
+
+    raw = zlib.decompress(mapped[start:start + compressed])
+
+    if len(raw) != length:
+        raise ValueError(f"Segment is corrupt at byte {offset}.")
+
+    return raw
+
+def _frames(raw: bytes):
+    """
+    Yields (received, host, port, command, frame) for every frame in a
+    block. Frames are memoryviews of the block.
+    """
+
+    view = memoryview(raw)
+    unpack = _FRAME_HEADER.unpack_from
+    offset = 0
+
+    while offset < len(raw):
+        received, port, host_length, command_length, frame_length = unpack(raw, offset)
+        offset += _FRAME_HEADER.size
+
+        host = str(view[offset:offset + host_length], "utf-8")
+        offset += host_length
+
+        command = str(view[offset:offset + command_length], "utf-8")
+        offset += command_length
+
+        yield received, host, port, command, view[offset:offset + frame_length]
+        offset += frame_length
+
+# What TlsStore raises for a report it can't store, e.g. one with fields
+# missing or a timestamp that doesn't exist.
+_STORE_ERRORS = (ValueError, KeyError, TypeError, sqlite3.Error)
+
+def _backfill(arguments) -> int:
+    """
+    Parses captured frames again and stores the reports TlsStore can hold.
+    """
+
+    stored = failed = 0
+    batch = []
+
+    def flush():
+        nonlocal stored, failed
+
+        try:
+            stored += store.add_many(batch)
+
+        # One bad report fails the whole transaction, so try them one by one.
+        except _STORE_ERRORS:
+            for report in batch:
+                try:                   stored += store.add_many([report])
+                except _STORE_ERRORS:  failed += 1
+
+        batch.clear()
+
+    with TlsStore(arguments.store) as store:
+        for item in reparse(arguments.sources, arguments.processes, _CODES):
+            if isinstance(item["result"], Exception):
+                failed += 1
+                continue
+
+            site = arguments.site.format(host=item["host"], port=item["port"])
+            batch.append((site, item["command"], item["result"]))
+
+            if len(batch) >= arguments.batch_size: flush()
+
+        if batch: flush()
+
+    print(f"Stored {stored} records. {failed} responses could not be parsed or stored.")
+
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Parses captured TLS responses again and stores them in a TlsStore database."
+    )
+    parser.add_argument("sources", nargs="+", help="Directories of segments or segment files.")
+    parser.add_argument("--store", required=True, help="The TlsStore database to write to.")
+    parser.add_argument("--site", default="{host}:{port}",
+                        help="The site name to store records under, formatted with {host} and {port}.")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Reports stored per transaction.")
+
+    raise SystemExit(_backfill(parser.parse_args()))
@@ -0,0 +1,52 @@
+# checksum.py - Verifies the checksums appended to TLS automatic tank gauge responses.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Responses at least this long are summed with NumPy when it is installed.
+# Below this size the cost of calling into NumPy outweighs the gain.
+_NUMPY_THRESHOLD = 2048
+
+def compute_checksum(message) -> int:
+    """
+    Calculates the checksum the TLS system would append to a message, which
+    is the 16-bit two's complement of the sum of every byte in the message.
+
+    message - Bytes, bytearray or memoryview of the message. Must include the
+    start of header, command, response data, and the && separator.
+    """
+
+    return -_byte_sum(message) & 0xFFFF
+
+def verify_checksum(byte_response) -> bool:
+    """
+    Verifies whether or not a command response retains its integrity
+    after transmission by comparing it against the response checksum.
+
+    byte_response - Bytes, bytearray or memoryview of the full command
+    response, from the start of header through the end of transmission.
+    """
+
+    message  = byte_response[:-5]
+    checksum = int(bytes(byte_response[-5:-1]), 16)
+
+    # The 16-bit sum of the message plus the checksum must be exactly 2^16.
+    return (_byte_sum(message) & 0xFFFF) + checksum == 0x10000
+
+def _byte_sum(message) -> int:
+    """
+    Sums every byte of a message.
+
+    message - Bytes, bytearray or memoryview of the message.
+    """
+
+    if numpy is not None and len(message) >= _NUMPY_THRESHOLD:
+        return int(numpy.frombuffer(message, dtype=numpy.uint8).sum(dtype=numpy.uint64))
+
+    # Iterating bytes is done in C and is faster than iterating a memoryview,
+    # so views are copied first; the copy is cheap next to the sum itself.
+    if type(message) != bytes: message = bytes(message)
+
+    return sum(message)
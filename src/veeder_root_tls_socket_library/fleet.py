@@ -0,0 +1,183 @@
+# fleet.py - Polls a fleet of TLS automatic tank gauges concurrently using AsyncTlsSocket.
+
+import asyncio
+
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+
+class FleetPoller:
+    """
+    Runs a list of commands against many TLS systems at once and yields the
+    results as each system finishes, rather than waiting for the whole fleet.
+
+    poll() - Async iterator that yields a result dict per TLS system. Iterating
+    over the poller itself does the same thing.
+
+    Each result dict has the following keys:
+
+    host, port - The TLS system the result belongs to.
+
+    success - True if every command returned a response.
+
+    responses - Maps each command to its response, or to the exception raised
+    by that command (e.g. a ValueError for an unsupported command). A command
+    listed more than once for a TLS system is only sent once.
+
+    error - The exception that stopped the TLS system from being polled, such
+    as a connection failure or timeout. None if the system was polled.
+    """
+
+    def __init__(self,
+                 gauges,
+                 concurrency: int = 100,
+                 device_timeout: float = 60.0,
+                 timeout: float = 4.0,
+                 pool = None,
+                 pipeline: bool = False,
+                 observer = None,
+                 socket_class = AsyncTlsSocket):
+        """
+        gauges - An iterable of (host, port, commands) tuples. This is consumed
+        lazily, so a generator can be used for very large fleets.
+
+        concurrency - The maximum amount of TLS systems polled at once.
+
+        device_timeout - The maximum amount of seconds spent on a single TLS
+        system, including connecting and running all of its commands.
+
+        timeout - Passed to each AsyncTlsSocket as its connect/read timeout.
+
+        pool - An optional AsyncTlsSocketPool to lease connections from
+        instead of opening a new connection per TLS system.
+
+        pipeline - Send all of a TLS system's commands in a single write using
+        AsyncTlsSocket.execute_many() instead of one command at a time.
+
+        observer - An optional TlsObserver given to each AsyncTlsSocket the
+        poller opens. Connections leased from a pool use the pool's observer.
+
+        socket_class - The class of the connections the poller opens, e.g.
+        BufferedAsyncTlsSocket. Connections leased from a pool use the pool's
+        socket_class.
+        """
+
+        if concurrency < 1: raise ValueError("Argument 'concurrency' must be at least 1.")
+
+        self.gauges = gauges
+        self.concurrency = concurrency
+        self.device_timeout = device_timeout
+        self.timeout = timeout
+        self.pool = pool
+        self.pipeline = pipeline
+        self.observer = observer
+        self.socket_class = socket_class
+        self._host_locks = {}
+
+    def __aiter__(self):
+        return self.poll()
+
+    async def poll(self):
+        """
+        Polls every TLS system and yields a result dict for each of them in
+        the order they finish.
+        """
+
+        gauges = iter(self.gauges)
+        results = asyncio.Queue(maxsize=self.concurrency)
+
+        workers = [
+            asyncio.create_task(self._worker(gauges, results))
+            for _ in range(0, self.concurrency)
+        ]
+
+        running = len(workers)
+
+        try:
+            while running:
+                result = await results.get()
+
+                # Each worker posts None once it runs out of TLS systems.
+                if result is None:
+                    running -= 1
+                    continue
+
+                if isinstance(result, Exception): raise result
+
+                yield result
+
+        finally:
+            for worker in workers: worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def _worker(self, gauges, results: asyncio.Queue):
+        try:
+            for host, port, commands in gauges:
+                await results.put(await self._poll_gauge(host, port, commands))
+
+        # Surface unexpected errors (such as a malformed gauge tuple) to the
+        # consumer instead of leaving it waiting on this worker forever.
+        except Exception as exception:
+            await results.put(exception)
+
+        else:
+            await results.put(None)
+
+    async def _poll_gauge(self, host: str, port: int, commands) -> dict:
+        result = {
+            "host":      host,
+            "port":      port,
+            "success":   False,
+            "responses": {},
+            "error":     None
+        }
+
+        # Only one command may be in flight per TLS system, so pollers sharing
+        # a host wait on each other rather than opening a second connection.
+        lock = self._host_locks.setdefault((host, port), [asyncio.Lock(), 0])
+        lock[1] += 1
+
+        try:
+            async with lock[0]:
+                await asyncio.wait_for(
+                    self._run_commands(host, port, commands, result["responses"]),
+                    timeout=self.device_timeout
+                )
+
+            result["success"] = not any(
+                isinstance(response, Exception) for response in result["responses"].values()
+            )
+
+        except (asyncio.TimeoutError, OSError, asyncio.IncompleteReadError) as exception:
+            result["error"] = exception
+
+            # The device timeout from wait_for() carries no message of its own.
+            if isinstance(exception, asyncio.TimeoutError) and not exception.args:
+                result["error"] = TimeoutError(
+                    f"[{host}] Polling timed out after {self.device_timeout} seconds."
+                )
+
+        finally:
+            lock[1] -= 1
+            if not lock[1]: del self._host_locks[(host, port)]
+
+        return result
+
+    async def _run_commands(self, host: str, port: int, commands, responses: dict):
+        if self.pool is not None:
+            async with self.pool.lease(host, port) as tls:
+                await self._execute_all(tls, commands, responses)
+
+        else:
+            async with self.socket_class(host, port, self.timeout, self.observer) as tls:
+                await self._execute_all(tls, commands, responses)
+
+    async def _execute_all(self, tls: AsyncTlsSocket, commands, responses: dict):
+        # Responses are keyed by command, so repeats would only be overwritten.
+        commands = list(dict.fromkeys(commands))
+
+        if self.pipeline:
+            responses.update(zip(commands, await tls.execute_many(commands)))
+            return
+
+        for command in commands:
+            try:                          responses[command] = await tls.execute(command)
+            except ValueError as error:   responses[command] = error
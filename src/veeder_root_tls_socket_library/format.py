@@ -1,12 +1,44 @@
 # format.py - A series of utilities used to normalize output from TLS automatic tank gauges.
 
-def _get_timestamp(response: str) -> dict:
+from binascii import unhexlify
+from struct import unpack
+
+# Map the ASCII code of each digit to its value, and every other byte to None,
+# so that fixed-width numbers in bytes responses can be decoded with a lookup
+# per digit instead of a slice and int() per field.
+_DECIMAL_DIGITS = tuple(
+    int(chr(code)) if chr(code) in "0123456789" else None for code in range(0, 256)
+)
+
+_HEX_DIGITS = tuple(
+    int(chr(code), 16) if chr(code) in "0123456789ABCDEFabcdef" else None for code in range(0, 256)
+)
+
+def _get_timestamp(response) -> dict:
     """
     Extracts date and time from a automatic tank gauge command output/response.
 
-    response - Output from the Veeder-Root TLS system.
+    response - Output from the Veeder-Root TLS system, as a string, bytes or
+    memoryview.
     """
 
+    if not type(response) == str:
+        digits = _DECIMAL_DIGITS
+
+        try:
+            return {
+                "year":     digits[response[0]] * 10 + digits[response[1]],
+                "month":    digits[response[2]] * 10 + digits[response[3]],
+                "day":      digits[response[4]] * 10 + digits[response[5]],
+                "hour":     digits[response[6]] * 10 + digits[response[7]],
+                "minute":   digits[response[8]] * 10 + digits[response[9]]
+            }
+
+        # Anything other than two plain digits is left to int(), which allows
+        # surrounding whitespace and raises a ValueError otherwise.
+        except (TypeError, IndexError):
+            response = str(response[0:10], "utf-8")
+
     return {
         "year":     int(response[0:2]),
         "month":    int(response[2:4]),
@@ -36,28 +68,22 @@ def _hex_to_float(hex: str) -> float:
     Convert hexadecimal codes generated by the command responses into IEEE 
     floats.
 
-    hex - An 8 character hexidecimal code stored as a string.
+    hex - An 8 character hexidecimal code stored as a string, bytes or
+    memoryview.
     """
 
-    binary = ""
+    return round(unpack(">f", unhexlify(hex))[0], 5)
 
-    for char in hex:
-        hex_int = int(char, 16)
-        hex_bin = format(hex_int, "04b")
-        binary = binary + str(hex_bin)
-
-    negative_int = int(binary[0], 2)
-    negative = bool(negative_int)
-
-    exponent_int = int(binary[1:9], 2)
-    exponent = 2 ** (exponent_int - 127)
-
-    mantissa_int = int(binary[9:], 2)
-    mantissa_field = 2 ** 23
-    mantissa = 1.0 + (mantissa_int / mantissa_field)
+def _hex_to_floats(hex: str) -> list:
+    """
+    Convert a run of back-to-back hexadecimal codes generated by the command
+    responses into IEEE floats in a single call. This is much faster than
+    calling _hex_to_float() on each code when parsing whole records.
 
-    if negative: exponent = -abs(exponent)
+    hex - A string, bytes or memoryview made up of 8 character hexidecimal
+    codes.
+    """
 
-    decimal = round(exponent * mantissa, 5)
+    values = unpack(f">{len(hex) // 8}f", unhexlify(hex))
 
-    return decimal
\ No newline at end of file
+    return [round(value, 5) for value in values]
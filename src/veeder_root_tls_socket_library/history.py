@@ -0,0 +1,250 @@
+# history.py - Fetches only the history records a TLS system has added since the last poll.
+
+from datetime import date, timedelta
+
+from veeder_root_tls_socket_library.schema import GroupedReport
+from veeder_root_tls_socket_library.tls_3xx import _REPORT_111, _REPORT_119, _REPORT_202, _REPORT_21B
+
+# The most recent deliveries function 21B can be asked for per tank.
+_MAX_21B_DELIVERIES = 99
+
+class HistorySync:
+    """
+    Remembers the newest delivery, alarm and maintenance record seen for each
+    TLS system and tank, and returns only the records added since then. Where
+    a command can be limited to recent records (functions 119 and 21B), only
+    those are requested. Otherwise the whole history is received, but records
+    that were already seen are skipped by their timestamp before they are
+    parsed.
+
+    deliveries() - Returns new deliveries from function 202.
+
+    adjusted_deliveries() - Returns new deliveries from function 21B.
+
+    alarms() - Returns new alarms from function 111.
+
+    maintenance() - Returns new maintenance records from function 119.
+
+    watermarks - The newest timestamp seen per (ip, port, function code, tank
+    number), along with the records seen at that minute. It can be pickled and
+    passed to a later HistorySync to carry on where this one left off.
+
+    Records of a grouped report are returned with the fields of their group
+    header (e.g. the tank number) in front of their own fields, the same way
+    RecordStream yields them.
+    """
+
+    def __init__(self, watermarks: dict = None):
+        """
+        watermarks - The watermarks attribute of an earlier HistorySync.
+        """
+
+        self.watermarks = dict(watermarks) if watermarks else {}
+
+    def deliveries(self, tls, tank: str = "00", compact: bool = False) -> list:
+        """
+        Returns the deliveries from function 202 that have not been seen yet.
+
+        tls - A connected TlsSocket.
+
+        tank - The tank number to fetch deliveries for. "00" means every tank.
+
+        compact - Return each record as a named tuple instead of a dict.
+        """
+
+        response = tls.execute(f"i202{tank}")
+        records, updates, _ = self._scan(tls, "202", _REPORT_202, response, 0, compact)
+        self.watermarks.update(updates)
+
+        return records
+
+    def adjusted_deliveries(self, tls, tank: str = "00", compact: bool = False, page: int = 5) -> list:
+        """
+        Returns the deliveries from function 21B that have not been seen yet.
+        Only the most recent page deliveries per tank are requested at first.
+        If every one of them is new for some tank, more are requested until
+        an already seen delivery is reached or the TLS system has no more.
+
+        tls - A connected TlsSocket.
+
+        tank - The tank number to fetch deliveries for. "00" means every tank.
+
+        compact - Return each record as a named tuple instead of a dict.
+
+        page - The amount of deliveries per tank to request at first.
+        """
+
+        if not 0 < page <= _MAX_21B_DELIVERIES:
+            raise ValueError(f"Argument 'page' must be between 1 and {_MAX_21B_DELIVERIES}.")
+
+        while True:
+            response = tls.execute(f"i21B{tank}{page:02d}")
+            records, updates, exhausted = self._scan(tls, "21B", _REPORT_21B, response, 0, compact, page)
+
+            if not exhausted or page == _MAX_21B_DELIVERIES: break
+
+            page = min(page * 4, _MAX_21B_DELIVERIES)
+
+        self.watermarks.update(updates)
+
+        return records
+
+    def alarms(self, tls, compact: bool = False) -> list:
+        """
+        Returns the alarms from function 111 that have not been seen yet.
+
+        tls - A connected TlsSocket.
+
+        compact - Return each record as a named tuple instead of a dict.
+        """
+
+        response = tls.execute("i11100")
+        records, updates, _ = self._scan(tls, "111", _REPORT_111, response, 10, compact)
+        self.watermarks.update(updates)
+
+        return records
+
+    def maintenance(self, tls, compact: bool = False) -> list:
+        """
+        Returns the maintenance records from function 119 that have not been
+        seen yet. Once a record has been seen, only the days since then are
+        requested. Before that, the TLS system returns its 20 most recent
+        records.
+
+        tls - A connected TlsSocket.
+
+        compact - Return each record as a named tuple instead of a dict.
+        """
+
+        command = "i11900"
+        watermark = self.watermarks.get((tls.ip, tls.port, "119", "00"))
+
+        # Dates are inclusive, and the end date leaves room for a TLS system
+        # whose clock is ahead of ours.
+        if watermark is not None:
+            end = date.today() + timedelta(days=1)
+            command += watermark[0][:6] + end.strftime("%y%m%d")
+
+        response = tls.execute(command)
+        records, updates, _ = self._scan(tls, "119", _REPORT_119, response, 0, compact)
+        self.watermarks.update(updates)
+
+        return records
+
+    def _scan(self,
+              tls,
+              code: str,
+              report,
+              response: str,
+              timestamp_offset: int,
+              compact: bool,
+              page: int = None) -> tuple:
+        """
+        Parses the records of a response that are newer than their watermark.
+        Returns the records, the watermarks to store once the records have
+        been handled, and whether some group had every one of its page records
+        be new, meaning older new records may not have been returned.
+
+        timestamp_offset - Position of the timestamp within each record.
+
+        page - The amount of records requested per group, if limited.
+        """
+
+        gauge = (tls.ip, tls.port, code)
+        record = report.record
+        length = record.length
+        records = []
+        updates = {}
+        exhausted = False
+
+        if isinstance(report, GroupedReport):
+            group_names = [field[0] for field in report.group.fields if field[0] != report.count]
+
+            if compact: parse = record.compact_parser(group_names)
+            else:       parse = record.parser()
+
+            for group_start, records_start, count in report.walk_groups(response):
+                group = report.group.parse(response, group_start)
+                del group[report.count]
+
+                positions = range(records_start, records_start + count * length, length)
+                key = gauge + (group["tank_number"],)
+                new = self._new_records(key, response, positions, length, timestamp_offset, updates)
+
+                if compact:
+                    inherited = list(group.values())
+                    records.extend(parse(response[position:position + length], *inherited) for position in new)
+                else:
+                    records.extend({**group, **parse(response[position:position + length])} for position in new)
+
+                if page is not None and count >= page and len(new) == count: exhausted = True
+
+        else:
+            parse = record.parser(compact)
+            positions = range(report.start, len(response) - length + 1, length)
+
+            # Flat reports with a tank number per record keep a watermark per
+            # tank, e.g. alarms. Others keep a single watermark.
+            tank_field = next((field for field in record.fields if field[0] == "tank_number"), None)
+
+            if tank_field is None:
+                new = self._new_records(gauge + ("00",), response, positions, length, timestamp_offset, updates)
+
+            else:
+                tanks = {}
+                tank_start, tank_end = tank_field[1], tank_field[1] + tank_field[2]
+
+                for position in positions:
+                    tank = response[position + tank_start:position + tank_end]
+                    tanks.setdefault(tank, []).append(position)
+
+                new = []
+
+                for tank, tank_positions in tanks.items():
+                    new.extend(self._new_records(
+                        gauge + (tank,), response, tank_positions, length, timestamp_offset, updates
+                    ))
+
+                new.sort()
+
+            records.extend(parse(response[position:position + length]) for position in new)
+
+        return records, updates, exhausted
+
+    def _new_records(self,
+                     key: tuple,
+                     response: str,
+                     positions,
+                     length: int,
+                     timestamp_offset: int,
+                     updates: dict) -> list:
+        """
+        Returns the position of each record that is newer than the watermark
+        of key, and stores the watermark key should move to in updates.
+        """
+
+        latest, seen = self.watermarks.get(key, ("", frozenset()))
+        newest = latest
+        at_newest = set(seen)
+        new = []
+
+        for position in positions:
+            value = response[position:position + length]
+
+            # Timestamps are YYMMDDHHmm, so they sort the same as strings.
+            moment = value[timestamp_offset:timestamp_offset + 10]
+
+            if moment < latest or (moment == latest and value in seen): continue
+
+            new.append(position)
+
+            if moment > newest:
+                newest = moment
+                at_newest = {value}
+
+            elif moment == newest:
+                at_newest.add(value)
+
+        if new: updates[key] = (newest, frozenset(at_newest))
+
+        return new
@@ -0,0 +1,148 @@
+# observer.py - Hooks for recording how long TLS connections and commands take.
+
+from time import perf_counter
+
+class TlsObserver:
+    """
+    Receives timings and byte counts from TlsSocket and AsyncTlsSocket. Pass
+    an instance to either socket as its observer and override the methods you
+    need; the default methods do nothing. Sockets without an observer skip all
+    of this bookkeeping.
+
+    on_connect() - Called after each connection attempt.
+
+    on_command() - Called after each command, whether or not it succeeded.
+
+    Observers are called on the thread or event loop running the socket, so
+    they should return quickly, e.g. by updating metrics rather than writing
+    to a database.
+    """
+
+    def on_connect(self, event: dict):
+        """
+        Called after each connection attempt with a dict that has these keys:
+
+        host, port - The TLS system connected to.
+
+        connect_time - Seconds taken to connect, or to fail to.
+
+        error - The exception raised if the connection failed, otherwise None.
+        """
+
+    def on_command(self, event: dict):
+        """
+        Called after each command with a dict that has these keys:
+
+        host, port - The TLS system the command was sent to.
+
+        command - The command that was sent.
+
+        time_to_first_byte - Seconds from sending the command until the first
+        byte of the response arrived. None if no response arrived, or if it
+        could not be measured (e.g. for pipelined commands).
+
+        total_time - Seconds from sending the command until it completed.
+
+        bytes_sent - Bytes written for the command, including framing.
+
+        bytes_received - Bytes of the response, including framing.
+
+        chunks - The amount of reads it took to receive the response. None if
+        it could not be measured (e.g. for pipelined commands).
+
+        checksum_time - Seconds spent verifying the checksum and extracting
+        the response data. None if the response never arrived.
+
+        error - The exception raised by the command, otherwise None.
+
+        frame - The response as it was received, from the start of header
+        through the end of transmission, or None if it never arrived. It may
+        be a memoryview into the receive buffer of the socket, so it is only
+        valid during the call; use bytes() on it to keep a copy.
+        """
+
+class MetricsObserver(TlsObserver):
+    """
+    Keeps running totals of every event, which is enough to feed counters and
+    histograms in a metrics exporter such as Prometheus.
+
+    snapshot() - Returns a copy of the totals collected so far.
+
+    reset() - Clears the totals.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the totals.
+        """
+
+        self.connections = 0
+        self.connection_errors = 0
+        self.connect_time = 0.0
+        self.commands = 0
+        self.command_errors = 0
+        self.time_to_first_byte = 0.0
+        self.total_time = 0.0
+        self.checksum_time = 0.0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.chunks = 0
+
+    def snapshot(self) -> dict:
+        """
+        Returns a copy of the totals collected so far.
+        """
+
+        return dict(vars(self))
+
+    def on_connect(self, event: dict):
+        self.connections += 1
+        self.connect_time += event["connect_time"]
+
+        if event["error"] is not None: self.connection_errors += 1
+
+    def on_command(self, event: dict):
+        self.commands += 1
+        self.total_time += event["total_time"]
+        self.bytes_sent += event["bytes_sent"]
+        self.bytes_received += event["bytes_received"]
+
+        if event["error"] is not None:              self.command_errors += 1
+        if event["time_to_first_byte"] is not None: self.time_to_first_byte += event["time_to_first_byte"]
+        if event["checksum_time"] is not None:      self.checksum_time += event["checksum_time"]
+        if event["chunks"] is not None:             self.chunks += event["chunks"]
+
+def _command_event(host: str,
+                   port: int,
+                   command: str,
+                   bytes_sent: int,
+                   bytes_received: int,
+                   started: float,
+                   first_byte: float,
+                   checked: float,
+                   chunks: int,
+                   error: Exception,
+                   frame = None) -> dict:
+    """
+    Builds the dict passed to TlsObserver.on_command(). Times are
+    perf_counter() readings, or None for steps that were never reached.
+    """
+
+    finished = perf_counter()
+
+    return {
+        "host":               host,
+        "port":               port,
+        "command":            command,
+        "time_to_first_byte": None if first_byte is None else first_byte - started,
+        "total_time":         finished - started,
+        "bytes_sent":         bytes_sent,
+        "bytes_received":     bytes_received,
+        "chunks":             chunks,
+        "checksum_time":      None if checked is None else finished - checked,
+        "error":              error,
+        "frame":              frame
+    }
@@ -0,0 +1,274 @@
+# parsing.py - Finds the tls_3xx parser for a response, and runs parsers off the event loop.
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import asyncio
+import atexit
+import inspect
+import weakref
+
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.protocol import check_frame
+
+# Every tls_3xx parser function by function code, along with the names of the
+# options it accepts, so that dispatching a response costs one dict lookup.
+_PARSERS = {
+    name[len("function_"):].upper(): (function, frozenset(inspect.signature(function).parameters))
+    for name, function in vars(tls_3xx).items()
+    if name.startswith("function_")
+}
+
+# The options at least one parser accepts. Any other option is a mistake
+# rather than one meant for a different parser.
+_OPTIONS = frozenset().union(*(options for _, options in _PARSERS.values())) - {"response"}
+
+def get_parser(code: str) -> callable:
+    """
+    Returns the tls_3xx parser function for a function code.
+
+    code - The function code, e.g. "201", or a command such as "i20100".
+    """
+
+    return _lookup(code)[0]
+
+def parse(frame, **kwargs):
+    """
+    Verifies a full response and parses it with the tls_3xx function for the
+    function code it echoes back, straight from the bytes it was received in.
+
+    frame - Bytes, bytearray or memoryview of the response, from the start of
+    header through the end of transmission.
+
+    kwargs - Passed through to the parser, e.g. compact=True. Options that
+    the parser doesn't take (such as compact for function 602) are left out,
+    so the same options can be used for any command. A TypeError is raised
+    for options that no parser takes.
+    """
+
+    data = check_frame(frame)
+
+    return _parse_echoed(memoryview(frame)[1:7], data, kwargs)
+
+def _check_options(kwargs: dict):
+    """
+    Raises a TypeError if any of the options isn't taken by any parser, e.g.
+    because of a typo.
+
+    kwargs - The options, as passed to parse().
+    """
+
+    unknown = sorted(set(kwargs) - _OPTIONS)
+    if unknown: raise TypeError(f"No parser takes the option '{unknown[0]}'.")
+
+def _lookup(code: str) -> tuple:
+    if len(code) > 3: code = code[1:4]
+
+    entry = _PARSERS.get(code.upper())
+    if entry is None: raise ValueError(f"No parser exists for function code '{code}'.")
+
+    return entry
+
+def _parse_echoed(echo, data, kwargs: dict):
+    """
+    Parses response data with the parser for the command echoed back in the
+    response header.
+
+    echo - The echoed command, e.g. b"i20100", as bytes or a memoryview.
+
+    data - The response data, without the header, checksum or end of
+    transmission.
+    """
+
+    parser, options = _lookup(str(echo, "utf-8"))
+
+    if kwargs and not options.issuperset(kwargs):
+        _check_options(kwargs)
+        kwargs = {name: value for name, value in kwargs.items() if name in options}
+
+    return parser(data, **kwargs)
+
+class ParserPool:
+    """
+    Parses responses in a process or thread pool so that large reports don't
+    block the event loop, and with it the I/O of every other TLS system being
+    polled. Small responses are gathered into batches that are sent to the
+    pool together, as the cost of handing a small response to another process
+    is greater than the cost of parsing it.
+
+    parse() - Parses a response in the pool and returns the result.
+
+    close() - Shuts down the pool if it was created by this ParserPool.
+
+    A process pool is used by default, which lets parsing use more than one
+    CPU core. A thread pool keeps the event loop responsive without the cost
+    of copying responses and results between processes, but only uses one
+    core at a time.
+    """
+
+    def __init__(self,
+                 executor = None,
+                 processes: bool = True,
+                 max_workers: int = None,
+                 batch_size: int = 64,
+                 batch_delay: float = 0.002,
+                 batch_limit: int = 4096):
+        """
+        executor - An existing concurrent.futures executor to parse in. If not
+        given, one is created and shut down by close().
+
+        processes - Create a ProcessPoolExecutor rather than a
+        ThreadPoolExecutor when no executor is given.
+
+        max_workers - Passed to the executor that is created.
+
+        batch_size - The most responses sent to the pool together.
+
+        batch_delay - Seconds to wait for more small responses before sending
+        a batch that isn't full.
+
+        batch_limit - Responses at least this long are sent to the pool on
+        their own rather than in a batch.
+        """
+
+        if batch_size < 1: raise ValueError("Argument 'batch_size' must be at least 1.")
+
+        self._owns_executor = executor is None
+
+        if executor is not None: self.executor = executor
+        elif processes:          self.executor = ProcessPoolExecutor(max_workers)
+        else:                    self.executor = ThreadPoolExecutor(max_workers)
+
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.batch_limit = batch_limit
+        self._batch = []
+        self._flush_handle = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def parse(self, code: str, response: str, **kwargs):
+        """
+        Parses a response in the pool and returns what the parser function
+        returns, or raises what it raises.
+
+        code - The function code, e.g. "201", or a command such as "i20100".
+
+        response - The response data, as returned by execute().
+
+        kwargs - Passed through to the parser, e.g. compact=True.
+        """
+
+        get_parser(code)
+
+        loop = asyncio.get_running_loop()
+
+        if len(response) >= self.batch_limit or self.batch_size == 1:
+            return await loop.run_in_executor(self.executor, _parse, code, response, kwargs)
+
+        future = loop.create_future()
+        self._batch.append((future, (code, response, kwargs)))
+
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_delay, self._flush)
+
+        return await future
+
+    async def close(self):
+        """
+        Sends any waiting responses to the pool, then shuts the pool down if
+        it was created by this ParserPool.
+        """
+
+        self._flush()
+
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._batch: return
+
+        batch, self._batch = self._batch, []
+        futures = [future for future, _ in batch]
+
+        task = asyncio.get_running_loop().run_in_executor(
+            self.executor, _parse_batch, [item for _, item in batch]
+        )
+
+        task.add_done_callback(lambda task: _resolve(futures, task))
+
+async def parse_async(code: str, response: str, **kwargs):
+    """
+    Parses a response without blocking the event loop, using a process pool
+    shared by every caller that is created the first time it is needed and
+    shut down when the interpreter exits. Responses are batched per event
+    loop, so this can be used from more than one asyncio.run().
+
+    code - The function code, e.g. "201", or a command such as "i20100".
+
+    response - The response data, as returned by execute().
+
+    kwargs - Passed through to the parser, e.g. compact=True.
+    """
+
+    global _default_executor
+
+    loop = asyncio.get_running_loop()
+    pool = _default_pools.get(loop)
+
+    if pool is None:
+        if _default_executor is None:
+            _default_executor = ProcessPoolExecutor()
+            atexit.register(_default_executor.shutdown)
+
+        pool = _default_pools[loop] = ParserPool(_default_executor)
+
+    return await pool.parse(code, response, **kwargs)
+
+# A ParserPool schedules its batches on the loop it was first used from, so
+# each loop gets its own, while the worker processes are shared.
+_default_executor = None
+_default_pools = weakref.WeakKeyDictionary()
+
+def _parse(code: str, response: str, kwargs: dict):
+    return get_parser(code)(response, **kwargs)
+
+def _parse_batch(items: list) -> list:
+    """
+    Parses several responses in one call, returning a (succeeded, result)
+    tuple for each so that one bad response doesn't fail the whole batch.
+    """
+
+    results = []
+
+    for code, response, kwargs in items:
+        try:                         results.append((True, _parse(code, response, kwargs)))
+        except Exception as error:   results.append((False, error))
+
+    return results
+
+def _resolve(futures: list, task: asyncio.Future):
+    if task.cancelled():
+        for future in futures:
+            if not future.done(): future.cancel()
+        return
+
+    if task.exception() is not None:
+        for future in futures:
+            if not future.done(): future.set_exception(task.exception())
+        return
+
+    for future, (succeeded, result) in zip(futures, task.result()):
+        if future.done(): continue
+
+        if succeeded: future.set_result(result)
+        else:         future.set_exception(result)
@@ -0,0 +1,386 @@
+# pool.py - Connection pools that keep TLS socket connections warm between commands.
+
+from contextlib import asynccontextmanager, contextmanager
+from time import monotonic
+import asyncio
+import select
+import threading
+
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.socket import ResponseTimeoutError, TlsSocket
+
+# Errors raised when the TLS system or a serial-to-Ethernet bridge has dropped
+# the connection. These are retried once on a fresh connection.
+_BROKEN_CONNECTION_ERRORS = (ConnectionError, asyncio.IncompleteReadError)
+
+def _is_inquiry(command) -> bool:
+    # Only inquiry commands are safe to send twice; setup and control commands
+    # change the TLS system.
+    return type(command) == str and command[:1] in ("i", "I")
+
+class _PoolEntry:
+    """
+    Holds the pooled connection for a single (host, port) pair along with the
+    lock that grants exclusive use of it.
+    """
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.tls = None
+        self.last_used = monotonic()
+
+class TlsSocketPool:
+    """
+    Keeps one warm TlsSocket connection per (ip, port) pair. Connections are
+    leased to a single caller at a time, as most TLS systems and their
+    serial-to-Ethernet bridges only accept one client at a time.
+
+    lease() - Context manager that grants exclusive use of a connection.
+
+    execute() - Leases a connection and executes a command on it, reconnecting
+    once if the connection turns out to be broken.
+
+    evict_idle() - Closes connections that have not been used recently.
+
+    close() - Closes every pooled connection.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0, observer = None):
+        """
+        idle_timeout - The amount of seconds a connection may sit unused
+        before it is closed by the pool.
+
+        observer - An optional TlsObserver given to each pooled TlsSocket.
+        """
+
+        self.idle_timeout = idle_timeout
+        self.observer = observer
+        self._entries = {}
+        self._entries_lock = threading.Lock()
+        self._last_eviction = monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @contextmanager
+    def lease(self, ip: str, port: int):
+        """
+        Grants exclusive use of the pooled connection for a TLS system,
+        opening or replacing it if it is missing or no longer healthy.
+
+        ip - IP address of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+        """
+
+        self._maybe_evict_idle()
+
+        entry = self._get_entry(ip, port)
+
+        with entry.lock:
+            if entry.tls is None or not self._is_healthy(entry.tls):
+                self._reconnect(entry, ip, port)
+
+            try:
+                yield entry.tls
+
+            # Protocol errors leave the connection usable, anything else may
+            # leave unread data on the wire so the connection is dropped. A
+            # response that timed out may still arrive after the next command
+            # is sent, so those connections are dropped too.
+            except ResponseTimeoutError:
+                self._discard(entry)
+                raise
+
+            except ValueError:
+                raise
+
+            except BaseException:
+                self._discard(entry)
+                raise
+
+            finally:
+                entry.last_used = monotonic()
+
+    def execute(self, ip: str, port: int, command: str, **kwargs) -> str:
+        """
+        Executes a command using the pooled connection for a TLS system. If
+        the connection was dropped by the other end, it is reopened and the
+        command is sent once more. Setup and control commands are only sent
+        again if the connection failed before they were sent, as the TLS
+        system may have received them already.
+
+        ip - IP address of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+
+        command - The function code you would like to execute.
+
+        kwargs - Passed through to TlsSocket.execute().
+        """
+
+        sent = False
+
+        try:
+            with self.lease(ip, port) as tls:
+                sent = True
+                return tls.execute(command, **kwargs)
+
+        except _BROKEN_CONNECTION_ERRORS:
+            if sent and not _is_inquiry(command): raise
+
+            with self.lease(ip, port) as tls:
+                return tls.execute(command, **kwargs)
+
+    def evict_idle(self):
+        """
+        Closes connections that have been idle for longer than idle_timeout.
+        Connections that are currently leased are left alone.
+        """
+
+        now = monotonic()
+
+        with self._entries_lock:
+            entries = list(self._entries.values())
+
+        for entry in entries:
+            if now - entry.last_used < self.idle_timeout: continue
+            if not entry.lock.acquire(blocking=False): continue
+
+            try:     self._discard(entry)
+            finally: entry.lock.release()
+
+        self._last_eviction = now
+
+    def close(self):
+        """
+        Closes every pooled connection.
+        """
+
+        with self._entries_lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+
+        for entry in entries:
+            with entry.lock:
+                self._discard(entry)
+
+    def _get_entry(self, ip: str, port: int) -> _PoolEntry:
+        with self._entries_lock:
+            entry = self._entries.get((ip, port))
+
+            if entry is None:
+                entry = _PoolEntry(threading.Lock())
+                self._entries[(ip, port)] = entry
+
+            return entry
+
+    def _maybe_evict_idle(self):
+        if monotonic() - self._last_eviction >= self.idle_timeout / 2:
+            self.evict_idle()
+
+    def _reconnect(self, entry: _PoolEntry, ip: str, port: int):
+        # Close the old connection first, since the TLS system may refuse a
+        # second client while the first is still open.
+        self._discard(entry)
+        entry.tls = TlsSocket(ip, port, self.observer)
+
+    def _discard(self, entry: _PoolEntry):
+        if entry.tls is None: return
+
+        try:               entry.tls.close()
+        except OSError:    pass
+        finally:           entry.tls = None
+
+    def _is_healthy(self, tls: TlsSocket) -> bool:
+        """
+        An idle connection should never be readable. If it is, the other end
+        has either closed it or left stray data that would corrupt the next
+        response.
+        """
+
+        try:
+            readable, _, _ = select.select([tls.socket], [], [], 0)
+
+        except (OSError, ValueError):
+            return False
+
+        return not readable
+
+class AsyncTlsSocketPool:
+    """
+    Keeps one warm AsyncTlsSocket connection per (host, port) pair.
+    Connections are leased to a single coroutine at a time, as most TLS
+    systems and their serial-to-Ethernet bridges only accept one client at
+    a time.
+
+    lease() - Async context manager that grants exclusive use of a connection.
+
+    execute() - Leases a connection and executes a command on it, reconnecting
+    once if the connection turns out to be broken.
+
+    evict_idle() - Closes connections that have not been used recently.
+
+    close() - Closes every pooled connection.
+    """
+
+    def __init__(self,
+                 idle_timeout: float = 60.0,
+                 timeout: float = 4.0,
+                 observer = None,
+                 socket_class = AsyncTlsSocket):
+        """
+        idle_timeout - The amount of seconds a connection may sit unused
+        before it is closed by the pool.
+
+        timeout - Passed to each AsyncTlsSocket as its connect/read timeout.
+
+        observer - An optional TlsObserver given to each pooled AsyncTlsSocket.
+
+        socket_class - The class of the pooled connections, e.g.
+        BufferedAsyncTlsSocket.
+        """
+
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self.observer = observer
+        self.socket_class = socket_class
+        self._entries = {}
+        self._last_eviction = monotonic()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    @asynccontextmanager
+    async def lease(self, host: str, port: int = 10001):
+        """
+        Grants exclusive use of the pooled connection for a TLS system,
+        opening or replacing it if it is missing or no longer healthy.
+
+        host - IP address or hostname of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+        """
+
+        await self._maybe_evict_idle()
+
+        entry = self._entries.get((host, port))
+
+        if entry is None:
+            entry = _PoolEntry(asyncio.Lock())
+            self._entries[(host, port)] = entry
+
+        async with entry.lock:
+            if entry.tls is None or not self._is_healthy(entry.tls):
+                await self._reconnect(entry, host, port)
+
+            try:
+                yield entry.tls
+
+            # Protocol errors leave the connection usable, anything else
+            # (including timeouts and cancellation) may leave unread data on
+            # the wire so the connection is dropped.
+            except ValueError:
+                raise
+
+            except BaseException:
+                await self._discard(entry)
+                raise
+
+            finally:
+                entry.last_used = monotonic()
+
+    async def execute(self, host: str, port: int, command: str, **kwargs) -> str:
+        """
+        Executes a command using the pooled connection for a TLS system. If
+        the connection was dropped by the other end, it is reopened and the
+        command is sent once more. Setup and control commands are only sent
+        again if the connection failed before they were sent, as the TLS
+        system may have received them already.
+
+        host - IP address or hostname of the TLS system.
+
+        port - Port number used to connect to the TLS system.
+
+        command - The function code you would like to execute.
+
+        kwargs - Passed through to AsyncTlsSocket.execute().
+        """
+
+        sent = False
+
+        try:
+            async with self.lease(host, port) as tls:
+                sent = True
+                return await tls.execute(command, **kwargs)
+
+        except _BROKEN_CONNECTION_ERRORS:
+            if sent and not _is_inquiry(command): raise
+
+            async with self.lease(host, port) as tls:
+                return await tls.execute(command, **kwargs)
+
+    async def evict_idle(self):
+        """
+        Closes connections that have been idle for longer than idle_timeout.
+        Connections that are currently leased are left alone.
+        """
+
+        now = monotonic()
+        self._last_eviction = now
+
+        for entry in list(self._entries.values()):
+            if now - entry.last_used < self.idle_timeout: continue
+            if entry.lock.locked(): continue
+
+            async with entry.lock:
+                await self._discard(entry)
+
+    async def close(self):
+        """
+        Closes every pooled connection.
+        """
+
+        entries = list(self._entries.values())
+        self._entries.clear()
+
+        for entry in entries:
+            async with entry.lock:
+                await self._discard(entry)
+
+    async def _maybe_evict_idle(self):
+        if monotonic() - self._last_eviction >= self.idle_timeout / 2:
+            await self.evict_idle()
+
+    async def _reconnect(self, entry: _PoolEntry, host: str, port: int):
+        # Close the old connection first, since the TLS system may refuse a
+        # second client while the first is still open.
+        await self._discard(entry)
+
+        tls = self.socket_class(host, port, self.timeout, self.observer)
+        await tls.connect()
+        entry.tls = tls
+
+    async def _discard(self, entry: _PoolEntry):
+        if entry.tls is None: return
+
+        tls = entry.tls
+        entry.tls = None
+
+        try:            await tls.close()
+        except OSError: pass
+
+    def _is_healthy(self, tls: AsyncTlsSocket) -> bool:
+        """
+        A connection is unusable once the other end has closed it or the
+        transport is shutting down. An idle connection should never have
+        unread data either, as it would corrupt the next response.
+        """
+
+        return tls._is_open() and not tls._has_unread()
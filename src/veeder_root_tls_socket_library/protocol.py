@@ -0,0 +1,233 @@
+# protocol.py - Frames commands and verifies responses for TLS automatic tank gauges
+# without doing any I/O, so that every socket shares one implementation.
+
+from veeder_root_tls_socket_library.checksum import verify_checksum
+
+SOH = b"\x01"
+ETX = b"\x03"
+
+# Sent back in place of a response when the TLS system doesn't support a
+# command. It has no echoed command and no checksum.
+ERROR_RESPONSE = b"\x019999FF1B"
+
+# The shortest computer format response: start of header, echoed command,
+# checksum separator, checksum and end of transmission.
+_MIN_FRAME_LENGTH = 14
+
+# Starting size of the buffer of each FrameReader. It doubles whenever a
+# response doesn't fit and keeps its size for later responses.
+_INITIAL_BUFFER_SIZE = 4096
+
+# The least free space offered for each read.
+_MIN_READ_SIZE = 4096
+
+def encode_command(command: str) -> bytes:
+    """
+    Frames a command to be sent to the TLS system.
+
+    command - The function code to send, e.g. "i20100".
+    """
+
+    # The trailing newline fixes an error when executing command i72E.
+    return SOH + bytes(command, "utf-8") + b"\r\n"
+
+def check_frame(frame) -> memoryview:
+    """
+    Verifies a computer format response and returns a memoryview of its data,
+    without the start of header, echoed command, checksum or end of
+    transmission. Raises a ValueError if the TLS system returned its generic
+    error, or if the checksum is missing or doesn't match.
+
+    frame - Bytes, bytearray or memoryview of the response, from the start of
+    header through the end of transmission.
+    """
+
+    view = memoryview(frame)
+
+    # Validate that the generic error was not returned.
+    if _is_error(view):
+        raise ValueError("Unsupported command for this server.")
+
+    # Validate that the checksum is present and valid.
+    if len(view) < _MIN_FRAME_LENGTH or view[-7:-5] != b"&&":
+        raise ValueError("Checksum missing from command response.")
+
+    if not verify_checksum(view):
+        raise ValueError("Data integrity invalidated due to invalid checksum.")
+
+    return view[7:-7]
+
+def display_text(frame) -> str:
+    """
+    Returns the text of a display format response, which has no checksum.
+    Raises a ValueError if the TLS system returned its generic error.
+
+    frame - Bytes, bytearray or memoryview of the response, from the start of
+    header through the end of transmission.
+    """
+
+    view = memoryview(frame)
+
+    if _is_error(view):
+        raise ValueError("Unsupported command for this server.")
+
+    # Removes SOH and ETX from being shown in output.
+    response = str(view[1:-1], "utf-8")
+
+    # Checks for and removes newlines at both ends of output.
+    if response[:4]  == "\r\n\r\n": response = response[4:]
+    if response[-4:] == "\r\n\r\n": response = response[:-4]
+
+    return response
+
+def _is_error(view: memoryview) -> bool:
+    # The generic error is shorter than any real response, so only short
+    # frames need to be searched for it.
+    if view[:9] == ERROR_RESPONSE: return True
+
+    return len(view) <= _MIN_FRAME_LENGTH and ERROR_RESPONSE in bytes(view)
+
+class FrameReader:
+    """
+    Collects bytes from any transport as they arrive and splits them into
+    complete responses at each end of transmission. It does no I/O itself,
+    so the same reader is used by every socket and can be driven by hand,
+    e.g. in tests and benchmarks.
+
+    feed() - Adds received bytes to the reader.
+
+    get_buffer() and buffer_updated() - Let a transport receive straight into
+    the reader instead, the same as asyncio.BufferedProtocol.
+
+    next_frame() - Returns the next complete response, if there is one.
+
+    next_response() - Returns the verified data of the next complete
+    response, if there is one.
+
+    pending() - Returns what was received after the last complete response.
+
+    reset() - Discards everything received so far.
+
+    Responses are returned as memoryviews into the buffer of the reader, so
+    they are only valid until more data is received; use bytes() on them to
+    keep a copy.
+    """
+
+    def __init__(self, etx: bytes = ETX, initial_size: int = _INITIAL_BUFFER_SIZE):
+        """
+        etx - The end of transmission the TLS system ends responses with.
+
+        initial_size - Starting size of the receive buffer.
+        """
+
+        self.etx = etx
+
+        self._buffer = bytearray(initial_size)
+        self._start = 0  # Start of the response being received.
+        self._end = 0    # End of the data received so far.
+        self._scan = 0   # Where to continue looking for the end of transmission.
+
+    def pending(self) -> memoryview:
+        """
+        Returns a memoryview of the bytes received that aren't part of a
+        response returned yet, e.g. a response cut short by the connection
+        closing.
+        """
+
+        return memoryview(self._buffer)[self._start:self._end]
+
+    def feed(self, data):
+        """
+        Adds received bytes to the reader.
+
+        data - Bytes, bytearray or memoryview of what was received.
+        """
+
+        self.get_buffer(len(data))[:len(data)] = data
+        self._end += len(data)
+
+    def get_buffer(self, sizehint: int = -1) -> memoryview:
+        """
+        Returns a writable memoryview of the free space after the data
+        received so far. Call buffer_updated() with the amount of bytes
+        written into it.
+
+        sizehint - The least amount of free space wanted.
+        """
+
+        buffer = self._buffer
+
+        # Start over at the front once every response has been returned.
+        if self._start == self._end: self._start = self._end = self._scan = 0
+
+        needed = max(sizehint, _MIN_READ_SIZE)
+
+        if len(buffer) - self._end < needed:
+            pending = self._end - self._start
+
+            # Move the partial response to the front, and only allocate a
+            # bigger buffer if that doesn't free up enough space. Views handed
+            # out earlier stop the buffer from being resized in place.
+            if len(buffer) - pending < needed:
+                size = len(buffer) or _INITIAL_BUFFER_SIZE
+                while size - pending < needed: size *= 2
+
+                grown = bytearray(size)
+                grown[:pending] = buffer[self._start:self._end]
+                self._buffer = buffer = grown
+
+            elif pending:
+                buffer[:pending] = buffer[self._start:self._end]
+
+            self._scan -= self._start
+            self._start = 0
+            self._end = pending
+
+        return memoryview(buffer)[self._end:]
+
+    def buffer_updated(self, nbytes: int):
+        """
+        Records that bytes were written into the view from get_buffer().
+
+        nbytes - The amount of bytes written.
+        """
+
+        self._end += nbytes
+
+    def next_frame(self) -> memoryview:
+        """
+        Returns a memoryview of the next complete response, from the start of
+        header through the end of transmission, or None if the end of
+        transmission hasn't been received yet.
+        """
+
+        etx = self.etx
+        position = self._buffer.find(etx, self._scan, self._end)
+
+        if position == -1:
+            self._scan = max(self._end - len(etx) + 1, self._start)
+            return None
+
+        start = self._start
+        self._start = self._scan = position + len(etx)
+
+        return memoryview(self._buffer)[start:self._start]
+
+    def next_response(self) -> memoryview:
+        """
+        Returns the data of the next complete response as check_frame() does,
+        or None if the end of transmission hasn't been received yet.
+        """
+
+        frame = self.next_frame()
+        if frame is None: return None
+
+        return check_frame(frame)
+
+    def reset(self):
+        """
+        Discards everything received so far, e.g. a late response to a
+        command that timed out.
+        """
+
+        self._start = self._end = self._scan = 0
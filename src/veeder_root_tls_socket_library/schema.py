@@ -0,0 +1,819 @@
+# schema.py - Declarative layouts for TLS command responses, compiled into fast parsers.
+
+from collections import namedtuple
+
+from veeder_root_tls_socket_library.format import _DECIMAL_DIGITS, _HEX_DIGITS, _hex_to_float, _hex_to_floats
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Field types. Every field is declared as a (name, offset, width, type) tuple.
+INT   = "int"   # Decimal integer.
+HEX   = "hex"   # Hexadecimal integer.
+FLOAT = "float" # 8 character ASCII hex IEEE float.
+STR   = "str"   # String, kept exactly as sent.
+TEXT  = "text"  # String with surrounding whitespace removed.
+
+_TYPES = (INT, HEX, FLOAT, STR, TEXT)
+
+_TIMESTAMP_FIELDS = ("year", "month", "day", "hour", "minute")
+
+# The types a response, or a chunk of one, may be given as.
+_CHUNK_TYPES = (str, bytes, bytearray, memoryview)
+
+# Maps the ASCII code of each decimal and hex digit to its value, so that
+# whole columns of digits can be converted with a single lookup.
+if numpy is not None:
+    _DIGITS = numpy.zeros(256, dtype=numpy.uint8)
+
+    for index, character in enumerate(b"0123456789ABCDEF"): _DIGITS[character] = index
+    for index, character in enumerate(b"abcdef"):           _DIGITS[character] = index + 10
+
+def timestamp(offset: int, prefix: str = "") -> list:
+    """
+    Declares the YYMMDDHHmm fields that appear throughout TLS responses.
+
+    offset - Position of the first year digit within the record.
+
+    prefix - Prepended to each field name, e.g. "start_" for "start_year".
+    """
+
+    return [
+        (f"{prefix}{name}", offset + index * 2, 2, INT)
+        for index, name in enumerate(("year", "month", "day", "hour", "minute"))
+    ]
+
+def floats(offset: int, names) -> list:
+    """
+    Declares a run of back-to-back IEEE float fields.
+
+    offset - Position of the first float within the record.
+
+    names - The name of each float, in the order they are sent.
+    """
+
+    return [(name, offset + index * 8, 8, FLOAT) for index, name in enumerate(names)]
+
+class _CompactRecord(tuple):
+    """
+    Base class of the named tuple types returned in compact mode.
+
+    to_dict() - Returns the record as the dict the default mode would return.
+    """
+
+    __slots__ = ()
+
+    def to_dict(self) -> dict:
+        return dict(zip(self._fields, self))
+
+    def __reduce__(self):
+        # Record types are created at runtime, so they are rebuilt by name and
+        # field list when unpickled rather than looked up as a module attribute.
+        return (_rebuild_record, (type(self).__name__, self._fields, tuple(self)))
+
+_record_types = {}
+
+def record_type(name: str, field_names) -> type:
+    """
+    Returns the named tuple type used for compact records. Types are cached so
+    that layouts with the same name and fields share a single type.
+
+    name - The name of the type, e.g. "TankInventory".
+
+    field_names - The name of each field, in order.
+    """
+
+    key = (name, tuple(field_names))
+
+    if key not in _record_types:
+        base = namedtuple(name, key[1])
+        _record_types[key] = type(name, (_CompactRecord, base), {"__slots__": ()})
+
+    return _record_types[key]
+
+def _rebuild_record(name: str, field_names, values):
+    return record_type(name, field_names)(*values)
+
+def _compile(fields, compact_type: type = None, fallback: callable = None) -> callable:
+    """
+    Generates a function that takes the text of a single record and returns
+    a dict of its fields. Every slice offset is baked into the generated code
+    and each run of adjacent floats is decoded with a single call, so parsing
+    a record does no per-field lookups or type dispatch at runtime.
+
+    fields - The (name, offset, width, type) tuples making up the record.
+
+    compact_type - If set, the generated function returns an instance of this
+    type instead of a dict. Any extra positional arguments passed to it are
+    used as the leading fields of the instance.
+
+    fallback - If set, the generated function takes the record as bytes or a
+    memoryview instead of a string. Numbers are decoded straight from the
+    bytes with a table lookup per digit, and only string fields are decoded
+    to text. Records that can't be decoded this way, e.g. numbers padded with
+    spaces, are decoded whole and passed to fallback, the string parser of
+    the same record, so both parsers always give the same result.
+    """
+
+    binary = fallback is not None
+
+    # Group adjacent float fields into runs that can be decoded together.
+    runs = []
+
+    for name, offset, width, kind in sorted(fields, key=lambda field: field[1]):
+        if kind != FLOAT: continue
+
+        if runs and runs[-1][-1][1] + 8 == offset: runs[-1].append((name, offset))
+        else:                                      runs.append([(name, offset)])
+
+    lines = []
+    float_values = {}
+
+    for index, run in enumerate(runs):
+        start = run[0][1]
+        end = run[-1][1] + 8
+
+        if len(run) == 1:
+            lines.append(f"f{index} = _hex_to_float(value[{start}:{end}])")
+            float_values[run[0][0]] = f"f{index}"
+            continue
+
+        lines.append(f"f{index} = _hex_to_floats(value[{start}:{end}])")
+
+        for position, (name, _) in enumerate(run):
+            float_values[name] = f"f{index}[{position}]"
+
+    expressions = []
+
+    for name, offset, width, kind in fields:
+        text = f"value[{offset}:{offset + width}]"
+
+        if binary and kind in (INT, HEX):
+            table, base = ("_decimal", 10) if kind == INT else ("_hex", 16)
+
+            # Every digit is multiplied, even by 1, so that a byte that isn't
+            # a digit (None in the table) always raises a TypeError.
+            expression = " + ".join(
+                f"{table}[value[{offset + position}]] * {base ** (width - position - 1)}"
+                for position in range(0, width)
+            )
+
+        elif binary and kind in (STR, TEXT):
+            expression = f"_str({text}, 'utf-8')"
+            if kind == TEXT: expression += ".strip()"
+
+        elif kind == INT:   expression = f"int({text})"
+        elif kind == HEX:   expression = f"int({text}, 16)"
+        elif kind == FLOAT: expression = float_values[name]
+        elif kind == TEXT:  expression = f"{text}.strip()"
+        else:               expression = text
+
+        expressions.append((name, expression))
+
+    if compact_type is None:
+        signature = "value"
+        result = "{" + ", ".join(f"{name!r}: {value}" for name, value in expressions) + "}"
+    else:
+        signature = "value, *inherited"
+        result = "_new(_type, (*inherited, " + ", ".join(value for _, value in expressions) + "))"
+
+    body = lines + [f"return {result}"]
+
+    if binary:
+        source = f"def parse({signature}):\n    try:\n"
+        source += "".join(f"        {line}\n" for line in body)
+        source += "    except (TypeError, ValueError, IndexError):\n"
+        source += f"        return _fallback(_str(value, 'utf-8'){', *inherited' if compact_type else ''})\n"
+    else:
+        source = f"def parse({signature}):\n"
+        source += "".join(f"    {line}\n" for line in body)
+
+    namespace = {
+        "_hex_to_float":  _hex_to_float,
+        "_hex_to_floats": _hex_to_floats,
+        "_decimal":       _DECIMAL_DIGITS,
+        "_hex":           _HEX_DIGITS,
+        "_str":           str,
+        "_new":           tuple.__new__,
+        "_type":          compact_type,
+        "_fallback":      fallback
+    }
+
+    exec(source, namespace)
+
+    return namespace["parse"]
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError("NumPy is required for columnar output. Install it with 'pip install numpy'.")
+
+def _encode(response):
+    """
+    Returns a response as an array of character codes. Characters that
+    don't fit in a single byte are replaced so that offsets still line up.
+
+    response - The response data as a string, bytes or memoryview. Bytes are
+    used as they are, without a copy.
+    """
+
+    if not type(response) == str: return numpy.frombuffer(response, dtype=numpy.uint8)
+
+    return numpy.frombuffer(response.encode("latin-1", "replace"), dtype=numpy.uint8)
+
+def _integer_column(rows, offset: int, width: int, base: int):
+    values = numpy.zeros(len(rows), dtype=numpy.uint64)
+
+    for position in range(offset, offset + width):
+        values = values * base + _DIGITS[rows[:, position]]
+
+    # Use the smallest type that can hold every value the field could have.
+    limit = base ** width
+
+    if   limit <= 0x100:     dtype = numpy.uint8
+    elif limit <= 0x10000:   dtype = numpy.uint16
+    elif limit <= 0x1000000: dtype = numpy.uint32
+    else:                    dtype = numpy.int64
+
+    return values.astype(dtype)
+
+def _float_columns(rows, offset: int, count: int) -> list:
+    # Pair up hex digits into bytes, then view each group of 4 bytes as a
+    # big-endian IEEE float, decoding the whole run of floats at once.
+    digits = _DIGITS[rows[:, offset:offset + count * 8]]
+    packed = numpy.ascontiguousarray((digits[:, 0::2] << 4) | digits[:, 1::2])
+    values = packed.view(">f4").astype(numpy.float32)
+
+    return [numpy.ascontiguousarray(values[:, index]) for index in range(0, count)]
+
+def _string_column(rows, offset: int, width: int, strip: bool):
+    values = numpy.ascontiguousarray(rows[:, offset:offset + width])
+    values = values.view(f"S{width}").ravel().astype(f"U{width}")
+
+    return numpy.char.strip(values) if strip else values
+
+def _timestamp_column(year, month, day, hour, minute):
+    # TLS systems send two digit years, which are taken to be after 2000.
+    months = (year.astype(numpy.int64) + 30) * 12 + month - 1
+    minutes = (day.astype(numpy.int64) - 1) * 1440 + hour.astype(numpy.int64) * 60 + minute
+
+    values = months.astype("datetime64[M]").astype("datetime64[m]")
+    values += minutes.astype("timedelta64[m]")
+
+    invalid = (month < 1) | (month > 12) | (day < 1) | (day > 31) | (hour > 23) | (minute > 59)
+    values[invalid] = numpy.datetime64("NaT")
+
+    return values
+
+class Record:
+    """
+    A fixed-length record made up of fields at known offsets.
+
+    parse() - Parses a single record at an offset within a response.
+
+    parse_all() - Parses back-to-back records until the response runs out.
+
+    parser() - Returns the function used to parse a single record.
+
+    compact_parser() - Returns the parser used for compact records.
+
+    Responses may be given as strings, or as bytes or memoryviews straight
+    from the socket, which are parsed without decoding them first.
+    """
+
+    def __init__(self, length: int, fields, name: str = "Record"):
+        """
+        length - The amount of characters in the record.
+
+        fields - The (name, offset, width, type) tuples making up the record.
+        Offsets are relative to the start of the record.
+
+        name - The name of the named tuple type used for compact records.
+        """
+
+        self.length = length
+        self.fields = tuple(fields)
+        self.name = name
+        self._compact_parsers = {}
+
+        for name, offset, width, kind in self.fields:
+            if not name.isidentifier():
+                raise ValueError(f"Field '{name}' must be a valid identifier.")
+
+            if kind not in _TYPES:
+                raise ValueError(f"Field '{name}' has an unknown type '{kind}'.")
+
+            if offset < 0 or offset + width > length:
+                raise ValueError(f"Field '{name}' does not fit within the record.")
+
+            if kind == FLOAT and width != 8:
+                raise ValueError(f"Field '{name}' must be 8 characters wide to be a float.")
+
+        self._parse = _compile(self.fields)
+        self._parse_bytes = _compile(self.fields, fallback=self._parse)
+
+    def compact_parser(self, inherit = (), binary: bool = False) -> callable:
+        """
+        Returns a function that parses a single record into a named tuple
+        rather than a dict. Named tuples take a fraction of the memory of a
+        dict, as field names are stored once on the type instead of on every
+        record. Parsers are generated the first time they are requested.
+
+        inherit - Names of fields that come from outside of the record, such
+        as a group header. Their values are passed to the returned function
+        after the record text and become the leading fields of the tuple.
+
+        binary - Return a parser that takes the record as bytes or a
+        memoryview rather than a string.
+        """
+
+        inherit = tuple(inherit)
+
+        if inherit not in self._compact_parsers:
+            field_names = inherit + tuple(field[0] for field in self.fields)
+            compact_type = record_type(self.name, field_names)
+            parse = _compile(self.fields, compact_type)
+
+            self._compact_parsers[inherit] = (parse, _compile(self.fields, compact_type, parse))
+
+        return self._compact_parsers[inherit][binary]
+
+    def parser(self, compact: bool = False, binary: bool = False, inherit = ()) -> callable:
+        """
+        Returns a function that parses the text of a single record, for
+        callers that find records themselves, e.g. to skip ones they already
+        have without parsing them.
+
+        compact - Return the parser for named tuples rather than dicts.
+
+        binary - Return a parser that takes the record as bytes or a
+        memoryview rather than a string.
+
+        inherit - The same as for compact_parser(). Only used with compact.
+        """
+
+        if compact: return self.compact_parser(inherit, binary)
+
+        return self._parse_bytes if binary else self._parse
+
+    @property
+    def type(self) -> type:
+        """
+        The named tuple type returned for this record in compact mode.
+        """
+
+        return record_type(self.name, [field[0] for field in self.fields])
+
+    def parse(self, response: str, offset: int = 0, compact: bool = False):
+        """
+        Parses a single record.
+
+        response - The response the record is found in.
+
+        offset - Position of the record within the response.
+
+        compact - Return a named tuple instead of a dict.
+        """
+
+        parse = self.parser(compact, type(response) != str)
+
+        return parse(response[offset:offset + self.length])
+
+    def parse_all(self, response: str, offset: int = 0, compact: bool = False) -> list:
+        """
+        Parses back-to-back records, ignoring any trailing partial record.
+
+        response - The response the records are found in.
+
+        offset - Position of the first record within the response.
+
+        compact - Return named tuples instead of dicts.
+        """
+
+        parse = self.parser(compact, type(response) != str)
+        length = self.length
+
+        return [
+            parse(response[position:position + length])
+            for position in range(offset, len(response) - length + 1, length)
+        ]
+
+    def columns(self, rows) -> dict:
+        """
+        Parses many records at once into a dict of NumPy arrays, one per
+        field. Floats become float32 arrays, integers become the smallest
+        unsigned type that fits the field, and every set of timestamp fields
+        becomes a single datetime64 array named after its prefix (e.g.
+        "start_timestamp"). Requires NumPy.
+
+        rows - A 2D uint8 array with one row of character codes per record.
+        """
+
+        _require_numpy()
+
+        kinds = {name: kind for name, _, _, kind in self.fields}
+        floats = {}
+        columns = {}
+
+        for name, offset, width, kind in self.fields:
+            if kind == FLOAT and name not in floats:
+                # Decode the whole run of adjacent floats starting here.
+                run = [name]
+
+                for other, other_offset, _, other_kind in self.fields:
+                    if other_kind == FLOAT and other_offset == offset + len(run) * 8:
+                        run.append(other)
+
+                floats.update(zip(run, _float_columns(rows, offset, len(run))))
+
+        for name, offset, width, kind in self.fields:
+            if   kind == INT:   columns[name] = _integer_column(rows, offset, width, 10)
+            elif kind == HEX:   columns[name] = _integer_column(rows, offset, width, 16)
+            elif kind == FLOAT: columns[name] = floats[name]
+            else:               columns[name] = _string_column(rows, offset, width, kind == TEXT)
+
+        # Replace each complete set of timestamp fields with one datetime64 column.
+        for name in list(columns):
+            if not name.endswith("year"): continue
+
+            prefix = name[:-len("year")]
+            names = [prefix + field for field in _TIMESTAMP_FIELDS]
+
+            if all(kinds.get(field) == INT for field in names):
+                parts = [columns.pop(field) for field in names]
+                columns[prefix + "timestamp"] = _timestamp_column(*parts)
+
+        return columns
+
+class FlatReport:
+    """
+    A report made up of a header followed by a list of same-length records,
+    such as the in-tank inventory report (function 201).
+
+    parse() - Parses a full response into a dict.
+    """
+
+    def __init__(self, key: str, start: int, record: Record, header = ()):
+        """
+        key - The name of the list the records are stored in.
+
+        start - Position of the first record within the response.
+
+        record - The layout of each record.
+
+        header - Fields found between the timestamp and the first record.
+        Offsets are relative to the start of the response.
+        """
+
+        self.key = key
+        self.start = start
+        self.record = record
+        self.header = Record(start, timestamp(0) + list(header))
+
+    def parse(self, response: str, compact: bool = False) -> dict:
+        """
+        Parses a full response into a dict.
+
+        response - The response data, with the start of header, command,
+        checksum and end of transmission already removed.
+
+        compact - Return each record as a named tuple instead of a dict.
+        """
+
+        data = self.header.parse(response)
+        data[self.key] = self.record.parse_all(response, self.start, compact)
+
+        return data
+
+    def parse_columns(self, response: str) -> dict:
+        """
+        Parses a full response into a dict, with the records stored as a
+        dict of NumPy arrays rather than a list. See Record.columns().
+
+        response - The response data, with the start of header, command,
+        checksum and end of transmission already removed.
+        """
+
+        _require_numpy()
+
+        length = self.record.length
+        count = max(len(response) - self.start, 0) // length
+        rows = _encode(response[self.start:self.start + count * length]).reshape(count, length)
+
+        data = self.header.parse(response)
+        data[self.key] = self.record.columns(rows)
+
+        return data
+
+class GroupedReport:
+    """
+    A report made up of groups, usually one per tank, where each group has a
+    small header that includes how many records follow it. The in-tank
+    delivery report (function 202) is an example of this.
+
+    parse() - Parses a full response into a dict.
+
+    iter_groups() - Parses the groups of a response one at a time.
+
+    walk_groups() - Finds the groups and records of a response without
+    parsing them.
+    """
+
+    def __init__(self,
+                 key: str,
+                 group: Record,
+                 count: str,
+                 record: Record,
+                 records_key: str = None,
+                 group_by: str = "tank_number",
+                 inherit = ()):
+        """
+        key - The name the groups are stored under.
+
+        group - The layout of each group header.
+
+        count - The name of the group header field holding the record count.
+
+        record - The layout of each record.
+
+        records_key - If set, groups are stored as a list of dicts with the
+        group header fields and the records stored under this name. If not
+        set, groups are stored as a dict of record lists keyed by group_by.
+
+        group_by - The group header field used as the key when groups are
+        stored as a dict.
+
+        inherit - Group header fields that are copied into every record.
+        """
+
+        self.key = key
+        self.group = group
+        self.count = count
+        self.record = record
+        self.records_key = records_key
+        self.group_by = group_by
+        self.inherit = tuple(inherit)
+        self.header = Record(10, timestamp(0))
+
+    def parse(self, response: str, compact: bool = False) -> dict:
+        """
+        Parses a full response into a dict.
+
+        response - The response data, with the start of header, command,
+        checksum and end of transmission already removed.
+
+        compact - Return each record as a named tuple instead of a dict.
+        Group headers are still returned as dicts.
+        """
+
+        data = self.header.parse(response)
+        data[self.key] = [] if self.records_key else {}
+
+        for group, records in self.iter_groups(response, compact=compact):
+            if self.records_key:
+                group[self.records_key] = records
+                data[self.key].append(group)
+            else:
+                data[self.key][group[self.group_by]] = records
+
+        return data
+
+    def parse_columns(self, response: str) -> dict:
+        """
+        Parses a full response into a dict, with the records of every group
+        stored together as a dict of NumPy arrays, one row per record. Group
+        header fields (such as the tank number) are repeated on each row.
+        See Record.columns().
+
+        response - The response data, with the start of header, command,
+        checksum and end of transmission already removed.
+        """
+
+        _require_numpy()
+
+        groups = list(self.walk_groups(response))
+        encoded = _encode(response)
+
+        record_length = self.record.length
+        group_starts = numpy.array([start for start, _, _ in groups], dtype=numpy.int64)
+        counts = numpy.array([count for _, _, count in groups], dtype=numpy.int64)
+
+        # Gather the rows of every record across all groups in one step.
+        record_starts = numpy.concatenate([
+            numpy.arange(start, start + count * record_length, record_length, dtype=numpy.int64)
+            for _, start, count in groups
+        ] or [numpy.zeros(0, dtype=numpy.int64)])
+
+        group_rows = encoded[group_starts[:, None] + numpy.arange(self.group.length)]
+        record_rows = encoded[record_starts[:, None] + numpy.arange(record_length)]
+
+        columns = self.group.columns(group_rows)
+        del columns[self.count]
+
+        columns = {name: numpy.repeat(values, counts) for name, values in columns.items()}
+        columns.update(self.record.columns(record_rows))
+
+        data = self.header.parse(response)
+        data[self.key] = columns
+
+        return data
+
+    def walk_groups(self, response: str, offset: int = 10):
+        """
+        Yields a (group start, first record start, record count) tuple for
+        each group, without parsing the records themselves.
+
+        response - The response the groups are found in.
+
+        offset - Position of the first group within the response.
+        """
+
+        end = len(response)
+        group_length = self.group.length
+        record_length = self.record.length
+        count_field = next(field for field in self.group.fields if field[0] == self.count)
+        count_start = count_field[1]
+        count_end = count_start + count_field[2]
+        base = 16 if count_field[3] == HEX else 10
+
+        # int() takes strings and bytes, but not memoryviews.
+        is_view = type(response) == memoryview
+
+        while end - offset >= group_length:
+            digits = response[offset + count_start:offset + count_end]
+            count = int(bytes(digits) if is_view else digits, base)
+            records_start = offset + group_length
+
+            # Never read past the end of the response, even if the count says
+            # there should be more records. Anything after a short group can't
+            # be trusted, so parsing stops there.
+            available = (end - records_start) // record_length
+            truncated = count > available
+
+            if truncated: count = available
+
+            yield offset, records_start, count
+
+            if truncated: return
+
+            offset = records_start + count * record_length
+
+    def iter_groups(self, response: str, offset: int = 10, compact: bool = False):
+        """
+        Yields a (group header, records) tuple for each group. The record
+        count is removed from the group header as it is implied by the
+        length of the record list.
+
+        response - The response the groups are found in.
+
+        offset - Position of the first group within the response.
+
+        compact - Yield each record as a named tuple instead of a dict.
+        """
+
+        record_length = self.record.length
+        parse_group = self.group.parse
+        inherit = self.inherit
+
+        parse_record = self.record.parser(compact, type(response) != str, inherit)
+
+        for group_start, records_start, count in self.walk_groups(response, offset):
+            group = parse_group(response, group_start)
+            del group[self.count]
+
+            positions = range(records_start, records_start + count * record_length, record_length)
+
+            if compact:
+                inherited = [group[name] for name in inherit]
+                records = [
+                    parse_record(response[position:position + record_length], *inherited)
+                    for position in positions
+                ]
+
+            else:
+                records = [
+                    parse_record(response[position:position + record_length])
+                    for position in positions
+                ]
+
+                if inherit:
+                    inherited = {name: group[name] for name in inherit}
+                    records = [{**inherited, **record} for record in records]
+
+            yield group, records
+
+class RecordStream:
+    """
+    Parses the records of a grouped report one at a time as the response
+    arrives, so that they can be processed before the whole response has been
+    received. Only the unparsed tail of the response is kept in memory, which
+    is never longer than a single record.
+
+    Iterate with 'for' when given a string or an iterable of strings, or with
+    'async for' when given an async iterable such as AsyncTlsSocket.stream().
+    Each record is yielded with the fields of its group header (e.g. the tank
+    number) in front of its own fields. Chunks may also be bytes or
+    memoryviews, which are parsed without decoding them first.
+
+    feed() - Parses the next chunk of a response and returns any records it
+    completed. Used to push chunks in by hand instead of iterating.
+
+    header - The timestamp fields of the report, or None until they arrive.
+    """
+
+    def __init__(self, report: GroupedReport, chunks = (), compact: bool = False):
+        """
+        report - The GroupedReport describing the response.
+
+        chunks - The response data as a string, an iterable of strings, or an
+        async iterable of strings.
+
+        compact - Yield each record as a named tuple instead of a dict.
+        """
+
+        if not (type(chunks) in _CHUNK_TYPES or hasattr(chunks, "__iter__") or hasattr(chunks, "__aiter__")):
+            raise ValueError("Argument 'chunks' must be a string or an iterable of strings.")
+
+        self.report = report
+        self.chunks = chunks
+        self.compact = compact
+        self.header = None
+
+        self._buffer = ""
+        self._group = None
+        self._remaining = 0
+        self._group_names = [field[0] for field in report.group.fields if field[0] != report.count]
+
+    def __iter__(self):
+        chunks = (self.chunks,) if type(self.chunks) in _CHUNK_TYPES else self.chunks
+
+        for chunk in chunks:
+            yield from self.feed(chunk)
+
+    async def __aiter__(self):
+        async for chunk in self.chunks:
+            for record in self.feed(chunk):
+                yield record
+
+    def feed(self, chunk: str) -> list:
+        """
+        Parses the next chunk of a response and returns any records it
+        completed. Partial records are kept until the rest of them arrive.
+
+        chunk - The next part of the response data, as a string, bytes or
+        memoryview. Every chunk of a response must be of the same kind.
+        """
+
+        if not type(chunk) in _CHUNK_TYPES:
+            raise ValueError("Argument 'chunk' must be a string or bytes.")
+
+        binary = type(chunk) != str
+
+        if self._buffer and binary != (type(self._buffer) != str):
+            raise ValueError("Argument 'chunk' must be the same type as the earlier chunks.")
+
+        buffer = self._buffer + chunk if self._buffer else chunk
+        position = 0
+        end = len(buffer)
+        records = []
+
+        if self.header is None:
+            if end < self.report.header.length:
+                self._keep(buffer)
+                return records
+
+            self.header = self.report.header.parse(buffer)
+            position = self.report.header.length
+
+        group_length = self.report.group.length
+        record_length = self.report.record.length
+        parse_record = self.report.record.parser(self.compact, binary, self._group_names)
+
+        while True:
+            if not self._remaining:
+                if end - position < group_length: break
+
+                self._group = self.report.group.parse(buffer, position)
+                self._remaining = self._group.pop(self.report.count)
+                position += group_length
+                continue
+
+            if end - position < record_length: break
+
+            value = buffer[position:position + record_length]
+
+            if self.compact: records.append(parse_record(value, *self._group.values()))
+            else:            records.append({**self._group, **parse_record(value)})
+
+            self._remaining -= 1
+            position += record_length
+
+        self._keep(buffer[position:])
+
+        return records
+
+    def _keep(self, tail):
+        # Chunks that aren't bytes may be reused by whoever passed them in, so
+        # the unparsed tail is copied.
+        self._buffer = bytes(tail) if type(tail) in (bytearray, memoryview) else tail
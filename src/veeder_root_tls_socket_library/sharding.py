@@ -0,0 +1,244 @@
+# sharding.py - Polls a fleet of TLS automatic tank gauges across several processes.
+
+from collections import Counter
+from multiprocessing.connection import wait
+import asyncio
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+
+from veeder_root_tls_socket_library.fleet import FleetPoller
+from veeder_root_tls_socket_library.parsing import _lookup
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool
+
+class ShardedFleetPoller:
+    """
+    Splits a fleet of TLS systems between several worker processes, each of
+    which polls its share with its own event loop, connection pool and
+    FleetPoller. A single event loop can only use one CPU core, which is used
+    up by checksums and parsing long before the network is, so this lets
+    polling scale with the amount of cores instead.
+
+    poll() - Iterator that yields a result dict per TLS system as workers
+    finish them. Iterating over the poller itself does the same thing.
+
+    Result dicts are the same as those of FleetPoller. Each worker sends its
+    results back over a pipe as they finish, one length-prefixed pickle per
+    result, from a thread of its own so that a consumer that is slow to take
+    results never holds up polling. Every entry for a TLS system is polled by
+    the same worker, so it is never sent two commands at once.
+    """
+
+    def __init__(self,
+                 gauges,
+                 processes: int = None,
+                 concurrency: int = 100,
+                 device_timeout: float = 60.0,
+                 timeout: float = 4.0,
+                 pipeline: bool = False,
+                 parse: bool = False,
+                 compact: bool = False):
+        """
+        gauges - An iterable of (host, port, commands) tuples.
+
+        processes - The amount of worker processes. Defaults to the amount of
+        CPU cores.
+
+        concurrency - The maximum amount of TLS systems each worker polls at
+        once.
+
+        device_timeout - The maximum amount of seconds spent on a single TLS
+        system, including connecting and running all of its commands.
+
+        timeout - Passed to each AsyncTlsSocket as its connect/read timeout.
+
+        pipeline - Send all of a TLS system's commands in a single write using
+        AsyncTlsSocket.execute_many() instead of one command at a time.
+
+        parse - Parse each response in the worker with its tls_3xx function,
+        so that the parent only receives the parsed result. Responses to
+        commands without a parser are left as they are.
+
+        compact - Parse records into named tuples, which are much smaller to
+        send back to the parent. Only used with parse.
+        """
+
+        if processes is None: processes = os.cpu_count() or 1
+
+        if processes < 1:   raise ValueError("Argument 'processes' must be at least 1.")
+        if concurrency < 1: raise ValueError("Argument 'concurrency' must be at least 1.")
+
+        self.gauges = gauges
+        self.processes = processes
+        self.options = {
+            "concurrency":    concurrency,
+            "device_timeout": device_timeout,
+            "timeout":        timeout,
+            "pipeline":       pipeline,
+            "parse":          parse,
+            "compact":        compact
+        }
+
+    def __iter__(self):
+        return self.poll()
+
+    def poll(self):
+        """
+        Polls every TLS system and yields a result dict for each of them in
+        the order they finish.
+        """
+
+        shards = _shard(self.gauges, self.processes)
+        workers = {}
+
+        try:
+            for shard in shards:
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(
+                    target=_run_worker, args=(shard, self.options, sender), daemon=True
+                )
+                process.start()
+                sender.close()
+
+                workers[receiver] = (process, Counter((host, port) for host, port, _ in shard))
+
+            while workers:
+                for receiver in wait(list(workers)):
+                    process, remaining = workers[receiver]
+
+                    try:
+                        frame = receiver.recv_bytes()
+                    except EOFError:
+                        frame = None
+
+                    if frame:
+                        result = pickle.loads(frame)
+                        remaining[(result["host"], result["port"])] -= 1
+
+                        yield result
+                        continue
+
+                    # An empty frame means the worker is done. Anything it
+                    # never got to, e.g. because it crashed, is failed here.
+                    receiver.close()
+                    process.join()
+                    del workers[receiver]
+
+                    for (host, port), count in remaining.items():
+                        for _ in range(0, count):
+                            yield _failed(host, port, RuntimeError(
+                                f"[{host}] Worker process exited with code {process.exitcode} before polling."
+                            ))
+
+        finally:
+            for receiver, (process, _) in workers.items():
+                receiver.close()
+                process.terminate()
+                process.join()
+
+def _shard(gauges, processes: int) -> list:
+    """
+    Splits the gauges into at most processes shards of similar size, keeping
+    every entry for a TLS system in the same shard.
+    """
+
+    shards = [[] for _ in range(0, processes)]
+    systems = {}
+
+    for host, port, commands in gauges:
+        index = systems.setdefault((host, port), len(systems) % processes)
+        shards[index].append((host, port, list(commands)))
+
+    return [shard for shard in shards if shard]
+
+def _run_worker(shard: list, options: dict, sender):
+    frames = queue.SimpleQueue()
+    writer = threading.Thread(target=_write_frames, args=(frames, sender), daemon=True)
+    writer.start()
+
+    try:
+        asyncio.run(_poll_shard(shard, options, frames))
+        frames.put(b"")
+
+    finally:
+        # Without the empty frame, the writer stops once the parent has read
+        # every result, and the parent fails whatever is left.
+        frames.put(None)
+        writer.join()
+        sender.close()
+
+def _write_frames(frames: queue.SimpleQueue, sender):
+    # Writing to the pipe blocks until the parent reads, which is only as
+    # fast as the results are consumed, so it is kept off the event loop.
+    while True:
+        frame = frames.get()
+        if frame is None: return
+
+        try:
+            sender.send_bytes(frame)
+        except OSError:
+            return
+
+async def _poll_shard(shard: list, options: dict, frames: queue.SimpleQueue):
+    parse = options["parse"]
+    compact = options["compact"]
+
+    async with AsyncTlsSocketPool(timeout=options["timeout"]) as pool:
+        poller = FleetPoller(
+            shard,
+            concurrency=options["concurrency"],
+            device_timeout=options["device_timeout"],
+            timeout=options["timeout"],
+            pool=pool,
+            pipeline=options["pipeline"]
+        )
+
+        async for result in poller:
+            if parse:
+                _parse_responses(result["responses"], compact)
+
+                result["success"] = result["error"] is None and not any(
+                    isinstance(response, Exception) for response in result["responses"].values()
+                )
+
+            frames.put(_dumps(result))
+
+def _parse_responses(responses: dict, compact: bool):
+    for command, response in responses.items():
+        if not isinstance(response, str): continue
+
+        try:
+            parser, options = _lookup(command)
+        except ValueError:
+            continue
+
+        # A few parsers have no compact form.
+        kwargs = {"compact": True} if compact and "compact" in options else {}
+
+        try:                        responses[command] = parser(response, **kwargs)
+        except ValueError as error: responses[command] = error
+
+def _dumps(result: dict) -> bytes:
+    try:
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+    # Exceptions that can't be pickled are sent as their message instead.
+    except (pickle.PicklingError, TypeError, AttributeError):
+        if result["error"] is not None:
+            result["error"] = RuntimeError(str(result["error"]))
+
+        for command, response in result["responses"].items():
+            if isinstance(response, Exception): result["responses"][command] = RuntimeError(str(response))
+
+        return pickle.dumps(result, pickle.HIGHEST_PROTOCOL)
+
+def _failed(host: str, port: int, error: Exception) -> dict:
+    return {
+        "host":      host,
+        "port":      port,
+        "success":   False,
+        "responses": {},
+        "error":     error
+    }
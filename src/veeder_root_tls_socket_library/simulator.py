@@ -0,0 +1,418 @@
+# simulator.py - A simulated TLS system used to test and benchmark this library
+# without access to a real automatic tank gauge.
+
+import argparse
+import asyncio
+import random
+import struct
+from datetime import datetime, timedelta
+
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.checksum import compute_checksum
+from veeder_root_tls_socket_library.schema import FLOAT, HEX, INT, STR, TEXT, GroupedReport
+
+_ERROR = b"\x019999FF1B\x03"
+
+# Function codes with responses that aren't described by a report layout.
+_HANDWRITTEN = ("205", "222", "602")
+
+class TlsSimulator:
+    """
+    Listens for connections and answers commands the way a TLS-3XX system
+    would, with generated data for every function in tls_3xx.py. Replies can
+    be slowed down and broken up to imitate real systems and their networks.
+
+    start() - Starts listening for connections.
+
+    close() - Stops listening and closes every open connection.
+
+    respond() - Returns the full reply the simulator sends for a command.
+
+    Supports 'async with TlsSimulator(...) as simulator:', which starts and
+    closes the simulator for you. The port it is listening on is available
+    through the port attribute once started.
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 tanks: int = 4,
+                 deliveries: int = 10,
+                 latency: float = 0.0,
+                 chunk_size: int = None,
+                 chunk_delay: float = 0.0,
+                 baud_rate: int = None,
+                 error_rate: float = 0.0,
+                 unsupported = (),
+                 seed: int = None):
+        """
+        host - The address to listen on.
+
+        port - The port to listen on. Set to 0 to use any free port.
+
+        tanks - The amount of tanks reported by the simulated TLS system.
+
+        deliveries - The amount of deliveries, tests, etc. kept per tank.
+
+        latency - Seconds to wait before replying to each command.
+
+        chunk_size - If set, replies are written this many bytes at a time.
+
+        chunk_delay - Seconds to wait between each chunk of a reply.
+
+        baud_rate - If set, replies are paced to the speed of a serial link
+        running at this baud rate (e.g. 9600), as TLS systems behind serial
+        to Ethernet adapters are.
+
+        error_rate - The chance (0.0 to 1.0) of replying to any command with
+        the generic error response instead of its data.
+
+        unsupported - Function codes (e.g. "21B") that are always answered
+        with the generic error response.
+
+        seed - Seeds the generated data so that it is the same between runs.
+        """
+
+        if chunk_size is not None and chunk_size < 1:
+            raise ValueError("Argument 'chunk_size' must be at least 1.")
+
+        if baud_rate is not None and baud_rate < 1:
+            raise ValueError("Argument 'baud_rate' must be at least 1.")
+
+        self.host = host
+        self.port = port
+        self.tanks = tanks
+        self.deliveries = deliveries
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.baud_rate = baud_rate
+        self.error_rate = error_rate
+        self.unsupported = {code.upper() for code in unsupported}
+        self.commands_received = 0
+
+        self._random = random.Random(seed)
+        self._salt = self._random.random()
+        self._responses = {}
+        self._server = None
+        self._connections = set()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """
+        Starts listening for connections.
+        """
+
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+        return self
+
+    async def close(self):
+        """
+        Stops listening and closes every open connection.
+        """
+
+        if self._server is None: return
+
+        self._server.close()
+
+        for writer in list(self._connections):
+            writer.close()
+
+        await self._server.wait_closed()
+        self._server = None
+
+    def respond(self, command: str) -> bytes:
+        """
+        Returns the full reply to a command, from the start of header through
+        the end of transmission. Replies are generated the first time each
+        command is received and reused after that.
+
+        command - The command as it was received, without the start of header.
+        """
+
+        code = command[1:4].upper()
+
+        if code in self.unsupported or (self.error_rate and self._random.random() < self.error_rate):
+            return _ERROR
+
+        if command not in self._responses:
+            data = self._generate(code, command[4:6], command[6:])
+
+            if data is None:
+                self._responses[command] = _ERROR
+
+            # Display format commands return a plain text report instead.
+            elif command[0] == "I":
+                now = datetime.now().strftime("%b %d, %Y %I:%M %p").upper()
+                self._responses[command] = f"\x01\r\n{command}\r\n{now}\r\n\r\n\x03".encode()
+
+            else:
+                message = b"\x01" + command[:6].encode() + data.encode() + b"&&"
+                self._responses[command] = message + b"%04X" % compute_checksum(message) + b"\x03"
+
+        return self._responses[command]
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+
+        try:
+            while True:
+                # Commands are ended by a newline, but clients may send several
+                # of them in a single write.
+                line = await reader.readline()
+                if not line: break
+
+                command = line.strip(b"\x01\r\n").decode("utf-8", "replace")
+                if not command: continue
+
+                self.commands_received += 1
+
+                if self.latency: await asyncio.sleep(self.latency)
+
+                await self._write(writer, self.respond(command))
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _write(self, writer: asyncio.StreamWriter, reply: bytes):
+        if self.chunk_size is None and self.baud_rate is None:
+            writer.write(reply)
+            await writer.drain()
+            return
+
+        chunk_size = self.chunk_size or 64
+
+        for position in range(0, len(reply), chunk_size):
+            chunk = reply[position:position + chunk_size]
+
+            writer.write(chunk)
+            await writer.drain()
+
+            # Serial links send 10 bits per byte, including start and stop bits.
+            delay = self.chunk_delay
+            if self.baud_rate: delay += len(chunk) * 10 / self.baud_rate
+
+            if delay and position + chunk_size < len(reply): await asyncio.sleep(delay)
+
+    def _generate(self, code: str, tank: str, arguments: str = ""):
+        """
+        Generates the response data for a function code, or None if the
+        function isn't supported.
+
+        code - The function code, e.g. "201".
+
+        tank - The tank number from the command. "00" means every tank.
+
+        arguments - Anything after the tank number, such as the amount of
+        deliveries for function 21B or the date range for function 119.
+        """
+
+        if not tank.isdigit(): return None
+
+        tanks = [int(tank)] if int(tank) else list(range(1, self.tanks + 1))
+        now = datetime.now()
+
+        if code in _HANDWRITTEN:
+            return _timestamp(now) + getattr(self, f"_generate_{code}")(tanks, now)
+
+        report = getattr(tls_3xx, f"_REPORT_{code}", None)
+        if report is None: return None
+
+        data = [_timestamp(now)]
+
+        if isinstance(report, GroupedReport):
+            count = self.deliveries
+
+            if code == "21B" and arguments[:2].isdigit(): count = min(count, int(arguments[:2]))
+
+            for tank in tanks:
+                data.append(self._record(report.group, tank, now, {report.count: count}))
+
+                for index in range(0, count):
+                    data.append(self._record(report.record, tank, now - timedelta(days=index + 1)))
+
+            return "".join(data)
+
+        # Flat reports have one record per tank, or a few of anything else.
+        count = len(tanks) if report.key in ("tanks", "inventory") else 3
+        times = [now - timedelta(hours=index) for index in range(0, count)]
+
+        if code == "119" and len(arguments) == 12 and arguments.isdigit():
+            times = [when for when in times if arguments[:6] <= when.strftime("%y%m%d") <= arguments[6:]]
+            count = len(times)
+
+        records = [
+            self._record(report.record, tanks[index % len(tanks)], when)
+            for index, when in enumerate(times)
+        ]
+
+        header = self._record(report.header, tanks[0], now, {"number_of_records": count})
+
+        return header + "".join(records)
+
+    def _generate_205(self, tanks: list, now: datetime) -> str:
+        return "".join(f"{tank:02d}01{self._random.randint(1, 9):02d}" for tank in tanks)
+
+    def _generate_222(self, tanks: list, now: datetime) -> str:
+        data = []
+
+        for tank in tanks:
+            data.append(f"{tank:02d}1{tank:02d}{self.deliveries:03d}")
+
+            for index in range(0, self.deliveries):
+                bill_of_lading = f"BOL{self._random.randint(0, 99999):05d}"
+                volumes = [self._random.uniform(1000, 9000) for _ in range(0, 3)]
+
+                data.append(_timestamp(now - timedelta(days=index + 1)))
+                data.append(f"{len(bill_of_lading):02X}{bill_of_lading}03")
+                data.extend(_float(value) for value in volumes)
+
+        return "".join(data)
+
+    def _generate_602(self, tanks: list, now: datetime) -> str:
+        return "".join(f"{tank:02d}" + f"TANK {tank}".ljust(20) for tank in tanks)
+
+    def _record(self, record, tank: int, when: datetime, values: dict = None) -> str:
+        """
+        Generates the text of a single record from its layout.
+
+        record - The Record layout to fill in.
+
+        tank - The tank the record belongs to.
+
+        when - The time used for every timestamp in the record.
+
+        values - Values for specific fields, such as record counts.
+        """
+
+        values = values or {}
+        characters = ["0"] * record.length
+
+        # The same record reads the same in every reply, e.g. a delivery in a
+        # report asked for with different arguments.
+        record_random = random.Random(f"{self._salt}{record.name}{tank}{_timestamp(when)}")
+        fields = sorted(record.fields, key=lambda field: field[1])
+
+        for index, (name, offset, width, kind) in enumerate(fields):
+            value = values.get(name)
+
+            if value is None: value = self._value(name, width, kind, tank, when, record_random)
+
+            if   kind == INT:   text = f"{value:0{width}d}"
+            elif kind == HEX:   text = f"{value:0{width}X}"
+            elif kind == FLOAT: text = _float(value)
+            else:               text = str(value).ljust(width)[:width]
+
+            characters[offset:offset + width] = text[-width:]
+
+            # Runs of floats are preceded by a count of how many follow.
+            previous_end = fields[index - 1][1] + fields[index - 1][2] if index else 0
+
+            if kind == FLOAT and offset - previous_end == 2 and fields[index - 1][3] != FLOAT:
+                run = sum(1 for field in fields if field[3] == FLOAT and field[1] >= offset)
+                characters[offset - 2:offset] = f"{run:02X}"
+
+        return "".join(characters)
+
+    def _value(self, name: str, width: int, kind: str, tank: int, when: datetime, random: random.Random):
+        """
+        Picks a plausible value for a field based on its name.
+        """
+
+        if name.endswith(("year", "month", "day", "hour", "minute")):
+            # End times are shortly after start times, e.g. for deliveries.
+            if name.startswith("end_"): when += timedelta(minutes=25)
+
+            field = name.rsplit("_", 1)[-1]
+            return when.year % 100 if field == "year" else getattr(when, field)
+
+        if name == "tank_number":  return f"{tank:02d}"
+        if name == "product_code": return str(tank % 9 or 9)
+        if name == "probe_type":   return "01"
+
+        if kind == FLOAT:
+            if "temp" in name:   return random.uniform(10, 30)
+            if "water" in name:  return random.uniform(0, 2)
+            if "height" in name: return random.uniform(10, 90)
+            return random.uniform(0, 10000)
+
+        if kind == INT:  return random.randrange(0, 10 ** min(width, 1))
+        if kind == HEX:  return 0
+        if kind == TEXT: return name.replace("_", " ").upper()
+
+        return "0" * width
+
+def _timestamp(when: datetime) -> str:
+    return when.strftime("%y%m%d%H%M")
+
+def _float(value: float) -> str:
+    return struct.pack(">f", value).hex().upper()
+
+async def start_fleet(count: int, host: str = "127.0.0.1", **options) -> list:
+    """
+    Starts many simulated TLS systems, each on its own port. Close each of
+    them with close() when finished. Every simulator holds a listening socket
+    open, so large fleets may need the open file limit raised (ulimit -n).
+
+    count - The amount of simulated TLS systems to start.
+
+    host - The address each of them listens on.
+
+    options - Passed on to each TlsSimulator.
+    """
+
+    simulators = [TlsSimulator(host, 0, **options) for _ in range(0, count)]
+
+    return list(await asyncio.gather(*(simulator.start() for simulator in simulators)))
+
+async def _main(arguments):
+    options = {
+        "tanks":       arguments.tanks,
+        "deliveries":  arguments.deliveries,
+        "latency":     arguments.latency,
+        "chunk_size":  arguments.chunk_size,
+        "chunk_delay": arguments.chunk_delay,
+        "baud_rate":   arguments.baud_rate,
+        "error_rate":  arguments.error_rate,
+        "seed":        arguments.seed
+    }
+
+    if arguments.count == 1:
+        simulators = [await TlsSimulator(arguments.host, arguments.port, **options).start()]
+    else:
+        simulators = await start_fleet(arguments.count, arguments.host, **options)
+
+    for simulator in simulators:
+        print(f"{simulator.host}:{simulator.port}", flush=True)
+
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs simulated Veeder-Root TLS systems.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=10001, help="Ignored when --count is more than 1.")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("--tanks", type=int, default=4)
+    parser.add_argument("--deliveries", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--chunk-size", type=int, default=None)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--baud-rate", type=int, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
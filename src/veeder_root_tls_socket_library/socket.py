@@ -1,8 +1,21 @@
 # socket.py - Defines the socket used to connect to TLS automatic tank gauges.
 
-from time import sleep
+from time import monotonic, perf_counter
 import socket
 
+from veeder_root_tls_socket_library.checksum import verify_checksum
+from veeder_root_tls_socket_library.observer import _command_event
+from veeder_root_tls_socket_library.parsing import parse
+from veeder_root_tls_socket_library.protocol import FrameReader, check_frame, display_text, encode_command
+
+class ResponseTimeoutError(ValueError):
+    """
+    Raised when the TLS system doesn't finish a response in time, which is
+    also how it treats most invalid commands. The response may still arrive
+    later and be mistaken for the response to the next command, so the
+    connection should be closed rather than used again.
+    """
+
 class TlsSocket:
     """
     Defines a socket for the TLS automatic tank gauges 
@@ -10,20 +23,40 @@ class TlsSocket:
 
     execute() - Used to send a command and view the output in accordance with 
     Veeder-Root Serial Interface Manual 576013-635.
+
+    execute_and_parse() - Used to send a command and parse the output with
+    the tls_3xx function for its function code.
+
+    close() - Closes the connection to the TLS system.
     """
 
-    def __init__(self, ip: str, port: int):
+    def __init__(self, ip: str, port: int, observer = None):
+        """
+        ip - The address of the TLS system.
+
+        port - The port the TLS system listens on.
+
+        observer - An optional TlsObserver that is told how long connecting
+        and each command took, and how many bytes were received.
+        """
+
         self.ip = ip
         self.port = port
+        self.observer = observer
+        self._reader = FrameReader()
 
         socket_connection = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        started = perf_counter() if observer is not None else None
 
         try:
             socket_connection.connect((self.ip, self.port))
             self.socket = socket_connection
         
         except Exception as exception:
+            if observer is not None: self._observe_connect(started, exception)
             raise exception
+
+        if observer is not None: self._observe_connect(started, None)
         
     def __str__(self):
         return f"tlsSocket({self.ip}, {self.port}, {self.socket})"
@@ -32,6 +65,13 @@ class TlsSocket:
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the connection to the TLS system.
+        """
+
         socket = self.socket
         socket.close()
 
@@ -40,7 +80,8 @@ class TlsSocket:
                 etx: bytes = b"\x03",
                 retries: int = 30,
                 timeout: int = 1,
-                data_size: int = 1200) -> str:
+                data_size: int = 1200,
+                raw: bool = False) -> str:
         """
         Sends a command to a socket connection using the command 
         format from the Veeder-Root Serial Interface Manual 576013-635.
@@ -52,12 +93,64 @@ class TlsSocket:
         changed if your ATG is set to use a different end of transmission.
 
         retries - The amount of times to listen for output before failing.
+        Together with timeout this sets the overall deadline for a response,
+        which is retries * timeout seconds.
 
-        timeout - The amount of time to listen per retry.
+        timeout - The amount of time to wait for the next chunk of output
+        before the command is considered invalid. A ResponseTimeoutError is
+        raised once the deadline passes.
 
         data_size - The maximum amount of bytes to listen for at any time.
         Set to 1200 by default, as the maximum baud rate (bits per second)
         that a Veeder-Root automatic tank gauge can send is 9600.
+
+        raw - Return a memoryview of the response data instead of a string,
+        which avoids decoding and copying it. The view points into the
+        receive buffer of this socket, so it is only valid until the next
+        command is executed; use bytes() on it to keep a copy. Only used for
+        computer format commands.
+        """
+
+        is_display = type(command) == str and command[:1].isupper()
+
+        return self._execute(command, etx, retries, timeout, data_size,
+                             lambda frame: self._handle_response(frame, is_display, raw))
+
+    def execute_and_parse(self,
+                          command: str,
+                          etx: bytes = b"\x03",
+                          retries: int = 30,
+                          timeout: int = 1,
+                          data_size: int = 1200,
+                          **kwargs):
+        """
+        Sends a command the same way as execute(), then parses the response
+        with the tls_3xx function for the function code echoed back by the
+        TLS system. The response is parsed straight from the receive buffer,
+        without decoding it to a string first.
+
+        command - The function code you would like to execute, e.g. "i20100".
+        Display format commands are sent in computer format instead, as only
+        computer format responses can be parsed.
+
+        etx, retries, timeout, data_size - The same as for execute().
+
+        kwargs - Passed through to the parser, e.g. compact=True. Options that
+        the parser doesn't take are left out, and options that no parser
+        takes raise a TypeError.
+        """
+
+        if type(command) == str and command[:1] == "I": command = "i" + command[1:]
+
+        return self._execute(command, etx, retries, timeout, data_size,
+                             lambda frame: parse(frame, **kwargs))
+
+    def _execute(self, command: str, etx: bytes, retries: int, timeout: int,
+                 data_size: int, handle: callable):
+        """
+        Sends a command and receives data in chunks until the end of
+        transmission is found, then returns what handle returns for the
+        response, from the start of header through the end of transmission.
         """
 
         # Validating function arguments prior to executing any commands.
@@ -68,88 +161,104 @@ class TlsSocket:
         if not type(etx) == bytes:   raise ValueError("Argument 'etx' must be a bytecode.")
 
         # Setting up foundational variables.
-        socket = self.socket
-        soh    = b"\x01"
-        end    = b"\r\n" # Fixes an error when executing command i72E.
+        socket       = self.socket
+        byte_command = encode_command(command)
+
+        # Anything left over from an earlier command that failed is dropped,
+        # so it can't be mistaken for this response.
+        reader = self._reader
+        reader.etx = etx
+        reader.reset()
+
+        # Reads return as soon as data arrives, so the deadline only bounds
+        # slow or silent systems rather than adding latency to every command.
+        length = 0
+        deadline = monotonic() + retries * timeout
+
+        # Timings are only taken when an observer is attached.
+        observer = self.observer
+        started = perf_counter() if observer is not None else None
+        first_byte = checked = error = frame = None
+        chunks = 0
 
-        byte_command = soh + bytes(command, "utf-8") + end
-        is_display   = command[0].isupper()
+        try:
+            socket.settimeout(timeout)
+            socket.sendall(byte_command)
 
-        # Send command and repeatedly receive data in chunks until ETX is found.
-        byte_response = b""
+            frame = reader.next_frame()
 
-        socket.settimeout(timeout)
-        socket.sendall(byte_command)
+            while frame is None:
+                remaining = deadline - monotonic()
+                if remaining <= 0: raise ResponseTimeoutError("Invalid command.")
 
-        for _ in range(0, retries):
-            sleep(timeout)
+                socket.settimeout(min(timeout, remaining))
 
-            try:                 
-                chunk = socket.recv(data_size)
-                byte_response += chunk
-                if chunk.endswith(etx): break
+                try:
+                    received = socket.recv_into(reader.get_buffer(data_size), data_size)
 
-            except TimeoutError: 
-                raise ValueError("Invalid command.")
-    
-        return self._handle_response(byte_response, byte_command, is_display)
-    
-    def _handle_response(self, byte_response: bytes, 
-                          byte_command: bytes, is_display: bool) -> str:
-        """
-        Handles responses from the TLS system after executing a command.
+                except TimeoutError:
+                    raise ResponseTimeoutError("Invalid command.")
 
-        byte_response - Response from the TLS system.
+                if not received:
+                    raise ConnectionError("Connection closed by the TLS system.")
 
-        byte_command - The command that was executed to get the response.
+                if observer is not None:
+                    if not chunks: first_byte = perf_counter()
+                    chunks += 1
 
-        is_display - Used to determine if the command uses Display format.
+                reader.buffer_updated(received)
+                length += received
+                frame = reader.next_frame()
+
+            if observer is not None: checked = perf_counter()
+
+            return handle(frame)
+
+        except Exception as exception:
+            error = exception
+            raise
+
+        finally:
+            if observer is not None:
+                observer.on_command(_command_event(
+                    self.ip, self.port, command, len(byte_command), length,
+                    started, first_byte, checked, chunks, error, frame
+                ))
+
+    def _observe_connect(self, started: float, error: Exception):
+        self.observer.on_connect({
+            "host":         self.ip,
+            "port":         self.port,
+            "connect_time": perf_counter() - started,
+            "error":        error
+        })
+    
+    def _handle_response(self, frame: memoryview, is_display: bool, raw: bool = False) -> str:
         """
+        Handles responses from the TLS system after executing a command.
 
-        # Validate that the generic error was not returned.
-        if b"\x019999FF1B" in byte_response: 
-            raise ValueError("Unsupported command for this server.")
+        frame - The response, from the start of header through the end of
+        transmission.
 
-        # Check checksum position & value if non-Display format command is used.
-        if is_display:
-            # Removes SOH and ETX from being shown in output.
-            response = byte_response.decode("utf-8")[1:][:-1]
+        is_display - Used to determine if the command uses Display format.
 
-            # Checks for and removes newlines at both ends of output.
-            if response[:4]  == "\r\n\r\n": response = response[4:]
-            if response[-4:] == "\r\n\r\n": response = response[:-4]
-        else:
-            checksum_separator = b"&&"
-            checksum_separator_position  = byte_response[-7:-5]
+        raw - Return a memoryview of the response data instead of a string.
+        """
 
-            if checksum_separator not in checksum_separator_position:
-                raise ValueError("Checksum missing from command response.")
+        # Display format responses have no checksum to verify.
+        if is_display: return display_text(frame)
 
-            if not self._data_integrity_check(byte_response):
-                raise ValueError("Data integrity invalidated due to invalid checksum.")
-            
-            # Removes SOH, command, checksum, and ETX from being shown in output.
-            response = byte_response.decode("utf-8")[7:][:-7]
+        response = check_frame(frame)
 
-        return response
+        return response if raw else str(response, "utf-8")
 
     def _data_integrity_check(self, byte_response: bytes) -> bool:
         """
         Verifies whether or not a command response retains its integrity
         after transmission by comparing it against the response checksum.
 
-        response - Full command response up the checksum itself. Must include
-        the start of header, command, response data, and the && separator.
+        byte_response - Full command response, from the start of header
+        through the end of transmission, as bytes or a memoryview.
         """
 
-        response = byte_response.decode()
-        message  = response[:-5]
-        checksum = response[-5:-1]
-        integrity_threshold = "0b10000000000000000"
-
-        # Calculate the 16-bit binary count of the message.
-        message_sum = sum(ord(char) for char in message) & 0xFFFF
-        checksum_int = int(checksum, 16)
-
-        # Compare sum of checksum and message to expected result.
-        return bin(message_sum + checksum_int) == integrity_threshold
\ No newline at end of file
+        return verify_checksum(byte_response)
\ No newline at end of file
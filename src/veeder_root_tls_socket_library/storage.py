@@ -0,0 +1,518 @@
+# storage.py - Stores parsed inventory, delivery and alarm records in SQLite, indexed
+# by site, tank and timestamp for fast range queries.
+
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from operator import attrgetter, itemgetter
+import sqlite3
+
+from veeder_root_tls_socket_library.schema import FLOAT, HEX, INT, record_type
+from veeder_root_tls_socket_library.tls_3xx import (
+    _REPORT_111, _REPORT_112, _REPORT_114, _REPORT_201, _REPORT_202, _REPORT_21A, _REPORT_21B
+)
+
+# Timestamps are stored as seconds since 1970 on the clock of the TLS system,
+# which has no time zone, so they are converted without one as well.
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = _EPOCH.toordinal()
+
+_TIMESTAMP_PARTS = ("year", "month", "day", "hour", "minute")
+
+_SQL_TYPES = {INT: "INTEGER", HEX: "INTEGER", FLOAT: "REAL"}
+
+class _Table:
+    """
+    Describes how the records of one or more reports are stored in a table.
+    Timestamp fields are stored as a single column, and the group header
+    fields of grouped reports (e.g. the product code) are stored with each
+    record.
+    """
+
+    def __init__(self, name: str, report, key = ()):
+        """
+        name - The name of the table.
+
+        report - The FlatReport or GroupedReport the records come from.
+
+        key - Fields, besides the site, tank and timestamp, that tell apart
+        records of the same tank at the same minute.
+        """
+
+        self.name = name
+        self.key = tuple(key)
+
+        fields = self._group_fields(report) if hasattr(report, "group") else []
+        fields += report.record.fields
+
+        names = {name for name, *_ in fields}
+        prefixes = [name[:-len("year")] for name, *_ in fields if name.endswith("year")
+                    and all(name[:-len("year")] + part in names for part in _TIMESTAMP_PARTS)]
+
+        # Records without a timestamp of their own are stored at the time of
+        # the report, e.g. tank inventory.
+        self.prefix = prefixes[0] if prefixes else None
+
+        self.columns = []
+        self.types = {}
+        self.timestamps = {}  # The field prefix of every other timestamp column.
+
+        for name, _, _, kind in fields:
+            if name == "tank_number": continue
+
+            prefix = next((prefix for prefix in prefixes if name in (prefix + part for part in _TIMESTAMP_PARTS)), None)
+
+            if prefix is None:
+                self.columns.append(name)
+                self.types[name] = _SQL_TYPES.get(kind, "TEXT")
+
+            elif prefix != self.prefix and name == prefix + "year":
+                self.columns.append(prefix + "timestamp")
+                self.types[prefix + "timestamp"] = "INTEGER"
+                self.timestamps[prefix + "timestamp"] = prefix
+
+        self.record_name = report.record.name + "Row"
+
+        # Every field a row is made from, so that they can all be fetched from
+        # a record at once.
+        parts = [] if self.prefix is None else [self.prefix + part for part in _TIMESTAMP_PARTS]
+
+        self.fields = ["tank_number", *parts, *(
+            name for name in self.columns if name not in self.timestamps
+        ), *(
+            prefix + part for prefix in self.timestamps.values() for part in _TIMESTAMP_PARTS
+        )]
+
+        self._getters = {}
+
+        columns = "".join(f", {name}" for name in self.columns)
+        values = ", ?" * len(self.columns)
+
+        self.insert = f"INSERT OR REPLACE INTO {self.name} (site, tank, timestamp{columns}) VALUES (?, ?, ?{values})"
+
+    def _group_fields(self, report) -> list:
+        # Groups kept in a dict only keep the field they are keyed by.
+        if report.records_key is None:
+            return [field for field in report.group.fields if field[0] == report.group_by]
+
+        return [field for field in report.group.fields if field[0] != report.count]
+
+    def create(self) -> str:
+        columns = "".join(f", {name} {self.types[name]}" for name in self.columns)
+        key = "".join(f", {name}" for name in self.key)
+
+        return (
+            f"CREATE TABLE IF NOT EXISTS {self.name} ("
+            f"site INTEGER NOT NULL, tank TEXT NOT NULL, timestamp INTEGER NOT NULL{columns}, "
+            f"PRIMARY KEY (site, tank, timestamp{key})) WITHOUT ROWID"
+        )
+
+    def rows(self, site: int, records: list, group: dict, header: int) -> list:
+        """
+        Returns the rows of several records of the same type, which are all
+        fetched with a single itemgetter or attrgetter call per record.
+
+        records - The records as dicts or compact named tuples.
+
+        group - The header fields of the group the records belong to.
+
+        header - The timestamp of the report, used for records without one.
+        """
+
+        if not records: return []
+
+        if self.prefix is None and header is None:
+            raise ValueError(f"Records stored in '{self.name}' must have a timestamp.")
+
+        kind = type(records[0]) == dict
+        key = (kind, tuple(group))
+        getters = self._getters.get(key)
+
+        if getters is None:
+            names = [name for name in self.fields if name not in group]
+            getter = itemgetter(*names) if kind else attrgetter(*names)
+
+            stamps = [(name, itemgetter(*(prefix + part for part in _TIMESTAMP_PARTS)))
+                      for name, prefix in self.timestamps.items()]
+
+            if self.prefix is not None:
+                stamps.append(("timestamp", itemgetter(*(self.prefix + part for part in _TIMESTAMP_PARTS))))
+
+            getters = self._getters[key] = (names, getter, stamps, itemgetter("tank_number", "timestamp", *self.columns))
+
+        names, getter, stamps, pick = getters
+        rows = []
+
+        for record in records:
+            try:
+                values = dict(zip(names, getter(record)))
+
+            # Records missing a field, e.g. built by hand, are stored with it
+            # left empty.
+            except (KeyError, AttributeError):
+                rows.append(self.row(site, record, group, header))
+                continue
+
+            values.update(group)
+            values["timestamp"] = header
+
+            for name, parts in stamps: values[name] = _seconds(*parts(values))
+
+            rows.append((site, *pick(values)))
+
+        return rows
+
+    def row(self, site: int, record, group: dict, header: int) -> tuple:
+        """
+        Returns the values of a record in the order of the insert statement.
+
+        record - The record as a dict or a compact named tuple.
+
+        group - The header fields of the group the record belongs to.
+
+        header - The timestamp of the report, used for records without one.
+        """
+
+        if type(record) == dict: get = record.get
+        else:                    get = lambda name: getattr(record, name, None)
+
+        def value(name: str):
+            value = get(name)
+            return group.get(name) if value is None else value
+
+        def seconds(prefix: str) -> int:
+            parts = [value(prefix + part) for part in _TIMESTAMP_PARTS]
+            if None in parts: return None
+
+            return _seconds(*parts)
+
+        timestamp = header if self.prefix is None else seconds(self.prefix)
+
+        if timestamp is None:
+            raise ValueError(f"Records stored in '{self.name}' must have a timestamp.")
+
+        values = [site, value("tank_number"), timestamp]
+
+        for name in self.columns:
+            if name in self.timestamps: values.append(seconds(self.timestamps[name]))
+            else:                       values.append(value(name))
+
+        return tuple(values)
+
+# The tables parsed reports are stored in, and the report each function code
+# is stored from. Reports stored in the same table share a record layout.
+_TABLES = {
+    "inventory":           _Table("inventory", _REPORT_201),
+    "deliveries":          _Table("deliveries", _REPORT_202),
+    "adjusted_deliveries": _Table("adjusted_deliveries", _REPORT_21B),
+    "alarms":              _Table("alarms", _REPORT_111, ("alarm_category", "sensor_category", "alarm_type", "alarm_state"))
+}
+
+_CODES = {
+    "201": (_TABLES["inventory"], _REPORT_201),
+    "21A": (_TABLES["inventory"], _REPORT_21A),
+    "202": (_TABLES["deliveries"], _REPORT_202),
+    "21B": (_TABLES["adjusted_deliveries"], _REPORT_21B),
+    "111": (_TABLES["alarms"], _REPORT_111),
+    "112": (_TABLES["alarms"], _REPORT_112),
+    "114": (_TABLES["alarms"], _REPORT_114)
+}
+
+class TlsStore:
+    """
+    Keeps parsed inventory, delivery and alarm records in an SQLite database,
+    so that readings can be kept for years and queried by tank and time
+    range. Each kind of record has its own table, stored in order of site,
+    tank and timestamp, so a range query only reads the rows it returns no
+    matter how many other rows the table holds.
+
+    add() - Stores every record of a parsed report.
+
+    add_many() - Stores several parsed reports in a single transaction.
+
+    add_records() - Stores records that are not part of a report, e.g. those
+    returned by HistorySync.
+
+    query() - Returns the records of a tank within a time range.
+
+    close() - Closes the database.
+
+    The tables are inventory (functions 201 and 21A), deliveries (202),
+    adjusted_deliveries (21B) and alarms (111, 112 and 114). Records are keyed
+    by the minute they were taken at, so storing the same record twice keeps
+    only the latest copy. Timestamps are those of the TLS system's own clock.
+
+    The database uses write-ahead logging, so other processes can open their
+    own TlsStore on the same file and query it while records are added. A
+    TlsStore should only be used by the thread that created it.
+    """
+
+    def __init__(self, path: str, timeout: float = 5.0):
+        """
+        path - The database file, created if it doesn't exist. Use ":memory:"
+        for a database that is not kept.
+
+        timeout - Seconds to wait for another process to finish writing.
+        """
+
+        self.path = path
+        self.connection = sqlite3.connect(path, timeout=timeout)
+        self._sites = {}
+
+        # With write-ahead logging, syncing on every checkpoint rather than on
+        # every commit can't corrupt the database, only lose the last commits
+        # if the machine loses power.
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS sites (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE)"
+            )
+
+            for table in _TABLES.values(): self.connection.execute(table.create())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Closes the database.
+        """
+
+        self.connection.close()
+
+    def add(self, site: str, code: str, report: dict) -> int:
+        """
+        Stores every record of a parsed report and returns how many were
+        stored.
+
+        site - The name of the TLS system the report came from, e.g. its
+        address or a station name.
+
+        code - The function code of the report, e.g. "201", or the command
+        such as "i20100".
+
+        report - The report as returned by its tls_3xx function, with or
+        without compact=True.
+        """
+
+        return self.add_many([(site, code, report)])
+
+    def add_many(self, reports) -> int:
+        """
+        Stores several parsed reports in a single transaction, which is much
+        faster than adding them one at a time, and returns how many records
+        were stored. If any report can't be stored, none of them are. Each
+        transaction rewrites a page per tank, so the more polls are stored
+        together, the less each record costs.
+
+        reports - An iterable of (site, code, report) tuples, as for add().
+        """
+
+        count = 0
+
+        with self._transaction():
+            for site, code, report in reports:
+                table, layout = _lookup(code)
+                rows = _report_rows(table, layout, self._site(site), report)
+
+                self.connection.executemany(table.insert, rows)
+                count += len(rows)
+
+        return count
+
+    def add_records(self, site: str, table: str, records, timestamp: datetime = None) -> int:
+        """
+        Stores records that are not part of a report and returns how many
+        were stored. Records must include their tank number and, if they have
+        one, their timestamp, the same as the records returned by HistorySync.
+
+        site - The name of the TLS system the records came from.
+
+        table - The table to store the records in, e.g. "deliveries".
+
+        records - The records as dicts or compact named tuples.
+
+        timestamp - The time the records were taken at, for records without
+        a timestamp of their own (e.g. tank inventory).
+        """
+
+        table = _table(table)
+        header = None if timestamp is None else _datetime_seconds(timestamp)
+
+        with self._transaction():
+            site = self._site(site)
+            rows = table.rows(site, list(records), {}, header)
+
+            self.connection.executemany(table.insert, rows)
+
+        return len(rows)
+
+    def query(self,
+              table: str,
+              site: str,
+              tank: str,
+              start: datetime = None,
+              end: datetime = None,
+              fields = None,
+              compact: bool = False) -> list:
+        """
+        Returns the records of a tank taken from start up to, but not
+        including, end, oldest first. Each record has its timestamp as a
+        datetime under "timestamp", followed by the requested fields.
+
+        table - The table to query, e.g. "inventory".
+
+        site - The name the records were stored under.
+
+        tank - The tank number, e.g. "03".
+
+        start, end - The time range to return. Either may be left out to
+        leave that end of the range open.
+
+        fields - The names of the fields to return, e.g. ["height"]. Every
+        field is returned if not given.
+
+        compact - Return each record as a named tuple instead of a dict.
+        """
+
+        table = _table(table)
+        fields = table.columns if fields is None else list(fields)
+
+        for name in fields:
+            if name not in table.types: raise ValueError(f"Table '{table.name}' has no field '{name}'.")
+
+        site = self._site(site, create=False)
+        if site is None: return []
+
+        # Ordering by the primary key lets SQLite read the range straight from
+        # the table without sorting it.
+        columns = "".join(f", {name}" for name in fields)
+        order = "".join(f", {name}" for name in table.key)
+        rows = self.connection.execute(
+            f"SELECT timestamp{columns} FROM {table.name} "
+            f"WHERE site = ? AND tank = ? AND timestamp >= ? AND timestamp < ? "
+            f"ORDER BY site, tank, timestamp{order}",
+            (
+                site, tank,
+                -2 ** 63 if start is None else _datetime_seconds(start),
+                2 ** 63 - 1 if end is None else _datetime_seconds(end)
+            )
+        )
+
+        names = ["timestamp", *fields]
+        convert = [index for index, name in enumerate(names) if name == "timestamp" or name in table.timestamps]
+        results = []
+
+        for row in rows:
+            row = list(row)
+
+            for index in convert:
+                if row[index] is not None: row[index] = _EPOCH + timedelta(seconds=row[index])
+
+            results.append(row)
+
+        if compact:
+            kind = record_type(table.record_name, names)
+            return [kind(*row) for row in results]
+
+        return [dict(zip(names, row)) for row in results]
+
+    @contextmanager
+    def _transaction(self):
+        """
+        Commits the statements run inside it, or rolls them back on an
+        exception along with the ids of any sites they created.
+        """
+
+        try:
+            with self.connection: yield
+
+        except BaseException:
+            self._sites.clear()
+            raise
+
+    def _site(self, name: str, create: bool = True) -> int:
+        """
+        Returns the id sites are stored under, which is much smaller than the
+        name in every row.
+        """
+
+        site = self._sites.get(name)
+        if site is not None: return site
+
+        if create:
+            self.connection.execute("INSERT OR IGNORE INTO sites (name) VALUES (?)", (name,))
+
+        row = self.connection.execute("SELECT id FROM sites WHERE name = ?", (name,)).fetchone()
+        if row is None: return None
+
+        self._sites[name] = row[0]
+
+        return row[0]
+
+def _lookup(code: str) -> tuple:
+    if len(code) > 3: code = code[1:4]
+
+    entry = _CODES.get(code.upper())
+    if entry is None: raise ValueError(f"Function code '{code}' can't be stored.")
+
+    return entry
+
+def _table(name: str) -> _Table:
+    table = _TABLES.get(name)
+    if table is None: raise ValueError(f"No table named '{name}'. Use one of: {', '.join(_TABLES)}.")
+
+    return table
+
+def _report_rows(table: _Table, layout, site: int, report: dict) -> list:
+    """
+    Returns the rows of every record in a parsed report.
+
+    layout - The FlatReport or GroupedReport the report was parsed with.
+    """
+
+    header = _seconds(*(report[part] for part in _TIMESTAMP_PARTS))
+    groups = report[layout.key]
+    records_key = getattr(layout, "records_key", None)
+
+    # Flat reports have no groups, and some grouped reports keep each group's
+    # records in a dict keyed by the group_by field.
+    if not hasattr(layout, "group"):
+        return table.rows(site, groups, {}, header)
+
+    rows = []
+
+    if records_key is None:
+        for key, records in groups.items():
+            rows += table.rows(site, records, {layout.group_by: key}, header)
+
+    else:
+        fields = [name for name, *_ in layout.group.fields if name != layout.count]
+
+        for group in groups:
+            rows += table.rows(site, group[records_key], {name: group[name] for name in fields}, header)
+
+    return rows
+
+def _seconds(year: int, month: int, day: int, hour: int, minute: int) -> int:
+    """
+    Converts the two-digit year timestamp of a TLS record to seconds since
+    1970.
+    """
+
+    try:
+        days = date(2000 + year, month, day).toordinal() - _EPOCH_ORDINAL
+
+    except ValueError:
+        raise ValueError(f"Invalid timestamp {year:02}{month:02}{day:02}{hour:02}{minute:02} in record.")
+
+    return days * 86400 + hour * 3600 + minute * 60
+
+def _datetime_seconds(value: datetime) -> int:
+    if not isinstance(value, datetime): raise ValueError("Timestamps must be datetimes.")
+
+    return int((value.replace(tzinfo=None) - _EPOCH).total_seconds())
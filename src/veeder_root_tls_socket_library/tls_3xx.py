@@ -1,639 +1,542 @@
 # tls_3xx.py - A series of functions used to extract data from TLS system outputs.
 
-from veeder_root_tls_socket_library.format import _get_timestamp, _split_data, _hex_to_float
+from veeder_root_tls_socket_library.format import _get_timestamp, _split_data, _hex_to_floats
+from veeder_root_tls_socket_library.schema import (
+    _CHUNK_TYPES, FLOAT, HEX, INT, STR, TEXT, FlatReport, GroupedReport, Record, RecordStream, floats,
+    record_type, timestamp
+)
+
+# Most responses are described below as data rather than code. Offsets come
+# from Section 7 of the Veeder-Root Serial Interface Manual 576013-635, and
+# are relative to the start of each record (or of the response for headers).
+
+_STATION_HEADERS = [
+    ("station_header_1", 10, 20, TEXT),
+    ("station_header_2", 30, 20, TEXT),
+    ("station_header_3", 50, 20, TEXT),
+    ("station_header_4", 70, 20, TEXT)
+]
+
+_ALARM = Record(20, [
+    ("alarm_category",  0, 2, INT),
+    ("sensor_category", 2, 2, INT),
+    ("alarm_type",      4, 2, INT),
+    ("tank_number",     6, 2, STR),
+    ("alarm_state",     8, 2, INT),
+    *timestamp(10)
+], name="Alarm")
+
+_STATELESS_ALARM = Record(18, [
+    ("alarm_category",  0, 2, INT),
+    ("sensor_category", 2, 2, INT),
+    ("alarm_type",      4, 2, INT),
+    ("tank_number",     6, 2, STR),
+    *timestamp(8)
+], name="AlarmEvent")
+
+_TANK_INVENTORY = Record(65, [
+    ("tank_number",      0, 2, STR),
+    ("product_code",     2, 1, STR),
+    ("tank_status_bits", 3, 4, HEX),
+    *floats(9, ["volume", "tc_volume", "ullage", "height", "water", "temperature", "water_volume"])
+], name="TankInventory")
+
+_DELIVERY_VARIANCE_GROUP = Record(8, [
+    ("tank_number",    0, 2, STR),
+    ("product_code",   2, 1, STR),
+    ("probe_type",     3, 2, STR),
+    ("delivery_count", 5, 3, INT)
+])
+
+# Function 222 deliveries vary in length, so only their compact type is declared.
+_BILL_OF_LADING_DELIVERY = record_type("BillOfLadingDelivery", [
+    "product_code", "probe_type", "year", "month", "day", "hour", "minute",
+    "bill_of_lading_number", "ticket_volume", "gauged_volume", "gauged_tc_volume"
+])
+
+_DELIVERY_VARIANCE = Record(36, [
+    *timestamp(0),
+    *floats(12, ["ticket_volume", "gauged_volume", "delivery_variance"])
+], name="DeliveryVariance")
+
+_REPORT_101 = FlatReport("alarms", 10, Record(6, [
+    ("alarm_category", 0, 2, INT),
+    ("alarm_type",     2, 2, INT),
+    ("tank_number",    4, 2, STR)
+], name="SystemAlarm"))
+
+_REPORT_102 = FlatReport("slots", 12, Record(20, [
+    ("slot_number",        0,  2, HEX),
+    ("type_of_module",     2,  2, STR),
+    ("power_on_reset",     4,  8, FLOAT),
+    ("current_io_reading", 12, 8, FLOAT)
+], name="IoSlot"))
+
+_REPORT_111 = FlatReport("alarms", 10, _ALARM)
+
+_REPORT_112 = FlatReport("alarms", 10, _ALARM)
+
+_REPORT_113 = FlatReport("alarms", 90, _STATELESS_ALARM, _STATION_HEADERS)
+
+_REPORT_114 = FlatReport("alarms", 90, _ALARM, _STATION_HEADERS)
+
+_REPORT_115 = FlatReport("alarms", 90, _STATELESS_ALARM, _STATION_HEADERS)
+
+_REPORT_116 = FlatReport("reports", 92, Record(25, [
+    *timestamp(0),
+    ("service_id",   10, 10, TEXT),
+    ("service_code", 20, 5,  TEXT)
+], name="ServiceReport"), _STATION_HEADERS + [("number_of_records", 90, 2, INT)])
+
+_REPORT_119 = FlatReport("records", 15, Record(18, [
+    *timestamp(0),
+    ("record_type", 10, 2, STR),
+    ("data_field",  12, 6, STR)
+], name="MaintenanceRecord"), [("number_of_records", 10, 5, INT)])
+
+_REPORT_11A = FlatReport("reports", 12, Record(20, [
+    *timestamp(0),
+    ("service_id",   10, 6, TEXT),
+    ("service_code", 16, 4, TEXT)
+], name="ServiceReport"), [("number_of_records", 10, 2, INT)])
+
+_REPORT_11B = FlatReport("reports", 23, Record(20, [
+    *timestamp(0, "start_"),
+    *timestamp(10, "end_")
+], name="ServiceNotice"), [
+    ("service_notice_session", 10, 1, INT),
+    *timestamp(11, "start_"),
+    ("number_of_records",      21, 2, HEX)
+])
+
+_REPORT_201 = FlatReport("tanks", 10, _TANK_INVENTORY)
+
+_REPORT_202 = GroupedReport("tanks", Record(5, [
+    ("tank_number",    0, 2, STR),
+    ("product_code",   2, 1, STR),
+    ("delivery_count", 3, 2, INT)
+]), "delivery_count", Record(102, [
+    *timestamp(0, "start_"),
+    *timestamp(10, "end_"),
+    *floats(22, [
+        "starting_volume", "starting_tc_volume", "starting_water", "starting_temp",
+        "ending_volume", "ending_tc_volume", "ending_water", "ending_temp",
+        "starting_height", "ending_height"
+    ])
+], name="Delivery"), records_key="deliveries")
+
+_REPORT_203 = FlatReport("tanks", 10, Record(57, [
+    ("tank_number",   0,  2, STR),
+    ("product_code",  2,  1, STR),
+    *timestamp(3, "start_"),
+    ("test_duration", 13, 2, INT),
+    *floats(17, ["starting_temp", "ending_temp", "starting_volume", "ending_rate", "hourly_changes"])
+], name="LeakTest"))
+
+_REPORT_204 = FlatReport("inventory", 10, Record(111, [
+    ("tank_number",  0, 2, STR),
+    ("product_code", 2, 1, STR),
+    ("shift_number", 3, 2, STR),
+    *floats(7, [
+        "start_volume", "start_ullage", "start_tc_volume", "start_height",
+        "start_water", "start_temperature", "end_volume", "end_ullage",
+        "end_tc_volume", "end_height", "end_water", "end_temperature", "total_value"
+    ])
+], name="ShiftInventory"))
+
+_REPORT_206 = GroupedReport("tanks", Record(4, [
+    ("tank_number", 0, 2, STR),
+    ("alarm_count", 2, 2, INT)
+]), "alarm_count", Record(14, [
+    *timestamp(0),
+    ("alarm_type", 10, 4, STR)
+], name="TankAlarm"))
+
+_REPORT_207 = GroupedReport("tanks", Record(4, [
+    ("tank_number", 0, 2, STR),
+    ("test_count",  2, 2, HEX)
+]), "test_count", Record(40, [
+    ("report_type",         0, 2, STR),
+    ("leak_history_number", 2, 2, STR),
+    ("test_type",           4, 2, STR),
+    *timestamp(6),
+    *floats(16, ["duration", "volume", "volume_percentage"])
+], name="LeakTestHistory"))
+
+_REPORT_208 = GroupedReport("tanks", Record(4, [
+    ("tank_number", 0, 2, STR),
+    ("test_count",  2, 2, HEX)
+]), "test_count", Record(40, [
+    ("test_result_type",     0, 2, STR),
+    ("test_manifold_status", 2, 2, STR),
+    *timestamp(4),
+    ("test_result",          14, 2, STR),
+    *floats(16, ["test_rate", "duration", "volume"])
+], name="LeakTestResult"))
+
+_REPORT_21A = FlatReport("tanks", 10, _TANK_INVENTORY)
+
+_REPORT_21B = GroupedReport("tanks", Record(4, [
+    ("tank_number",    0, 2, STR),
+    ("delivery_count", 2, 2, INT)
+]), "delivery_count", Record(190, [
+    *timestamp(0, "start_"),
+    *timestamp(10, "end_"),
+    *floats(22, [
+        "start_volume", "end_volume", "adjusted_delivery_volume",
+        "adjusted_temperature_compensated_delivery_volume", "start_fuel_height",
+        "start_fuel_temperature_1", "start_fuel_temperature_2", "start_fuel_temperature_3",
+        "start_fuel_temperature_4", "start_fuel_temperature_5", "start_fuel_temperature_6",
+        "end_fuel_height", "end_fuel_temperature_1", "end_fuel_temperature_2",
+        "end_fuel_temperature_3", "end_fuel_temperature_4", "end_fuel_temperature_5",
+        "end_fuel_temperature_6", "total_dispensed", "start_fuel_temperature_average",
+        "end_fuel_temperature_average"
+    ])
+], name="AdjustedDelivery"))
+
+_REPORT_221 = GroupedReport("tanks", _DELIVERY_VARIANCE_GROUP, "delivery_count", Record(60, [
+    *timestamp(0),
+    *floats(12, [
+        "ticket_volume", "gauged_volume", "delivery_variance",
+        "start_fuel_temperature", "end_fuel_temperature", "estimated_delivery_temperature"
+    ])
+], name="TicketedDelivery"), inherit=["product_code", "probe_type"])
+
+_REPORT_225 = GroupedReport("tanks", _DELIVERY_VARIANCE_GROUP, "delivery_count",
+    _DELIVERY_VARIANCE, inherit=["product_code", "probe_type"])
+
+_REPORT_226 = GroupedReport("tanks", _DELIVERY_VARIANCE_GROUP, "delivery_count",
+    _DELIVERY_VARIANCE, inherit=["product_code", "probe_type"])
+
+_REPORT_227 = GroupedReport("tanks", _DELIVERY_VARIANCE_GROUP, "delivery_count",
+    _DELIVERY_VARIANCE, inherit=["product_code", "probe_type"])
+
+_REPORT_251 = FlatReport("reports", 10, Record(4, [
+    ("tank_number",  0, 2, STR),
+    ("csld_results", 2, 2, STR)
+], name="CsldResult"))
+
+def _parse(report, response: str, compact: bool, columnar: bool) -> dict:
+    """
+    Validates a response and parses it using a report layout.
+
+    report - The FlatReport or GroupedReport describing the response.
+
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
+
+    compact - Return each record as a named tuple instead of a dict.
+
+    columnar - Return the records as a dict of NumPy arrays, one per field.
+    """
+
+    if not type(response) in _CHUNK_TYPES:
+        raise ValueError("Argument 'response' must be a string or bytes.")
 
-def function_101(response: str) -> dict:
+    if compact and columnar:
+        raise ValueError("Arguments 'compact' and 'columnar' cannot be used together.")
+
+    if columnar: return report.parse_columns(response)
+
+    return report.parse(response, compact)
+
+def _decode(response) -> str:
     """
-    Parses function 101 output from a Veeder-Root TLS device and returns a dict 
-    with report info.
+    Validates a response for the parsers that walk through it by hand, and
+    decodes it to a string if it was given as bytes. These reports are short
+    or rare enough that parsing them from bytes isn't worth it.
 
-    response - The byte response from the function converted to a string format.
+    response - The response data as a string, bytes or memoryview.
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    if not type(response) in _CHUNK_TYPES:
+        raise ValueError("Argument 'response' must be a string or bytes.")
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-    
-    data["alarms"] = []
+    if not type(response) == str: response = str(response, "utf-8")
 
-    # Get values from the remaining data, split up alarms.
-    response = response[10:]
-    data_length = 6
+    return response
 
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category": int(value[0:2]),
-                "alarm_type":     int(value[2:4]),
-                "tank_number":    value[4:6]
-            })
-
-    return data
-        
-def function_102(response: str) -> dict:
+def function_101(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 102 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 101 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.  
-    data = _get_timestamp(response)
-    
-    data["slots"] = []
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from the remaining data, split up slots.
-    response = response[12:]
-    data_length = 20
-
-    # Get values from each slot.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["slots"].append({
-                "slot_number":        int(value[0:2], 16),
-                "type_of_module":     value[2:4],
-                "power_on_reset":     _hex_to_float(value[4:12]),
-                "current_io_reading": _hex_to_float(value[12:19])
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_101, response, compact, columnar)
 
-def function_111(response: str) -> dict:
+def function_102(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 111 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 102 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    if not type(response) == str:
-        raise ValueError("Argument 'response' must be a string.")
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-    
-    data["alarms"] = []
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get values from the remaining data, split up alarms.
-    response = response[10:]
-    data_length = 20
+    return _parse(_REPORT_102, response, compact, columnar)
 
-    # Get values from each alarm.
-    if len(response) >= data_length:
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category":  int(value[0:2]),
-                "sensor_category": int(value[2:4]),
-                "alarm_type":      int(value[4:6]),
-                "tank_number":     value[6:8],
-                "alarm_state":     int(value[8:10]),
-                "year":            int(value[10:12]),
-                "month":           int(value[12:14]),
-                "day":             int(value[14:16]),
-                "hour":            int(value[16:18]),
-                "minute":          int(value[18:20])
-            })
-        
-    return data
-
-def function_112(response: str) -> dict:
+def function_111(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 112 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 111 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-    
-    data["alarms"] = []
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from the remaining data, split up alarms.
-    response = response[10:]
-    data_length = 20
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category":  int(value[0:2]),
-                "sensor_category": int(value[2:4]),
-                "alarm_type":      int(value[4:6]),
-                "tank_number":     value[6:8],
-                "alarm_state":     int(value[8:10]),
-                "year":            int(value[10:12]),
-                "month":           int(value[12:14]),
-                "day":             int(value[14:16]),
-                "hour":            int(value[16:18]),
-                "minute":          int(value[18:20])
-            })
-    
-    return data
+    return _parse(_REPORT_111, response, compact, columnar)
 
-def function_113(response: str) -> dict:
+def function_112(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 113 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 112 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
-
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-
-    # Store extra non-repeated info from this response.
-    data["station_header_1"] = response[10:30].strip()
-    data["station_header_2"] = response[30:50].strip()
-    data["station_header_3"] = response[50:70].strip()
-    data["station_header_4"] = response[70:90].strip()
-    
-    data["alarms"] = []
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Get values from the remaining data, split up alarms.
-    response = response[90:]
-    data_length = 18
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category":  int(value[0:2]),
-                "sensor_category": int(value[2:4]),
-                "alarm_type":      int(value[4:6]),
-                "tank_number":     value[6:8],
-                "year":            int(value[8:10]),
-                "month":           int(value[10:12]),
-                "day":             int(value[12:14]),
-                "hour":            int(value[14:16]),
-                "minute":          int(value[16:18])
-            })    
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_112, response, compact, columnar)
 
-def function_114(response: str) -> dict:
+def function_113(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 114 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 113 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
-
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Store extra non-repeated info from this response.
-    data["station_header_1"] = response[10:30].strip()
-    data["station_header_2"] = response[30:50].strip()
-    data["station_header_3"] = response[50:70].strip()
-    data["station_header_4"] = response[70:90].strip()
-    
-    data["alarms"] = []
-
-    # Get values from the remaining data, split up alarms.
-    response = response[90:]
-    data_length = 20
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category":  int(value[0:2]),
-                "sensor_category": int(value[2:4]),
-                "alarm_type":      int(value[4:6]),
-                "tank_number":     value[6:8],
-                "alarm_state":     int(value[8:10]),
-                "year":            int(value[10:12]),
-                "month":           int(value[12:14]),
-                "day":             int(value[14:16]),
-                "hour":            int(value[16:18]),
-                "minute":          int(value[18:20])
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_113, response, compact, columnar)
 
-def function_115(response: str) -> dict:
+def function_114(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 115 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 114 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Store extra non-repeated info from this response.
-    data["station_header_1"] = response[10:30].strip()
-    data["station_header_2"] = response[30:50].strip()
-    data["station_header_3"] = response[50:70].strip()
-    data["station_header_4"] = response[70:90].strip()
-
-    data["alarms"] = []
-
-    # Get values from the remaining data, split up alarms.
-    response = response[90:]
-    data_length = 18
-
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["alarms"].append({
-                "alarm_category":  int(value[0:2]),
-                "sensor_category": int(value[2:4]),
-                "alarm_type":      int(value[4:6]),
-                "tank_number":     value[6:8],
-                "year":            int(value[8:10]),
-                "month":           int(value[10:12]),
-                "day":             int(value[12:14]),
-                "hour":            int(value[14:16]),
-                "minute":          int(value[16:18])
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_114, response, compact, columnar)
 
-def function_116(response: str) -> dict:
+def function_115(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 116 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 115 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Store extra non-repeated info from this response.
-    data["station_header_1"] =  response[10:30].strip()
-    data["station_header_2"] =  response[30:50].strip()
-    data["station_header_3"] =  response[50:70].strip()
-    data["station_header_4"] =  response[70:90].strip()
-    data["number_of_records"] = int(response[90:92])
-
-    data["reports"] = []
-
-    # Get values from the remaining data, split up reports.
-    response = response[90:]
-    data_length = 25
-    
-    # Get values from each report.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["reports"].append({
-                "year":         int(value[0:2]),
-                "month":        int(value[2:4]),
-                "day":          int(value[4:6]),
-                "hour":         int(value[6:8]),
-                "minute":       int(value[8:10]),
-                "service_id":   value[10:20].strip(),
-                "service_code": value[20:25].strip()
-            })
-            
-    return data
+    return _parse(_REPORT_115, response, compact, columnar)
 
-def function_119(response: str) -> dict:
+def function_116(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 119 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 116 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
-
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-
-    # Store extra non-repeated info from this response.
-    data["number_of_records"] = int(response[10:14])
-    data["records"] = []
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Get values from the remaining data, split up records.
-    response = response[14:]
-    data_length = 18
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from each record.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["records"].append({
-                "year":        int(value[0:2]),
-                "month":       int(value[2:4]),
-                "day":         int(value[4:6]),
-                "hour":        int(value[6:8]),
-                "minute":      int(value[8:10]),
-                "record_type": value[10:12],
-                "data_field":  value[12:18]
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_116, response, compact, columnar)
 
-def function_11A(response: str) -> dict:
+def function_119(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 11A output from a Veeder-Root TLS device and returns a dict 
+    Parses function 119 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str:
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Store extra non-repeated info from this response.
-    data["number_of_records"] = int(response[10:12])
-    data["reports"] = []
-
-    # Get values from the remaining data, split up reports.
-    response = response[12:]
-    data_length = 20
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get values from each tank report.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["reports"].append({
-                "year":         int(value[0:2]),
-                "month":        int(value[2:4]),
-                "day":          int(value[4:6]),
-                "hour":         int(value[6:8]),
-                "minute":       int(value[8:10]),
-                "service_id":   value[10:16].strip(),
-                "service_code": value[16:20].strip()
-            })
-        
-    return data
+    return _parse(_REPORT_119, response, compact, columnar)
 
-def function_11B(response: str) -> dict:
+def function_11A(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 11B output from a Veeder-Root TLS device and returns a dict 
+    Parses function 11A output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Store extra non-repeated info from this response.
-    data["service_notice_session"] = int(response[10:11])
-    data["start_year"] =             int(response[11:13])
-    data["start_month"] =            int(response[13:15])
-    data["start_day"] =              int(response[15:17])
-    data["start_hour"] =             int(response[17:19])
-    data["start_minute"] =           int(response[19:21])
-    data["number_of_records"] =      int(response[21:23], 16)
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    data["reports"] = []
+    return _parse(_REPORT_11A, response, compact, columnar)
 
-    # Get values from the remaining data, split up reports.
-    response = response[23:]
-    data_length = 20
+def function_11B(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 11B output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    # Get values from each tank report.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["reports"].append({
-                "start_year":   int(value[0:2]),
-                "start_month":  int(value[2:4]),
-                "start_day":    int(value[4:6]),
-                "start_hour":   int(value[6:8]),
-                "start_minute": int(value[8:10]),
-                "end_year":     int(value[10:12]),
-                "end_month":    int(value[12:14]),
-                "end_day":      int(value[14:16]),
-                "end_hour":     int(value[16:18]),
-                "end_minute":   int(value[18:20])
-            })
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    return data
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-def function_201(response: str) -> dict:
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
     """
-    Parses function 201 output from a Veeder-Root TLS device and returns a dict 
-    with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    return _parse(_REPORT_11B, response, compact, columnar)
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+def function_201(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 201 output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    data["tanks"] = []
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from the remaining data, split up tank reports.
-    response = response[10:]
-    data_length = 65
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get values from each tank report.
-    if len(response) >= data_length:
-        for value in _split_data(response, data_length):
-            data["tanks"].append({
-                "tank_number":      value[0:2],
-                "product_code":     value[2:3],
-                "tank_status_bits": int(value[3:7], 16),
-                "volume":           _hex_to_float(value[9:17]),
-                "tc_volume":        _hex_to_float(value[17:25]),
-                "ullage":           _hex_to_float(value[25:33]),
-                "height":           _hex_to_float(value[33:41]),
-                "water":            _hex_to_float(value[41:49]),
-                "temperature":      _hex_to_float(value[49:57]),
-                "water_volume":     _hex_to_float(value[57:65])
-            })
-    
-    return data
+    return _parse(_REPORT_201, response, compact, columnar)
 
-def function_202(response: str) -> dict:
+def function_202(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 202 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 202 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    data["tanks"] = []
+    return _parse(_REPORT_202, response, compact, columnar)
 
-    # Get values from the remaining data, split up tank reports.
-    response = response[10:]
+def iter_function_202(response, compact: bool = False) -> RecordStream:
+    """
+    Parses function 202 output from a Veeder-Root TLS device one delivery at a
+    time, and can do so while the response is still arriving. Each delivery is
+    yielded with the tank fields it belongs to. The report timestamp is stored
+    in the header attribute of the returned stream.
 
-    # Get values from each tank report.
-    while response:
-        if len(response) < 107: break
-
-        # Collecting all necessary non-repeated values.
-        delivery_count = int(response[3:5])
-
-        tank = {
-            "tank_number":  response[0:2],
-            "product_code": response[2:3],
-            "deliveries":   []
-        }
-
-        # Slicing off previously collected values, now getting all deliveries.
-        response = response[5:]
-
-        for _ in range(0, delivery_count):
-            if len(response) < 100: break
-
-            tank["deliveries"].append({
-                "start_year":           int(response[0:2]),
-                "start_month":          int(response[2:4]),
-                "start_day":            int(response[4:6]),
-                "start_hour":           int(response[6:8]),
-                "start_minute":         int(response[8:10]),
-                "end_year":             int(response[10:12]),
-                "end_month":            int(response[12:14]),
-                "end_day":              int(response[14:16]),
-                "end_hour":             int(response[16:18]),
-                "end_minute":           int(response[18:20]),
-                "starting_volume":      _hex_to_float(response[22:30]),
-                "starting_tc_volume":   _hex_to_float(response[30:38]),
-                "starting_water":       _hex_to_float(response[38:46]),
-                "starting_temp":        _hex_to_float(response[46:54]),
-                "ending_volume":        _hex_to_float(response[54:62]),
-                "ending_tc_volume":     _hex_to_float(response[62:70]),
-                "ending_water":         _hex_to_float(response[70:78]),
-                "ending_temp":          _hex_to_float(response[78:86]),
-                "starting_height":      _hex_to_float(response[86:94]),
-                "ending_height":        _hex_to_float(response[94:102])
-            })
+    response - The byte response from the function converted to a string
+    format, an iterable of chunks of it, or an async iterable of chunks such
+    as AsyncTlsSocket.stream("i20200").
 
-            response = response[102:]
-        
-        data["tanks"].append(tank)
+    compact - Yield each delivery as a named tuple instead of a dict.
+    """
 
-    return data
+    return RecordStream(_REPORT_202, response, compact)
 
-def function_203(response: str) -> dict:
+def function_203(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 203 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 203 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
-
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    data["tanks"] = []
-
-    # Get values from the remaining data, split up tank reports.
-    response = response[10:]
-    data_length = 57
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Get values from each tank report.
-    if len(response) >= data_length:
-        for value in _split_data(response, data_length):
-            data["tanks"].append({
-                "tank_number":     value[0:2],
-                "product_code":    value[2:3],
-                "start_year":      int(value[3:5]),
-                "start_month":     int(value[5:7]),
-                "start_day":       int(value[7:9]),
-                "start_hour":      int(value[9:11]),
-                "start_minute":    int(value[11:13]),
-                "test_duration":   int(value[13:15]),
-                "starting_temp":   _hex_to_float(value[17:25]),
-                "ending_temp":     _hex_to_float(value[25:33]),
-                "starting_volume": _hex_to_float(value[33:41]),
-                "ending_rate":     _hex_to_float(value[41:49]),
-                "hourly_changes":  _hex_to_float(value[49:57])
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_203, response, compact, columnar)
 
-def function_204(response: str) -> dict:
+def function_204(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 204 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 204 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
-
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.    
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    data["inventory"] = []
-
-    # Get values from the remaining data, split up the inventory.
-    response = response[10:]
-    data_length = 111
-
-    # Get values from each inventory log.
-    if len(response) >= data_length:
-        for value in _split_data(response, data_length):
-            data["inventory"].append({
-                "tank_number":       value[0:2],
-                "product_code":      value[2:3],
-                "shift_number":      value[3:5],
-                "start_volume":      _hex_to_float(value[7:15]),
-                "start_ullage":      _hex_to_float(value[15:23]),
-                "start_tc_volume":   _hex_to_float(value[23:31]),
-                "start_height":      _hex_to_float(value[31:39]),
-                "start_water":       _hex_to_float(value[39:47]),
-                "start_temperature": _hex_to_float(value[47:55]),
-                "end_volume":        _hex_to_float(value[55:63]),
-                "end_ullage":        _hex_to_float(value[63:71]),
-                "end_tc_volume":     _hex_to_float(value[71:79]),
-                "end_height":        _hex_to_float(value[79:87]),
-                "end_water":         _hex_to_float(value[87:95]),
-                "end_temperature":   _hex_to_float(value[95:103]),
-                "total_value":       _hex_to_float(value[103:111])
-            })
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    return data
+    return _parse(_REPORT_204, response, compact, columnar)
 
 def function_205(response: str) -> dict:
     """
-    Parses function 205 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 205 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response = _decode(response)
 
     # Execute the command and extract common values from it immediately.
     data = _get_timestamp(response)
@@ -664,378 +567,287 @@ def function_205(response: str) -> dict:
 
     return data
 
-def function_206(response: str) -> dict:
+def function_206(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 206 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 206 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    data["tanks"] = {}
+    return _parse(_REPORT_206, response, compact, columnar)
 
-    # Get the list of alarms for each tank after finding alarm per tank count.
-    response = response[10:]
+def function_207(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 207 output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    while response:
-        if len(response) < 18: break
-
-        # Collect tank number and alarm count, then slice them out of the data.
-        tank_number = response[0:2]
-        alarm_count = int(response[2:4])
-
-        response = response[4:]
-
-        # Create a dictionary for the tank and add the alarms into a list.
-        data["tanks"][tank_number] = []
-    
-        for _ in range(0, alarm_count):
-            if len(response) < 14: break
-            
-            data["tanks"][tank_number].append({
-                "year":       int(response[0:2]),
-                "month":      int(response[2:4]),
-                "day":        int(response[4:6]),
-                "hour":       int(response[6:8]),
-                "minute":     int(response[8:10]),
-                "alarm_type": response[10:14]
-            })
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-            # Slice off values that have already been added.
-            response = response[14:]
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    return data
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
+
+    return _parse(_REPORT_207, response, compact, columnar)
 
-def function_207(response: str) -> dict:
+def function_208(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 207 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 208 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
-    """
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    data["tanks"] = {}
+    return _parse(_REPORT_208, response, compact, columnar)
 
-    # Get the list of tests for each tank after finding test per tank count.
-    response = response[10:]
+# Functions 20A through 219 need to be added.
 
-    while response:
-        if len(response) < 44: break
-
-        # Collect tank number and test count, then slice them out.
-        tank_number = response[0:2]
-        test_count = int(response[2:4], 16)
-
-        response = response[4:]
-
-        # Create a dictionary for the tank and add the tests into an list.
-        data["tanks"][tank_number] = []
-    
-        for _ in range(0, test_count):
-            if len(response) < 40: break
-            
-            data["tanks"][tank_number].append({
-                "report_type":         response[0:2],
-                "leak_history_number": response[2:4],
-                "test_type":           response[4:6],
-                "year":                int(response[6:8]),
-                "month":               int(response[8:10]),
-                "day":                 int(response[10:12]),
-                "hour":                int(response[12:14]),
-                "minute":              int(response[14:16]),
-                "duration":            _hex_to_float(response[16:24]),
-                "volume":              _hex_to_float(response[24:32]),
-                "volume_percentage":   _hex_to_float(response[32:40])
-            })
+def function_21A(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 21A output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-            # Slice off values that have already been added.
-            response = response[40:]
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    return data
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-def function_208(response: str) -> dict:
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
     """
-    Parses function 208 output from a Veeder-Root TLS device and returns a 
-    with report info.
 
-    response - The byte response from the function converted to a string format.
+    return _parse(_REPORT_21A, response, compact, columnar)
+
+# The TLS system I am using does not support this function. This is untested.
+def function_21B(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
+    Parses function 21B output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    data["tanks"] = {}
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get the list of tests for each tank after finding test per tank count.
-    response = response[10:]
+    return _parse(_REPORT_21B, response, compact, columnar)
 
-    while response:
-        if len(response) < 44: break
-
-        # Collect tank number and test count, then slice them out.
-        tank_number = response[0:2]
-        test_count = int(response[2:4], 16)
-
-        response = response[4:]
-
-        # Create a dictionary for the tank and add the tests into an list.
-        data["tanks"][tank_number] = []
-    
-        for _ in range(0, test_count):
-            if len(response) < 40: break
-            
-            data["tanks"][tank_number].append({
-                "test_result_type":     response[0:2],
-                "test_manifold_status": response[2:4],
-                "year":                 int(response[4:6]),
-                "month":                int(response[6:8]),
-                "day":                  int(response[8:10]),
-                "hour":                 int(response[10:12]),
-                "minute":               int(response[12:14]),
-                "test_result":          response[14:16],
-                "test_rate":            _hex_to_float(response[16:24]),
-                "duration":             _hex_to_float(response[24:32]),
-                "volume":               _hex_to_float(response[32:40])
-            })
+def iter_function_21B(response, compact: bool = False) -> RecordStream:
+    """
+    Parses function 21B output from a Veeder-Root TLS device one delivery at a
+    time, and can do so while the response is still arriving. Each delivery is
+    yielded with the tank fields it belongs to. The report timestamp is stored
+    in the header attribute of the returned stream.
 
-            # Slice off values that have already been added.
-            response = response[40:]
+    response - The byte response from the function converted to a string
+    format, an iterable of chunks of it, or an async iterable of chunks such
+    as AsyncTlsSocket.stream("i21B00").
 
-    return data
+    compact - Yield each delivery as a named tuple instead of a dict.
+    """
 
-# Functions 20A through 219 need to be added.
+    return RecordStream(_REPORT_21B, response, compact)
 
-def function_21A(response: str) -> dict:
+def function_221(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 21A output from a Veeder-Root TLS device and returns a dict 
+    Parses function 221 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
+
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
+
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    return _parse(_REPORT_221, response, compact, columnar)
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+def iter_function_221(response, compact: bool = False) -> RecordStream:
+    """
+    Parses function 221 output from a Veeder-Root TLS device one delivery at a
+    time, and can do so while the response is still arriving. Each delivery is
+    yielded with the tank fields it belongs to. The report timestamp is stored
+    in the header attribute of the returned stream.
 
-    data["tanks"] = []
+    response - The byte response from the function converted to a string
+    format, an iterable of chunks of it, or an async iterable of chunks such
+    as AsyncTlsSocket.stream("i22100").
 
-    # Get values from the remaining data, split up tank reports.
-    response = response[10:]
-    data_length = 65
+    compact - Yield each delivery as a named tuple instead of a dict.
+    """
 
-    # Get values from each tank report.
-    if len(response) >= data_length:
-        for value in _split_data(response, data_length):
-            data["tanks"].append({
-                "tank_number":      value[0:2],
-                "product_code":     value[2:3],
-                "tank_status_bits": int(value[3:7], 16),
-                "volume":           _hex_to_float(value[9:17]),
-                "tc_volume":        _hex_to_float(value[17:25]),
-                "ullage":           _hex_to_float(value[25:33]),
-                "height":           _hex_to_float(value[33:41]),
-                "water":            _hex_to_float(value[41:49]),
-                "temperature":      _hex_to_float(value[49:57]),
-                "water_volume":     _hex_to_float(value[57:65])
-            })
-    
-    return data
+    return RecordStream(_REPORT_221, response, compact)
 
-# The TLS system I am using does not support this function. This is untested.
-def function_21B(response: str) -> dict:
+def function_222(response: str, compact: bool = False) -> dict:
     """
-    Parses function 21B output from a Veeder-Root TLS device and returns a dict 
+    Parses function 222 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
+
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response = _decode(response)
 
     # Execute the command and extract common values from it immediately.
     data = _get_timestamp(response)
 
     data["tanks"] = {}
 
-    # Get the list of deliveries for each tank.
-    response = response[10:]
+    # Bill of lading numbers vary in length, so deliveries can't be described
+    # as fixed-length records and are walked through by offset instead.
+    position = 10
+    end = len(response)
 
-    while response:
-        if len(response) < 194: break
-
-        # Collect tank number and delivery count, then slice them out.
-        tank_number = response[0:2]
-        delivery_count = int(response[2:4])
-
-        response = response[4:]
-
-        # Create a dictionary for the tank and add the deliveries into an list.
-        data["tanks"][tank_number] = []
-    
-        for _ in range(0, delivery_count):
-            if len(response) < 190: break
-            
-            data["tanks"][tank_number].append({
-                "start_year":                                       int(response[0:2]),
-                "start_month":                                      int(response[2:4]),
-                "start_day":                                        int(response[4:6]),
-                "start_hour":                                       int(response[6:8]),
-                "start_minute":                                     int(response[8:10]),
-                "end_year":                                         int(response[10:12]),
-                "end_month":                                        int(response[12:14]),
-                "end_day":                                          int(response[14:16]),
-                "end_hour":                                         int(response[16:18]),
-                "end_minute":                                       int(response[18:20]),
-                "start_volume":                                     _hex_to_float(response[22:30]),
-                "end_volume":                                       _hex_to_float(response[30:38]),
-                "adjusted_delivery_volume":                         _hex_to_float(response[38:46]),
-                "adjusted_temperature_compensated_delivery_volume": _hex_to_float(response[46:54]),
-                "start_fuel_height":                                _hex_to_float(response[54:62]),
-                "start_fuel_temperature_1":                         _hex_to_float(response[62:70]),
-                "start_fuel_temperature_2":                         _hex_to_float(response[70:78]),
-                "start_fuel_temperature_3":                         _hex_to_float(response[78:86]),
-                "start_fuel_temperature_4":                         _hex_to_float(response[86:94]),
-                "start_fuel_temperature_5":                         _hex_to_float(response[94:102]),
-                "start_fuel_temperature_6":                         _hex_to_float(response[102:110]),
-                "end_fuel_height":                                  _hex_to_float(response[110:118]),
-                "end_fuel_temperature_1":                           _hex_to_float(response[118:126]),
-                "end_fuel_temperature_2":                           _hex_to_float(response[126:134]),
-                "end_fuel_temperature_3":                           _hex_to_float(response[134:142]),
-                "end_fuel_temperature_4":                           _hex_to_float(response[142:150]),
-                "end_fuel_temperature_5":                           _hex_to_float(response[150:158]),
-                "end_fuel_temperature_6":                           _hex_to_float(response[158:166]),
-                "total_dispensed":                                  _hex_to_float(response[166:174]),
-                "start_fuel_temperature_average":                   _hex_to_float(response[174:182]),
-                "end_fuel_temperature average":                     _hex_to_float(response[182:190])
-            })
+    while end - position >= _DELIVERY_VARIANCE_GROUP.length:
+        tank = _DELIVERY_VARIANCE_GROUP.parse(response, position)
+        position += _DELIVERY_VARIANCE_GROUP.length
+
+        deliveries = data["tanks"][tank["tank_number"]] = []
+
+        for _ in range(0, tank["delivery_count"]):
+            if end - position < 14: return data
+
+            bill_of_lading_length = int(response[position + 10:position + 12], 16)
+            fields_start = position + 12 + bill_of_lading_length
+            field_count = int(response[fields_start:fields_start + 2], 16)
+            record_end = fields_start + 2 + field_count * 8
+
+            if field_count < 3 or record_end > end: return data
 
-            # Slice off values that have already been added.
-            response = response[190:]
+            values = _hex_to_floats(response[fields_start + 2:record_end])
+
+            delivery = {
+                "product_code":          tank["product_code"],
+                "probe_type":            tank["probe_type"],
+                **_get_timestamp(response[position:position + 10]),
+                "bill_of_lading_number": response[position + 12:fields_start],
+                "ticket_volume":         values[0],
+                "gauged_volume":         values[1],
+                "gauged_tc_volume":      values[2]
+            }
+
+            if compact: delivery = _BILL_OF_LADING_DELIVERY(**delivery)
+
+            deliveries.append(delivery)
+
+            position = record_end
 
     return data
 
-def function_221(response: str) -> dict:
-    """
-    Parses function 221 output from a Veeder-Root TLS device and returns a dict 
-    with report info.
+# Functions 223 and 224 are not documented for TLS-3XX systems.
 
-    response - The byte response from the function converted to a string format.
+def function_225(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
+    Parses function 225 output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    data["reports"] = []
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-    # Get values from the remaining data, split up reports.
-    response = response[10:]
+    return _parse(_REPORT_225, response, compact, columnar)
 
-    while response:
-        if len(response) < 68: break
-
-        # Collect tank number and alarm count, then slice them out.
-        tank_number    = response[0:2]
-        product_code   = response[2:3]
-        probe_type     = response[3:5]
-        delivery_count = int(response[5:8])
-
-        response = response[8:]
-
-        # Create a dictionary for the tank and add the alarms into an list.
-        data["reports"][tank_number] = []
-    
-        for _ in range(0, delivery_count):
-            if len(response) < 60: break
-            
-            data["tanks"][tank_number].append({
-                "product_code":                   product_code,
-                "probe_type":                     probe_type,
-                "year":                           int(response[0:2]),
-                "month":                          int(response[2:4]),
-                "day":                            int(response[4:6]),
-                "hour":                           int(response[6:8]),
-                "minute":                         int(response[8:10]),
-                "ticket_volume":                  _hex_to_float(response[12:20]),
-                "gauged_volume":                  _hex_to_float(response[20:28]),
-                "delivery_variance":              _hex_to_float(response[28:36]),
-                "start_fuel_temperature":         _hex_to_float(response[36:44]),
-                "end_fuel_temperature":           _hex_to_float(response[44:52]),
-                "estimated_delivery_temperature": _hex_to_float(response[52:60])
-            })
+def function_226(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 226 output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-            # Slice off values that have already been added.
-            response = response[60:]
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    return data
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
 
-# Functions 222 through 227 need to be added.
+    return _parse(_REPORT_226, response, compact, columnar)
 
-def function_251(response: str) -> dict:
+def function_227(response: str, compact: bool = False, columnar: bool = False) -> dict:
     """
-    Parses function 251 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 227 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
+
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
+
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    return _parse(_REPORT_227, response, compact, columnar)
 
-    # Execute the command and extract common values from it immediately.
-    data = _get_timestamp(response)
-    
-    data["reports"] = []
+def function_251(response: str, compact: bool = False, columnar: bool = False) -> dict:
+    """
+    Parses function 251 output from a Veeder-Root TLS device and returns a dict
+    with report info.
 
-    # Get values from the remaining data, split up reports.
-    response = response[10:]
-    data_length = 4
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
 
-    # Get values from each alarm.
-    if len(response) >= data_length: 
-        for value in _split_data(response, data_length):
-            data["reports"].append({
-                "tank_number":  value[0:2],
-                "csld_results": value[2:4] 
-            })
+    compact - Return each record as a named tuple with a to_dict() method
+    instead of a dict, which uses far less memory for large reports.
 
-    return data
+    columnar - Return the records as a dict of NumPy arrays, one per field,
+    instead of a list. Requires NumPy.
+    """
+
+    return _parse(_REPORT_251, response, compact, columnar)
 
 def function_602(response: str) -> dict:
     """
-    Parses function 602 output from a Veeder-Root TLS device and returns a dict 
+    Parses function 602 output from a Veeder-Root TLS device and returns a dict
     with report info.
 
-    response - The byte response from the function converted to a string format.
+    response - The byte response from the function converted to a string format,
+    or the bytes or memoryview itself, e.g. from TlsSocket.execute(raw=True).
     """
 
-    if not type(response) == str: 
-        raise ValueError("Argument 'response' must be a string.")
+    response = _decode(response)
 
     # Execute the command and extract common values from it immediately.
     data = _get_timestamp(response)
-    
+
     data["labels"] = {}
 
     # Get values from the remaining data, split up labels.
@@ -1043,11 +855,11 @@ def function_602(response: str) -> dict:
     data_length = 22
 
     # Get values from each alarm.
-    if len(response) >= data_length: 
+    if len(response) >= data_length:
         for value in _split_data(response, data_length):
             tank_number = int(value[0:2])
             label = str(value[2:23]).strip()
 
             data["labels"][tank_number] = label
 
-    return data
\ No newline at end of file
+    return data
@@ -0,0 +1,134 @@
+# tracing.py - Records OpenTelemetry spans for TLS connections, commands and parsing.
+
+from contextvars import ContextVar
+from time import time_ns
+
+from veeder_root_tls_socket_library.observer import TlsObserver
+
+# The span of the last command executed in the current thread or task, so
+# that parsing its response can be traced as a child of it.
+_last_command = ContextVar("_last_command", default=None)
+
+class TracingObserver(TlsObserver):
+    """
+    Turns the events of TlsSocket and AsyncTlsSocket into OpenTelemetry spans.
+    OpenTelemetry is only imported when an instance is created, so the library
+    does not depend on it unless tracing is enabled.
+
+    parse() - Runs a tls_3xx parser function inside a span that is a child of
+    the span of the last command executed in the same thread or task.
+
+    Each command becomes a tls.execute span with a tls.verify_checksum child
+    span, and each connection attempt becomes a tls.connect span. Spans are
+    created after the fact from the observer timings, and are children of
+    whichever span is current when the command runs, e.g. a span covering a
+    whole fleet poll. They have these attributes:
+
+    server.address, server.port - The TLS system.
+
+    tls.command, tls.function_code - The command sent, e.g. i20100 and 201.
+
+    tls.bytes_sent, tls.bytes_received - Bytes of the command and response.
+
+    tls.retries_used - The amount of reads it took to receive the response.
+    TlsSocket uses up one of its retries for each of them.
+
+    tls.time_to_first_byte - Seconds until the first byte of the response.
+    """
+
+    def __init__(self, tracer = None):
+        """
+        tracer - The OpenTelemetry tracer to create spans with. Defaults to
+        the tracer of the global tracer provider.
+        """
+
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError("TracingObserver requires OpenTelemetry: pip install opentelemetry-api") from None
+
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("veeder_root_tls_socket_library")
+
+    def on_connect(self, event: dict):
+        end = time_ns()
+        span = self.tracer.start_span(
+            "tls.connect",
+            start_time=end - int(event["connect_time"] * 1e9),
+            attributes={"server.address": event["host"], "server.port": event["port"]}
+        )
+
+        self._end(span, event["error"], end)
+
+    def on_command(self, event: dict):
+        end = time_ns()
+        command = event["command"]
+
+        attributes = {
+            "server.address":     event["host"],
+            "server.port":        event["port"],
+            "tls.command":        command,
+            "tls.function_code":  command[1:4],
+            "tls.bytes_sent":     event["bytes_sent"],
+            "tls.bytes_received": event["bytes_received"]
+        }
+
+        if event["chunks"] is not None:             attributes["tls.retries_used"] = event["chunks"]
+        if event["time_to_first_byte"] is not None: attributes["tls.time_to_first_byte"] = event["time_to_first_byte"]
+
+        span = self.tracer.start_span(
+            "tls.execute",
+            start_time=end - int(event["total_time"] * 1e9),
+            attributes=attributes
+        )
+
+        if event["checksum_time"] is not None:
+            child = self.tracer.start_span(
+                "tls.verify_checksum",
+                context=self._trace.set_span_in_context(span),
+                start_time=end - int(event["checksum_time"] * 1e9)
+            )
+
+            # A bad checksum or an error reply is only found while checking.
+            self._end(child, event["error"] if isinstance(event["error"], ValueError) else None, end)
+
+        self._end(span, event["error"], end)
+        _last_command.set(span)
+
+    def parse(self, parser, response: str, *args, **kwargs):
+        """
+        Calls parser with the response and any other arguments inside a
+        tls.parse span, and returns what it returns.
+
+        parser - A function from tls_3xx.py, e.g. tls_3xx.function_201.
+
+        response - The response to parse.
+        """
+
+        parent = _last_command.get()
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+
+        span = self.tracer.start_span(
+            "tls.parse",
+            context=context,
+            attributes={"tls.parser": parser.__name__, "tls.response_length": len(response)}
+        )
+
+        error = None
+
+        try:
+            return parser(response, *args, **kwargs)
+
+        except Exception as exception:
+            error = exception
+            raise
+
+        finally:
+            self._end(span, error, time_ns())
+
+    def _end(self, span, error: Exception, end: int):
+        if error is not None:
+            span.record_exception(error)
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, str(error)))
+
+        span.end(end_time=end)
@@ -2,8 +2,13 @@
 
 from datetime import date
 from os import environ
+import asyncio
 import unittest
 from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool
+from veeder_root_tls_socket_library.protocol import encode_command
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.tls_3xx import function_101
 
 class TestAsyncTlsSocket(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
@@ -38,6 +43,58 @@ class TestAsyncTlsSocket(unittest.IsolatedAsyncioTestCase):
             with self.assertRaises(ValueError):
                 await tls.execute("test")
 
+    async def test_execute_many(self):
+        """
+        Verify that AsyncTlsSocket.execute_many() returns responses and errors in command order.
+        """
+
+        expected = date.today().strftime("%y%m")
+
+        async with AsyncTlsSocket(self.ip, self.port) as tls:
+            responses = await tls.execute_many(["i10100", "test", "i10100"])
+
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(responses[0][:4], expected)
+        self.assertIsInstance(responses[1], ValueError)
+        self.assertEqual(responses[2][:4], expected)
+
+    async def test_execute_and_parse(self):
+        """
+        Verify that AsyncTlsSocket.execute_and_parse() returns the same result as parsing execute() by hand.
+        """
+
+        async with AsyncTlsSocket(self.ip, self.port) as tls:
+            expected = function_101(await tls.execute("i10100"))
+            actual = await tls.execute_and_parse("i10100", compact=True)
+
+            with self.assertRaises(ValueError):
+                await tls.execute_and_parse("test")
+
+        self.assertEqual(actual["minute"], expected["minute"])
+        self.assertEqual([alarm.to_dict() for alarm in actual["alarms"]], expected["alarms"])
+
+    async def test_stream(self):
+        """
+        Verify that AsyncTlsSocket.stream() yields the same output as AsyncTlsSocket.execute().
+        """
+
+        async with AsyncTlsSocket(self.ip, self.port) as tls:
+            expected = await tls.execute("i10100")
+            actual = "".join([chunk async for chunk in tls.stream("i10100", chunk_size=4)])
+
+        # The minutes in the timestamp can roll over between the two commands.
+        self.assertEqual(expected[:8], actual[:8])
+        self.assertEqual(expected[10:], actual[10:])
+
+    async def test_stream_invalid_command(self):
+        """
+        Verify that AsyncTlsSocket.stream() handles invalid commands by returning a ValueError.
+        """
+
+        async with AsyncTlsSocket(self.ip, self.port) as tls:
+            with self.assertRaises(ValueError):
+                async for _ in tls.stream("test"): pass
+
     async def test_checksum(self):
         """
         Verify that AsyncTlsSocket._data_integrity_check() correctly validates outputs.
@@ -242,5 +299,73 @@ class TestAsyncTlsSocket(unittest.IsolatedAsyncioTestCase):
 
             self.assertEqual(actual, expected)
 
+class TestLateResponses(unittest.IsolatedAsyncioTestCase):
+    async def test_execute_many_timeout(self):
+        """
+        Verify that a response arriving after AsyncTlsSocket.execute_many() timed out isn't read as the next response.
+        """
+
+        async with TlsSimulator(latency=0.3, seed=1) as simulator:
+            async with AsyncTlsSocketPool(timeout=0.2) as pool:
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    results = await tls.execute_many(["i20100"])
+
+                    self.assertIsInstance(results[0], TimeoutError)
+                    self.assertFalse(tls._is_open())
+
+                    with self.assertRaises(ConnectionError):
+                        await tls.execute("i60200")
+
+                pool.timeout = 1
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    response = await tls.execute("i60200")
+
+            self.assertEqual(response, simulator.respond("i60200")[7:-7].decode())
+
+    async def test_stream_left_early(self):
+        """
+        Verify that leaving AsyncTlsSocket.stream() before the end of the response closes the connection.
+        """
+
+        async with TlsSimulator(tanks=8, deliveries=20, chunk_size=256, chunk_delay=0.005, seed=1) as simulator:
+            async with AsyncTlsSocketPool() as pool:
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    async for _ in tls.stream("i20200", chunk_size=64): break
+
+                    self.assertFalse(tls._is_open())
+
+                    with self.assertRaises(ConnectionError):
+                        await tls.execute("i60200")
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    response = await tls.execute("i60200")
+
+            self.assertEqual(response, simulator.respond("i60200")[7:-7].decode())
+
+    async def test_stream_read_ahead(self):
+        """
+        Verify that AsyncTlsSocket.stream() leaves anything received after its response for the next command.
+        """
+
+        commands = ["i10100", "i60200"]
+
+        async with TlsSimulator(seed=1) as simulator:
+            expected = sum(len(simulator.respond(command)) for command in commands)
+
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                # Both responses are waiting in the reader before the stream is started.
+                tls.writer.write(b"".join(encode_command(command) for command in commands))
+
+                while len(tls.reader._buffer) < expected:
+                    await asyncio.sleep(0.01)
+
+                streamed = "".join([chunk async for chunk in tls.stream("i20100")])
+                following = [await tls.execute("i20100"), await tls.execute("i20100")]
+
+            responses = [simulator.respond(command)[7:-7].decode() for command in commands + ["i20100"]]
+
+        self.assertEqual([streamed, *following], responses)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
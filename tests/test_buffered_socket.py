@@ -0,0 +1,166 @@
+# test_buffered_socket.py - Tests whether or not the BufferedAsyncTlsSocket class operates as intended.
+
+from datetime import date
+from os import environ
+import asyncio
+import unittest
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.buffered_socket import BufferedAsyncTlsSocket
+from veeder_root_tls_socket_library.fleet import FleetPoller
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.tls_3xx import function_21B, function_602
+
+class TestBufferedAsyncTlsSocket(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ip   = environ.get("TLS_IP")
+        self.port = environ.get("TLS_PORT")
+
+        if not self.ip or self.port is None:
+            raise ValueError("TLS_IP and TLS_PORT environment variables must have values.")
+
+        self.port = int(self.port)
+
+    async def test_valid_command(self):
+        """
+        Verify that BufferedAsyncTlsSocket.execute() and your system return the same date to test communication.
+        """
+
+        expected = date.today().strftime("%y%m")
+
+        async with BufferedAsyncTlsSocket(self.ip, self.port) as tls:
+            response = await tls.execute("i10100")
+
+        self.assertEqual(response[:4], expected)
+
+    async def test_invalid_command(self):
+        """
+        Verify that BufferedAsyncTlsSocket.execute() handles invalid commands by returning a ValueError.
+        """
+
+        async with BufferedAsyncTlsSocket(self.ip, self.port) as tls:
+            with self.assertRaises(ValueError):
+                await tls.execute("test")
+
+            # The connection stays usable after a protocol error.
+            self.assertEqual((await tls.execute("i10100"))[:4], date.today().strftime("%y%m"))
+
+    async def test_execute_many(self):
+        """
+        Verify that BufferedAsyncTlsSocket.execute_many() returns responses and errors in command order.
+        """
+
+        expected = date.today().strftime("%y%m")
+
+        async with BufferedAsyncTlsSocket(self.ip, self.port) as tls:
+            responses = await tls.execute_many(["i10100", "test", "i10100"])
+
+        self.assertEqual(len(responses), 3)
+        self.assertEqual(responses[0][:4], expected)
+        self.assertIsInstance(responses[1], ValueError)
+        self.assertEqual(responses[2][:4], expected)
+
+class TestBufferedAsyncTlsSocketFraming(unittest.IsolatedAsyncioTestCase):
+    async def test_large_chunked_responses(self):
+        """
+        Verify that responses split over many reads and larger than the buffer match AsyncTlsSocket.
+        """
+
+        commands = ["i20100", "i21B00", "i20100", "i21B00"]
+
+        async with TlsSimulator(tanks=16, deliveries=99, chunk_size=1500, seed=1) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                expected = await tls.execute_many(commands)
+
+            async with BufferedAsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                actual = await tls.execute_many(commands)
+                single = await tls.execute("i21B00")
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(single, expected[1])
+        self.assertGreater(len(single), 65536)
+
+    async def test_execute_and_parse(self):
+        """
+        Verify that BufferedAsyncTlsSocket.execute_and_parse() parses responses in the buffer the same as by hand.
+        """
+
+        async with TlsSimulator(tanks=8, deliveries=20, chunk_size=1000, seed=1) as simulator:
+            async with BufferedAsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                deliveries = await tls.execute_and_parse("i21B00", compact=True)
+                labels = await tls.execute_and_parse("i60200", compact=True)
+                expected = await tls.execute("i21B00")
+
+        self.assertEqual(deliveries, function_21B(expected, compact=True))
+        self.assertEqual(labels, function_602(simulator.respond("i60200")[7:-7].decode()))
+
+    async def test_stream(self):
+        """
+        Verify that BufferedAsyncTlsSocket.stream() yields a response in several chunks as it arrives, and raises errors.
+        """
+
+        async with TlsSimulator(tanks=8, deliveries=20, chunk_size=500, chunk_delay=0.002,
+                                unsupported=["21B"], seed=1) as simulator:
+            async with BufferedAsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                chunks = [chunk async for chunk in tls.stream("i20200")]
+                following = await tls.execute("i20100")
+
+                with self.assertRaises(ValueError):
+                    async for _ in tls.stream("i21B00"): pass
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), simulator.respond("i20200")[7:-7].decode())
+        self.assertEqual(following, simulator.respond("i20100")[7:-7].decode())
+
+    async def test_timeout(self):
+        """
+        Verify that a slow response raises a TimeoutError and closes the connection, the same as AsyncTlsSocket.
+        """
+
+        async with TlsSimulator(latency=0.2, seed=1) as simulator:
+            async with AsyncTlsSocketPool(timeout=0.1, socket_class=BufferedAsyncTlsSocket) as pool:
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    with self.assertRaises(TimeoutError):
+                        await tls.execute("i20100")
+
+                    self.assertFalse(tls._is_open())
+
+                    with self.assertRaises(ConnectionError):
+                        await tls.execute("i10100")
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    with self.assertRaises(TimeoutError):
+                        async for _ in tls.stream("i20100"): pass
+
+                    self.assertFalse(tls._is_open())
+                    self.assertIsNone(tls.protocol.partial)
+
+                pool.timeout = 1
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    response = await tls.execute("i10100")
+
+        self.assertEqual(response, simulator.respond("i10100")[7:-7].decode())
+
+    async def test_pool_and_fleet(self):
+        """
+        Verify that AsyncTlsSocketPool and FleetPoller can use BufferedAsyncTlsSocket connections.
+        """
+
+        async with TlsSimulator(seed=1) as simulator:
+            gauges = [("127.0.0.1", simulator.port, ["i20100", "i10100"])]
+
+            async with AsyncTlsSocketPool(socket_class=BufferedAsyncTlsSocket) as pool:
+                response = await pool.execute("127.0.0.1", simulator.port, "i20100")
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    self.assertIsInstance(tls, BufferedAsyncTlsSocket)
+
+            results = [result async for result in FleetPoller(gauges, socket_class=BufferedAsyncTlsSocket)]
+
+        self.assertEqual(response, simulator.respond("i20100")[7:-7].decode())
+        self.assertTrue(results[0]["success"])
+        self.assertEqual(results[0]["responses"]["i20100"], response)
+
+if __name__ == "__main__":
+    unittest.main()
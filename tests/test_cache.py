@@ -0,0 +1,117 @@
+# test_cache.py - Tests whether or not the response caches operate as intended.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+from veeder_root_tls_socket_library.cache import AsyncTlsResponseCache, TlsResponseCache
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool, TlsSocketPool
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+
+class TestAsyncTlsResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def test_cache(self):
+        """
+        Verify that inquiry responses are cached until they expire and setup commands never are.
+        """
+
+        async with TlsSimulator() as simulator, AsyncTlsSocketPool() as pool:
+            cache = AsyncTlsResponseCache(pool, ttls={"201": 60, "101": 0.05})
+
+            first = await cache.execute("127.0.0.1", simulator.port, "i20100")
+            second = await cache.execute("127.0.0.1", simulator.port, "i20100")
+
+            await cache.execute("127.0.0.1", simulator.port, "i10100")
+            await asyncio.sleep(0.1)
+            await cache.execute("127.0.0.1", simulator.port, "i10100")
+
+            await cache.execute("127.0.0.1", simulator.port, "i20200")
+            await cache.execute("127.0.0.1", simulator.port, "i20200")
+
+            cache.invalidate(command="i20100")
+            await cache.execute("127.0.0.1", simulator.port, "i20100")
+
+        self.assertEqual(first, second)
+        self.assertEqual(simulator.commands_received, 6)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+    async def test_single_flight(self):
+        """
+        Verify that concurrent callers share a single request, and that errors are not cached.
+        """
+
+        async with TlsSimulator(latency=0.05, unsupported=["602"]) as simulator, AsyncTlsSocketPool() as pool:
+            cache = AsyncTlsResponseCache(pool)
+
+            responses = await asyncio.gather(
+                *[cache.execute("127.0.0.1", simulator.port, "i20100") for _ in range(0, 10)]
+            )
+
+            for _ in range(0, 2):
+                with self.assertRaises(ValueError):
+                    await cache.execute("127.0.0.1", simulator.port, "i60200")
+
+        self.assertEqual(len(set(responses)), 1)
+        self.assertEqual(simulator.commands_received, 3)
+
+    async def test_eviction(self):
+        """
+        Verify that the least recently used responses are evicted once the cache is full.
+        """
+
+        async with TlsSimulator() as simulator, AsyncTlsSocketPool() as pool:
+            size = len(simulator.respond("i20101")) - 14
+            cache = AsyncTlsResponseCache(pool, ttls={"201": 60}, max_size=size * 2)
+
+            for tank in ("01", "01", "01", "02", "03", "01"):
+                await cache.execute("127.0.0.1", simulator.port, f"i201{tank}")
+
+        self.assertEqual(simulator.commands_received, 4)
+
+class TestTlsResponseCache(unittest.IsolatedAsyncioTestCase):
+    async def test_single_flight(self):
+        """
+        Verify that threads asking for the same response at once share a single request.
+        """
+
+        def execute(port: int) -> list:
+            with TlsSocketPool() as pool:
+                cache = TlsResponseCache(pool)
+
+                with ThreadPoolExecutor(8) as executor:
+                    return list(executor.map(
+                        lambda _: cache.execute("127.0.0.1", port, "i20100", timeout=1), range(0, 8)
+                    ))
+
+        async with TlsSimulator(latency=0.05) as simulator:
+            responses = await asyncio.to_thread(execute, simulator.port)
+
+        self.assertEqual(len(set(responses)), 1)
+        self.assertEqual(simulator.commands_received, 1)
+
+    async def test_options(self):
+        """
+        Verify that responses are cached separately for each set of options, and raw responses are not cached.
+        """
+
+        def execute(port: int) -> list:
+            with TlsSocketPool() as pool:
+                cache = TlsResponseCache(pool)
+
+                return [
+                    bytes(cache.execute("127.0.0.1", port, "i20100", raw=True)),
+                    cache.execute("127.0.0.1", port, "i20100", timeout=1),
+                    cache.execute("127.0.0.1", port, "i20100", timeout=2, data_size=4096),
+                    cache.execute("127.0.0.1", port, "i20100", etx=b"\x03"),
+                    bytes(cache.execute("127.0.0.1", port, "i20100", raw=True))
+                ]
+
+        async with TlsSimulator() as simulator:
+            responses = await asyncio.to_thread(execute, simulator.port)
+
+        self.assertIsInstance(responses[1], str)
+        self.assertEqual(responses[0], responses[1].encode())
+        self.assertEqual(responses[2:4], responses[1:3])
+        self.assertEqual(responses[4], responses[0])
+        self.assertEqual(simulator.commands_received, 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+# test_capture.py - Tests whether or not the FrameArchive, FrameCapture and reparse() operate as intended.
+
+from argparse import Namespace
+from contextlib import redirect_stdout
+from io import StringIO
+from os import listdir, path
+from tempfile import TemporaryDirectory
+import unittest
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.checksum import compute_checksum
+from veeder_root_tls_socket_library.buffered_socket import BufferedAsyncTlsSocket
+from veeder_root_tls_socket_library.capture import FrameArchive, FrameCapture, _backfill, iter_frames, reparse
+from veeder_root_tls_socket_library.observer import MetricsObserver
+from veeder_root_tls_socket_library.parsing import parse
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.storage import TlsStore
+
+class TestFrameArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.simulator = TlsSimulator(tanks=4, deliveries=10, seed=1)
+        self.commands = ["i20100", "i20200", "i21B00", "i11100", "i10100"] * 6
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, **kwargs):
+        with FrameArchive(self.directory.name, **kwargs) as archive:
+            for number, command in enumerate(self.commands):
+                archive.append("10.0.0.1", 10001, command, self.simulator.respond(command), received=float(number))
+
+    def test_round_trip(self):
+        """
+        Verify that frames spread over several blocks and segments are read back in the order they were written.
+        """
+
+        self.write(segment_size=4096, block_size=2048)
+
+        frames = list(iter_frames(self.directory.name))
+
+        self.assertGreater(len(listdir(self.directory.name)), 1)
+        self.assertEqual([frame.command for frame in frames], self.commands)
+        self.assertEqual([frame.received for frame in frames], [float(number) for number in range(len(self.commands))])
+        self.assertEqual(frames[0].host, "10.0.0.1")
+        self.assertEqual(frames[0].port, 10001)
+        self.assertEqual(frames[0].frame, self.simulator.respond("i20100"))
+
+    def test_truncated_segment(self):
+        """
+        Verify that a block cut short at the end of a segment is left out.
+        """
+
+        self.write(block_size=4096)
+
+        segment = path.join(self.directory.name, listdir(self.directory.name)[0])
+        whole = len(list(iter_frames(segment)))
+
+        with open(segment, "rb+") as file:
+            file.truncate(file.seek(0, 2) - 10)
+
+        self.assertLess(len(list(iter_frames(segment))), whole)
+
+    def test_reparse(self):
+        """
+        Verify that reparse() gives the same results in one or several processes, and returns errors as results.
+        """
+
+        self.write(block_size=4096)
+
+        with FrameArchive(self.directory.name) as archive:
+            frame = bytearray(self.simulator.respond("i20100"))
+            frame[10] ^= 1
+            archive.append("10.0.0.2", 10001, "i20100", frame)
+            archive.append("10.0.0.2", 10001, "i90200", self.simulator.respond("i90200"))
+
+        local = list(reparse(self.directory.name, processes=1))
+        pooled = list(reparse(self.directory.name, processes=2))
+        inventory = list(reparse(self.directory.name, processes=1, codes=["201"], compact=True))
+
+        # The response to i90200 has no parser and is left out.
+        self.assertEqual(len(local), len(self.commands) + 1)
+        self.assertEqual([item["command"] for item in pooled], [item["command"] for item in local])
+        self.assertEqual(local[0]["result"], parse(self.simulator.respond("i20100")))
+        self.assertEqual(pooled[0]["result"], local[0]["result"])
+
+        self.assertIsInstance(local[-1]["result"], ValueError)
+        self.assertEqual(str(pooled[-1]["result"]), "Data integrity invalidated due to invalid checksum.")
+
+        self.assertEqual(len(inventory), 7)
+        self.assertEqual(inventory[0]["result"]["tanks"][0].tank_number, "01")
+
+        with self.assertRaises(ValueError):
+            list(reparse(self.directory.name, processes=0))
+
+        with self.assertRaises(TypeError):
+            list(reparse(self.directory.name, processes=1, compat=True))
+
+    def test_backfill(self):
+        """
+        Verify that captured frames can be stored in a TlsStore database.
+        """
+
+        self.write()
+
+        database = path.join(self.directory.name, "readings.db")
+        arguments = Namespace(sources=[self.directory.name], store=database, site="{host}",
+                              processes=1, batch_size=4)
+
+        with redirect_stdout(StringIO()):
+            self.assertEqual(_backfill(arguments), 0)
+
+        with TlsStore(database) as store:
+            self.assertEqual(len(store.query("inventory", "10.0.0.1", "01")), 1)
+            self.assertEqual(len(store.query("deliveries", "10.0.0.1", "01")), 10)
+
+    def test_backfill_errors(self):
+        """
+        Verify that the reports in a batch that can be stored are, when others in the same batch can't.
+        """
+
+        # An inventory report taken in month 13 parses, but can't be stored.
+        frame = bytearray(self.simulator.respond("i20100")[:-5])
+        frame[9:11] = b"13"
+        frame += b"%04X\x03" % compute_checksum(frame)
+
+        with FrameArchive(self.directory.name) as archive:
+            archive.append("10.0.0.1", 10001, "i20100", frame)
+            archive.append("10.0.0.2", 10001, "i20100", self.simulator.respond("i20100"))
+            archive.append("10.0.0.1", 10001, "i20200", self.simulator.respond("i20200"))
+
+        database = path.join(self.directory.name, "readings.db")
+        arguments = Namespace(sources=[self.directory.name], store=database, site="{host}",
+                              processes=1, batch_size=3)
+        output = StringIO()
+
+        with redirect_stdout(output):
+            self.assertEqual(_backfill(arguments), 0)
+
+        with TlsStore(database) as store:
+            self.assertEqual(len(store.query("inventory", "10.0.0.1", "01")), 0)
+            self.assertEqual(len(store.query("inventory", "10.0.0.2", "01")), 1)
+            self.assertEqual(len(store.query("deliveries", "10.0.0.1", "01")), 10)
+
+        self.assertIn("1 responses could not be parsed or stored.", output.getvalue())
+
+class TestFrameCapture(unittest.IsolatedAsyncioTestCase):
+    async def test_sockets(self):
+        """
+        Verify that FrameCapture archives the responses to both asynchronous sockets and passes events on.
+        """
+
+        with TemporaryDirectory() as directory:
+            observer = MetricsObserver()
+
+            with FrameArchive(directory) as archive:
+                capture = FrameCapture(archive, observer)
+
+                async with TlsSimulator(chunk_size=512, unsupported=["21B"], seed=1) as simulator:
+                    async with AsyncTlsSocket("127.0.0.1", simulator.port, observer=capture) as tls:
+                        await tls.execute("i20100")
+                        await tls.execute_many(["i20200", "i21B00"])
+
+                    async with BufferedAsyncTlsSocket("127.0.0.1", simulator.port, observer=capture) as tls:
+                        await tls.execute_many(["i20100", "i11100"])
+
+                        with self.assertRaises(ValueError):
+                            await tls.execute("i21B00")
+
+            frames = list(iter_frames(directory))
+
+        self.assertEqual([frame.command for frame in frames],
+                         ["i20100", "i20200", "i21B00", "i20100", "i11100", "i21B00"])
+        self.assertEqual(frames[0].frame, simulator.respond("i20100"))
+        self.assertEqual(frames[3].frame, frames[0].frame)
+        self.assertEqual(frames[-1].frame[:9], b"\x019999FF1B")
+        self.assertEqual(observer.snapshot()["commands"], 6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+# test_checksum.py - Used to test the functionality of functions in checksum.py.
+
+import unittest
+from veeder_root_tls_socket_library.checksum import compute_checksum, verify_checksum
+
+class test_checksum(unittest.TestCase):
+    def test_verify_checksum(self):
+        """
+        Verify that verify_checksum() correctly validates outputs.
+        """
+
+        # Cases are tuples with the full command output and expected checksum validation result.
+        cases = [
+            (b"\x01i101002312301342020402&&FB3B\x03", True),
+            (b"\x01i101002312301342020402&&FB3A\x03", False),
+            (b"\x01j101002312301342020402&&FB3B\x03", False),
+            (bytearray(b"\x01i101002312301342020402&&FB3B\x03"), True),
+            (memoryview(b"\x01i101002312301342020402&&FB3B\x03"), True)
+        ]
+
+        for case in cases:
+            actual = verify_checksum(case[0])
+            expected = case[1]
+
+            self.assertEqual(actual, expected)
+
+    def test_compute_checksum(self):
+        """
+        Verify that compute_checksum() produces checksums that verify_checksum() accepts.
+        """
+
+        self.assertEqual(compute_checksum(b"\x01i101002312301342020402&&"), 0xFB3B)
+
+        # Large messages overflow the 16-bit sum many times over.
+        message = b"\x01i20100" + b"4342CBE1C143D81D" * 1024 + b"&&"
+        response = message + b"%04X" % compute_checksum(message) + b"\x03"
+
+        self.assertTrue(verify_checksum(response))
+
+if __name__ == "__main__":
+    unittest.main()
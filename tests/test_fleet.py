@@ -0,0 +1,85 @@
+# test_fleet.py - Tests whether or not the FleetPoller class operates as intended.
+
+from datetime import date
+from os import environ
+import unittest
+from veeder_root_tls_socket_library.fleet import FleetPoller
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+
+class TestFleetPoller(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ip   = environ.get("TLS_IP")
+        self.port = environ.get("TLS_PORT")
+
+        if not self.ip or self.port is None:
+            raise ValueError("TLS_IP and TLS_PORT environment variables must have values.")
+
+        self.port = int(self.port)
+
+    async def test_valid_command(self):
+        """
+        Verify that FleetPoller.poll() yields a successful result for each TLS system.
+        """
+
+        expected = date.today().strftime("%y%m")
+        gauges = [(self.ip, self.port, ["i10100"])] * 3
+        results = [result async for result in FleetPoller(gauges, concurrency=2)]
+
+        self.assertEqual(len(results), 3)
+
+        for result in results:
+            self.assertTrue(result["success"])
+            self.assertEqual(result["responses"]["i10100"][:4], expected)
+
+    async def test_invalid_command(self):
+        """
+        Verify that FleetPoller.poll() reports invalid commands without failing the TLS system.
+        """
+
+        gauges = [(self.ip, self.port, ["test", "i10100"])]
+
+        async for result in FleetPoller(gauges):
+            self.assertFalse(result["success"])
+            self.assertIsNone(result["error"])
+            self.assertIsInstance(result["responses"]["test"], ValueError)
+            self.assertIsInstance(result["responses"]["i10100"], str)
+
+    async def test_pipeline(self):
+        """
+        Verify that FleetPoller.poll() returns the same results when commands are pipelined.
+        """
+
+        gauges = [(self.ip, self.port, ["test", "i10100"])]
+
+        async for result in FleetPoller(gauges, pipeline=True):
+            self.assertIsInstance(result["responses"]["test"], ValueError)
+            self.assertIsInstance(result["responses"]["i10100"], str)
+
+    async def test_duplicate_commands(self):
+        """
+        Verify that FleetPoller.poll() sends a command listed more than once only once.
+        """
+
+        for pipeline in (False, True):
+            async with TlsSimulator(seed=1) as simulator:
+                gauges = [("127.0.0.1", simulator.port, ["i20100", "i10100", "i20100"])]
+
+                async for result in FleetPoller(gauges, pipeline=pipeline):
+                    self.assertTrue(result["success"])
+                    self.assertEqual(list(result["responses"]), ["i20100", "i10100"])
+
+                self.assertEqual(simulator.commands_received, 2)
+
+    async def test_connection_failure(self):
+        """
+        Verify that FleetPoller.poll() reports TLS systems that cannot be reached.
+        """
+
+        gauges = [("127.0.0.1", 1, ["i10100"])]
+
+        async for result in FleetPoller(gauges, timeout=1):
+            self.assertFalse(result["success"])
+            self.assertIsNotNone(result["error"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 # test_format.py - Used to test the functionality of functions in format.py.
 
 import unittest
-from veeder_root_tls_socket_library.format import _get_timestamp, _split_data, _hex_to_float
+from veeder_root_tls_socket_library.format import _get_timestamp, _split_data, _hex_to_float, _hex_to_floats
 
 class test_format(unittest.TestCase):
     def test_get_timestamp(self):
@@ -20,6 +20,8 @@ class test_format(unittest.TestCase):
             expected = case[1]
 
             self.assertEqual(actual, expected)
+            self.assertEqual(_get_timestamp(case[0].encode("utf-8")), expected)
+            self.assertEqual(_get_timestamp(memoryview(case[0].encode("utf-8"))), expected)
 
 
     def test_split_data(self):
@@ -66,5 +68,19 @@ class test_format(unittest.TestCase):
 
             self.assertEqual(actual, expected)
 
+    def test_hex_to_floats(self):
+        """
+        Verify that hex_to_floats() decodes back-to-back hexadecimal codes the same as hex_to_float().
+        """
+
+        codes = ["3F800000", "B8D1B717", "C2C7FAE1", "461C4000"]
+
+        actual = _hex_to_floats("".join(codes))
+        expected = [_hex_to_float(code) for code in codes]
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(_hex_to_floats("".join(codes).encode("utf-8")), expected)
+        self.assertEqual(_hex_to_floats(""), [])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,96 @@
+# test_history.py - Tests whether or not the HistorySync class operates as intended.
+
+import asyncio
+import pickle
+import unittest
+from veeder_root_tls_socket_library.history import HistorySync
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.socket import TlsSocket
+
+class FakeTlsSocket:
+    def __init__(self, *responses):
+        self.ip = "127.0.0.1"
+        self.port = 10001
+        self.responses = list(responses)
+        self.commands = []
+
+    def execute(self, command: str) -> str:
+        self.commands.append(command)
+        return self.responses.pop(0)
+
+class TestHistorySync(unittest.IsolatedAsyncioTestCase):
+    async def test_simulator(self):
+        """
+        Verify that records are only returned once, and that 21B and 119 request as little as possible.
+        """
+
+        def sync(port: int) -> tuple:
+            history = HistorySync()
+            tls = TlsSocket("127.0.0.1", port)
+
+            try:
+                first = [
+                    history.deliveries(tls), history.adjusted_deliveries(tls, page=2),
+                    history.alarms(tls), history.maintenance(tls)
+                ]
+
+                history = HistorySync(pickle.loads(pickle.dumps(history.watermarks)))
+
+                second = [
+                    history.deliveries(tls), history.adjusted_deliveries(tls, page=2),
+                    history.alarms(tls), history.maintenance(tls)
+                ]
+
+                return first, second
+
+            finally:
+                tls.close()
+
+        async with TlsSimulator(tanks=4, deliveries=10, seed=1) as simulator:
+            first, second = await asyncio.to_thread(sync, simulator.port)
+
+        self.assertEqual([len(records) for records in first], [40, 40, 3, 3])
+        self.assertEqual(second, [[], [], [], []])
+        self.assertEqual(first[0][0]["tank_number"], "01")
+        self.assertIn("start_year", first[0][0])
+
+        # 21B is asked for 2, 8 and 32 deliveries the first time and 2 the second.
+        self.assertEqual(simulator.commands_received, 10)
+
+    def test_new_records(self):
+        """
+        Verify that alarms are tracked per tank, including alarms raised within the same minute.
+        """
+
+        first = "2601011200" + "0102030100" + "2601011130" + "0102030200" + "2601011100"
+        second = first + "0102040200" + "2601011100" + "0102030100" + "2601011205"
+
+        history = HistorySync()
+        tls = FakeTlsSocket(first, second, second)
+
+        self.assertEqual(len(history.alarms(tls)), 2)
+
+        actual = history.alarms(tls, compact=True)
+
+        self.assertEqual([(alarm.tank_number, alarm.alarm_type) for alarm in actual], [("02", 4), ("01", 3)])
+        self.assertEqual(history.alarms(tls), [])
+
+    def test_maintenance_range(self):
+        """
+        Verify that function 119 is only asked for the days since the last record seen.
+        """
+
+        response = "2601051200" + "00001" + "2601031030" + "0B001203"
+
+        history = HistorySync()
+        tls = FakeTlsSocket(response, response)
+
+        history.maintenance(tls)
+        history.maintenance(tls)
+
+        self.assertEqual(tls.commands[0], "i11900")
+        self.assertEqual(tls.commands[1][:12], "i11900260103")
+        self.assertEqual(len(tls.commands[1]), 18)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# test_observer.py - Tests whether or not the observer hooks operate as intended.
+
+import asyncio
+import unittest
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.observer import MetricsObserver, TlsObserver
+from veeder_root_tls_socket_library.protocol import encode_command
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.socket import TlsSocket
+
+class RecordingObserver(TlsObserver):
+    def __init__(self):
+        self.connects = []
+        self.commands = []
+
+    def on_connect(self, event: dict):
+        self.connects.append(event)
+
+    def on_command(self, event: dict):
+        self.commands.append(event)
+
+class TestObserver(unittest.IsolatedAsyncioTestCase):
+    async def test_synchronous_socket(self):
+        """
+        Verify that TlsSocket reports its connection and every command to its observer.
+        """
+
+        observer = RecordingObserver()
+
+        def execute(port: int) -> str:
+            tls = TlsSocket("127.0.0.1", port, observer=observer)
+
+            try:
+                return tls.execute("i20100", timeout=1)
+            finally:
+                tls.close()
+
+        async with TlsSimulator(chunk_size=16, chunk_delay=0.002, seed=1) as simulator:
+            response = await asyncio.to_thread(execute, simulator.port)
+            expected = simulator.respond("i20100")
+
+        self.assertEqual(len(observer.connects), 1)
+        self.assertIsNone(observer.connects[0]["error"])
+
+        event = observer.commands[0]
+
+        self.assertEqual(event["command"], "i20100")
+        self.assertEqual(event["bytes_sent"], 9)
+        self.assertEqual(event["bytes_received"], len(expected))
+        self.assertGreater(event["chunks"], 1)
+        self.assertLessEqual(event["time_to_first_byte"], event["total_time"])
+        self.assertIsNone(event["error"])
+        self.assertEqual(response, expected[7:-7].decode())
+
+    async def test_asynchronous_socket(self):
+        """
+        Verify that AsyncTlsSocket reports commands and pipelined commands to its observer.
+        """
+
+        observer = MetricsObserver()
+
+        async with TlsSimulator(unsupported=["21B"]) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port, observer=observer) as tls:
+                await tls.execute("i20100")
+                await tls.execute_many(["i20200", "i21B00"])
+
+                with self.assertRaises(ValueError):
+                    await tls.execute("i21B00")
+
+        actual = observer.snapshot()
+
+        self.assertEqual(actual["connections"], 1)
+        self.assertEqual(actual["commands"], 4)
+        self.assertEqual(actual["command_errors"], 2)
+        self.assertEqual(actual["bytes_sent"], 36)
+        self.assertGreaterEqual(actual["chunks"], 2)
+
+        observer.reset()
+
+        self.assertEqual(observer.snapshot()["commands"], 0)
+
+    async def test_unread_responses(self):
+        """
+        Verify that an observer doesn't change which responses AsyncTlsSocket reads when several arrive at once.
+        """
+
+        commands = ["i10100", "i60200"]
+        results = []
+
+        async with TlsSimulator(seed=1) as simulator:
+            expected = sum(len(simulator.respond(command)) for command in commands)
+
+            for observer in (None, RecordingObserver()):
+                async with AsyncTlsSocket("127.0.0.1", simulator.port, observer=observer) as tls:
+                    # Both responses are waiting in the reader before the next command is sent.
+                    tls.writer.write(b"".join(encode_command(command) for command in commands))
+
+                    while len(tls.reader._buffer) < expected:
+                        await asyncio.sleep(0.01)
+
+                    results.append([await tls.execute(command) for command in ("i20100", "i20100", "i20100")])
+
+            responses = [simulator.respond(command)[7:-7].decode() for command in commands + ["i20100"]]
+
+        self.assertEqual(results[0], responses)
+        self.assertEqual(results[1], responses)
+        self.assertEqual([event["bytes_received"] for event in observer.commands],
+                         [len(simulator.respond(command)) for command in commands + ["i20100"]])
+
+    async def test_connection_error(self):
+        """
+        Verify that failed connections are reported to the observer.
+        """
+
+        observer = RecordingObserver()
+
+        async with TlsSimulator() as simulator:
+            port = simulator.port
+
+        with self.assertRaises(ConnectionError):
+            await AsyncTlsSocket("127.0.0.1", port, timeout=1, observer=observer).connect()
+
+        self.assertIsInstance(observer.connects[0]["error"], ConnectionError)
+
+if __name__ == "__main__":
+    unittest.main()
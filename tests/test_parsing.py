@@ -0,0 +1,114 @@
+# test_parsing.py - Tests whether or not parse() and the ParserPool class operate as intended.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.parsing import ParserPool, get_parser, parse, parse_async
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+
+class TestParserPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        simulator = TlsSimulator(tanks=4, deliveries=30, seed=1)
+
+        self.inventory = simulator.respond("i20100")[7:-7].decode()
+        self.deliveries = simulator.respond("i21B00")[7:-7].decode()
+
+    async def test_process_pool(self):
+        """
+        Verify that small and large responses parse the same in a process pool as they do inline.
+        """
+
+        async with ParserPool(max_workers=2, batch_limit=len(self.deliveries)) as pool:
+            results = await asyncio.gather(
+                *[pool.parse("201", self.inventory) for _ in range(0, 100)],
+                pool.parse("i21B00", self.deliveries, compact=True)
+            )
+
+        self.assertEqual(results[0], tls_3xx.function_201(self.inventory))
+        self.assertEqual(results[-1], tls_3xx.function_21B(self.deliveries, compact=True))
+
+    async def test_batch_errors(self):
+        """
+        Verify that a response that fails to parse only fails its own caller.
+        """
+
+        async with ParserPool(ThreadPoolExecutor(2), batch_size=3) as pool:
+            results = await asyncio.gather(
+                pool.parse("201", self.inventory),
+                pool.parse("201", "Not a TLS response."),
+                pool.parse("201", self.inventory),
+                return_exceptions=True
+            )
+
+            with self.assertRaises(ValueError): await pool.parse("999", self.inventory)
+
+        self.assertIsInstance(results[0], dict)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[0], results[2])
+
+    async def test_parse_async(self):
+        """
+        Verify that parse_async() works with the shared pool.
+        """
+
+        self.assertEqual(await parse_async("201", self.inventory), tls_3xx.function_201(self.inventory))
+        self.assertIs(get_parser("i20200"), tls_3xx.function_202)
+
+class TestParse(unittest.TestCase):
+    def test_parse(self):
+        """
+        Verify that parse() picks the parser from the echoed function code, leaves out options it doesn't take and rejects options no parser takes.
+        """
+
+        simulator = TlsSimulator(tanks=4, deliveries=5, seed=1)
+
+        for command in ("i20100", "i21B00", "i60200"):
+            frame = simulator.respond(command)
+            parser = get_parser(command)
+            expected = parser(frame[7:-7].decode())
+
+            self.assertEqual(parse(frame), expected)
+            self.assertEqual(parse(memoryview(bytearray(frame))), expected)
+
+        inventory = simulator.respond("i20100")
+        labels = simulator.respond("i60200")
+
+        self.assertEqual(parse(inventory, compact=True), tls_3xx.function_201(inventory[7:-7].decode(), compact=True))
+        self.assertEqual(parse(labels, compact=True), tls_3xx.function_602(labels[7:-7].decode()))
+
+        with self.assertRaises(TypeError): parse(inventory, compat=True)
+        with self.assertRaises(TypeError): parse(labels, compat=True)
+
+    def test_parse_async_loops(self):
+        """
+        Verify that parse_async() can be used from one event loop after another.
+        """
+
+        inventory = TlsSimulator(seed=1).respond("i20100")[7:-7].decode()
+
+        # The loop closes while a response is still waiting to be batched.
+        async def leave():
+            asyncio.ensure_future(parse_async("201", inventory))
+            await asyncio.sleep(0)
+
+        asyncio.run(leave())
+
+        for _ in range(0, 2):
+            actual = asyncio.run(asyncio.wait_for(parse_async("201", inventory), timeout=10))
+            self.assertEqual(actual, tls_3xx.function_201(inventory))
+
+    def test_parse_errors(self):
+        """
+        Verify that parse() rejects error responses and responses with a bad checksum.
+        """
+
+        frame = bytearray(TlsSimulator(seed=1).respond("i20100"))
+        frame[20] ^= 1
+
+        with self.assertRaises(ValueError): parse(b"\x019999FF1B\x03")
+        with self.assertRaises(ValueError): parse(frame)
+        with self.assertRaises(ValueError): parse(frame[:-7] + frame[-5:])
+
+if __name__ == "__main__":
+    unittest.main()
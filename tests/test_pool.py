@@ -0,0 +1,197 @@
+# test_pool.py - Tests whether or not the connection pools operate as intended.
+
+from datetime import date
+from os import environ
+import asyncio
+import unittest
+from veeder_root_tls_socket_library.pool import AsyncTlsSocketPool, TlsSocketPool
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.socket import ResponseTimeoutError
+
+class TestTlsSocketPool(unittest.TestCase):
+    def setUp(self):
+        self.ip   = environ.get("TLS_IP")
+        self.port = environ.get("TLS_PORT")
+
+        if not self.ip or self.port is None:
+            raise ValueError("TLS_IP and TLS_PORT environment variables must have values.")
+
+        self.port = int(self.port)
+
+    def test_valid_command(self):
+        """
+        Verify that TlsSocketPool.execute() and your system return the same date to test communication.
+        """
+
+        expected = date.today().strftime("%y%m")
+
+        with TlsSocketPool() as pool:
+            actual = pool.execute(self.ip, self.port, "i10100")[:4]
+
+        self.assertEqual(expected, actual)
+
+    def test_connection_reuse(self):
+        """
+        Verify that TlsSocketPool.lease() hands out the same warm connection between commands.
+        """
+
+        with TlsSocketPool() as pool:
+            with pool.lease(self.ip, self.port) as tls:
+                first = tls
+                tls.execute("i10100")
+
+            with pool.lease(self.ip, self.port) as tls:
+                self.assertIs(first, tls)
+
+    def test_reconnect(self):
+        """
+        Verify that TlsSocketPool.execute() reconnects when the pooled connection was closed.
+        """
+
+        with TlsSocketPool() as pool:
+            with pool.lease(self.ip, self.port) as tls:
+                tls.close()
+
+            pool.execute(self.ip, self.port, "i10100")
+
+    def test_evict_idle(self):
+        """
+        Verify that TlsSocketPool.evict_idle() closes connections that are past the idle timeout.
+        """
+
+        with TlsSocketPool(idle_timeout=0) as pool:
+            with pool.lease(self.ip, self.port) as tls:
+                first = tls
+
+            pool.evict_idle()
+
+            with pool.lease(self.ip, self.port) as tls:
+                self.assertIsNot(first, tls)
+
+class TestAsyncTlsSocketPool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.ip   = environ.get("TLS_IP")
+        self.port = environ.get("TLS_PORT")
+
+        if not self.ip or self.port is None:
+            raise ValueError("TLS_IP and TLS_PORT environment variables must have values.")
+
+        self.port = int(self.port)
+
+    async def test_valid_command(self):
+        """
+        Verify that AsyncTlsSocketPool.execute() and your system return the same date to test communication.
+        """
+
+        expected = date.today().strftime("%y%m")
+
+        async with AsyncTlsSocketPool() as pool:
+            response = await pool.execute(self.ip, self.port, "i10100")
+
+        self.assertEqual(expected, response[:4])
+
+    async def test_connection_reuse(self):
+        """
+        Verify that AsyncTlsSocketPool.lease() hands out the same warm connection between commands.
+        """
+
+        async with AsyncTlsSocketPool() as pool:
+            async with pool.lease(self.ip, self.port) as tls:
+                first = tls
+                await tls.execute("i10100")
+
+            async with pool.lease(self.ip, self.port) as tls:
+                self.assertIs(first, tls)
+
+    async def test_reconnect(self):
+        """
+        Verify that AsyncTlsSocketPool.execute() reconnects when the pooled connection was closed.
+        """
+
+        async with AsyncTlsSocketPool() as pool:
+            async with pool.lease(self.ip, self.port) as tls:
+                await tls.close()
+
+            await pool.execute(self.ip, self.port, "i10100")
+
+class TestDroppedConnections(unittest.IsolatedAsyncioTestCase):
+    async def test_retries(self):
+        """
+        Verify that both pools send inquiry commands again after the connection dropped, but not setup commands.
+        """
+
+        received = []
+
+        # Drops every connection as soon as a command arrives, without replying.
+        async def handle(reader, writer):
+            received.append(await reader.readuntil(b"\n"))
+            writer.close()
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+
+        def execute(command: str):
+            with TlsSocketPool() as pool:
+                pool.execute("127.0.0.1", port, command, retries=2)
+
+        try:
+            for command, expected in (("i20100", 2), ("S62801TANK 1", 1)):
+                received.clear()
+
+                async with AsyncTlsSocketPool(timeout=1) as pool:
+                    with self.assertRaises((ConnectionError, asyncio.IncompleteReadError)):
+                        await pool.execute("127.0.0.1", port, command)
+
+                self.assertEqual(len(received), expected)
+
+                received.clear()
+
+                with self.assertRaises(ConnectionError):
+                    await asyncio.to_thread(execute, command)
+
+                self.assertEqual(len(received), expected)
+
+        finally:
+            server.close()
+            await server.wait_closed()
+
+class TestLateResponses(unittest.IsolatedAsyncioTestCase):
+    async def test_timed_out_connection(self):
+        """
+        Verify that TlsSocketPool drops a connection whose response timed out, so a late response isn't read as the next one.
+        """
+
+        def execute(port: int) -> str:
+            with TlsSocketPool() as pool:
+                with self.assertRaises(ResponseTimeoutError):
+                    pool.execute("127.0.0.1", port, "i20100", timeout=0.1, retries=2)
+
+                return pool.execute("127.0.0.1", port, "i60200")
+
+        async with TlsSimulator(latency=0.25, seed=1) as simulator:
+            response = await asyncio.to_thread(execute, simulator.port)
+            expected = simulator.respond("i60200")[7:-7].decode()
+
+        self.assertEqual(response, expected)
+
+    async def test_unread_data(self):
+        """
+        Verify that AsyncTlsSocketPool replaces a connection that has received data no command has read.
+        """
+
+        async with TlsSimulator(seed=1) as simulator:
+            async with AsyncTlsSocketPool() as pool:
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    first = tls
+                    tls.writer.write(b"\x01i20100\r\n")
+
+                    while not tls._has_unread(): await asyncio.sleep(0.01)
+
+                async with pool.lease("127.0.0.1", simulator.port) as tls:
+                    self.assertIsNot(first, tls)
+                    response = await tls.execute("i60200")
+
+            self.assertEqual(response, simulator.respond("i60200")[7:-7].decode())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# test_protocol.py - Tests whether or not the framing in protocol.py operates as intended.
+
+import unittest
+from veeder_root_tls_socket_library.protocol import FrameReader, check_frame, display_text, encode_command
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+
+class TestFrames(unittest.TestCase):
+    def test_encode_command(self):
+        """
+        Verify that encode_command() adds the start of header and trailing newline.
+        """
+
+        self.assertEqual(encode_command("i20100"), b"\x01i20100\r\n")
+
+    def test_check_frame(self):
+        """
+        Verify that check_frame() returns the response data and rejects errors and bad checksums.
+        """
+
+        frame = b"\x01i101002312301342020402&&FB3B\x03"
+
+        self.assertEqual(bytes(check_frame(frame)), b"2312301342020402")
+        self.assertEqual(bytes(check_frame(memoryview(bytearray(frame)))), b"2312301342020402")
+
+        # Cases are tuples with the frame and the expected error message.
+        cases = [
+            (b"\x019999FF1B\x03",                        "Unsupported command for this server."),
+            (b"\r\n\x019999FF1B\x03",                    "Unsupported command for this server."),
+            (b"\x01i101002312301342020402\x03",          "Checksum missing from command response."),
+            (b"\x01i1\x03",                              "Checksum missing from command response."),
+            (b"\x01i101002312301342020402&&FB3A\x03",    "Data integrity invalidated due to invalid checksum.")
+        ]
+
+        for case in cases:
+            with self.assertRaises(ValueError) as context:
+                check_frame(case[0])
+
+            self.assertEqual(str(context.exception), case[1])
+
+    def test_display_text(self):
+        """
+        Verify that display_text() removes the framing and surrounding newlines.
+        """
+
+        self.assertEqual(display_text(b"\x01\r\n\r\nIN-TANK INVENTORY\r\n\r\n\x03"), "IN-TANK INVENTORY")
+
+        with self.assertRaises(ValueError):
+            display_text(b"\x019999FF1B\x03")
+
+class TestFrameReader(unittest.TestCase):
+    def setUp(self):
+        simulator = TlsSimulator(tanks=8, deliveries=40, seed=1)
+
+        self.frames = [simulator.respond(command) for command in ("i20100", "i21B00", "i10100")]
+        self.stream = b"".join(self.frames)
+
+    def test_small_chunks(self):
+        """
+        Verify that responses split over many small chunks come out whole.
+        """
+
+        reader = FrameReader(initial_size=64)
+        frames = []
+
+        for position in range(0, len(self.stream), 7):
+            reader.feed(self.stream[position:position + 7])
+
+            frame = reader.next_frame()
+
+            while frame is not None:
+                frames.append(bytes(frame))
+                frame = reader.next_frame()
+
+        self.assertEqual(frames, self.frames)
+        self.assertEqual(len(reader.pending()), 0)
+
+    def test_several_frames_per_chunk(self):
+        """
+        Verify that several responses received at once are returned one at a time.
+        """
+
+        reader = FrameReader()
+        reader.feed(self.stream + self.frames[0][:10])
+
+        responses = [bytes(reader.next_response()) for _ in self.frames]
+
+        self.assertEqual(responses, [frame[7:-7] for frame in self.frames])
+        self.assertIsNone(reader.next_frame())
+        self.assertEqual(bytes(reader.pending()), self.frames[0][:10])
+
+        reader.reset()
+
+        self.assertEqual(len(reader.pending()), 0)
+
+    def test_receive_into(self):
+        """
+        Verify that get_buffer() and buffer_updated() can be used to receive straight into the reader.
+        """
+
+        reader = FrameReader(etx=b"\x03", initial_size=16)
+        frames = []
+
+        for position in range(0, len(self.stream), 1000):
+            chunk = self.stream[position:position + 1000]
+            buffer = reader.get_buffer(len(chunk))
+
+            self.assertGreaterEqual(len(buffer), len(chunk))
+
+            buffer[:len(chunk)] = chunk
+            reader.buffer_updated(len(chunk))
+
+            frame = reader.next_frame()
+
+            while frame is not None:
+                frames.append(bytes(frame))
+                frame = reader.next_frame()
+
+        self.assertEqual(frames, self.frames)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+# test_schema.py - Used to test the functionality of the record layouts in schema.py.
+
+import pickle
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from veeder_root_tls_socket_library.schema import (
+    FLOAT, HEX, INT, STR, TEXT, FlatReport, GroupedReport, Record, RecordStream, floats, timestamp
+)
+
+class test_schema(unittest.TestCase):
+    def test_record(self):
+        """
+        Verify that Record.parse() converts every field type correctly.
+        """
+
+        record = Record(24, [
+            ("number", 0, 2, INT),
+            ("code",   2, 2, HEX),
+            ("label",  4, 4, TEXT),
+            ("raw",    4, 4, STR),
+            *floats(8, ["first", "second"])
+        ])
+
+        expected = {"number": 7, "code": 255, "label": "AB", "raw": " AB ",
+                    "first": 1.0, "second": -99.99}
+
+        self.assertEqual(record.parse("07FF AB 3F800000C2C7FAE1"), expected)
+        self.assertEqual(record.parse("xx07FF AB 3F800000C2C7FAE1", 2), expected)
+
+    def test_bytes_record(self):
+        """
+        Verify that Record.parse() gives the same result for bytes, including fields int() allows but digits don't.
+        """
+
+        record = Record(24, [
+            ("number", 0, 2, INT),
+            ("code",   2, 2, HEX),
+            ("label",  4, 4, TEXT),
+            ("raw",    4, 4, STR),
+            *floats(8, ["first", "second"])
+        ])
+
+        for response in ("07FF AB 3F800000C2C7FAE1", " 7ff AB 3F800000C2C7FAE1"):
+            expected = record.parse(response)
+
+            self.assertEqual(record.parse(response.encode("utf-8")), expected)
+            self.assertEqual(record.parse(memoryview(response.encode("utf-8"))), expected)
+            self.assertEqual(record.parse(response.encode("utf-8"), compact=True), record.parse(response, compact=True))
+
+        with self.assertRaises(ValueError):
+            record.parse(b"0xFF AB 3F800000C2C7FAE1")
+
+    def test_invalid_record(self):
+        """
+        Verify that Record() rejects fields that can't be parsed.
+        """
+
+        with self.assertRaises(ValueError): Record(4, [("number", 2, 4, INT)])
+        with self.assertRaises(ValueError): Record(8, [("value", 0, 4, FLOAT)])
+        with self.assertRaises(ValueError): Record(8, [("value", 0, 4, "date")])
+
+    def test_flat_report(self):
+        """
+        Verify that FlatReport.parse() reads the header and ignores trailing partial records.
+        """
+
+        report = FlatReport("items", 12, Record(4, [("item", 0, 4, STR)]), [("count", 10, 2, INT)])
+
+        actual = report.parse("2406262103" + "02" + "AAAABBBBCC")
+        expected = {"year": 24, "month": 6, "day": 26, "hour": 21, "minute": 3,
+                    "count": 2, "items": [{"item": "AAAA"}, {"item": "BBBB"}]}
+
+        self.assertEqual(actual, expected)
+
+    def test_grouped_report(self):
+        """
+        Verify that GroupedReport.parse() splits records into their groups.
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(10, timestamp(0))
+        response = "2406262103" + "0102" + "2401010101" + "2402020202" + "0200"
+
+        by_tank = GroupedReport("tanks", group, "count", record).parse(response)
+        as_list = GroupedReport("tanks", group, "count", record, records_key="items").parse(response)
+
+        self.assertEqual(len(by_tank["tanks"]["01"]), 2)
+        self.assertEqual(by_tank["tanks"]["01"][1]["month"], 2)
+        self.assertEqual(by_tank["tanks"]["02"], [])
+        self.assertEqual(as_list["tanks"][0]["tank_number"], "01")
+        self.assertEqual(len(as_list["tanks"][0]["items"]), 2)
+
+    def test_walk_groups(self):
+        """
+        Verify that GroupedReport.walk_groups() and Record.parser() find and parse the same records as parse().
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(10, timestamp(0))
+        report = GroupedReport("tanks", group, "count", record)
+        response = "2406262103" + "0102" + "2401010101" + "2402020202" + "0200"
+
+        walked = list(report.walk_groups(response))
+        parse = record.parser()
+
+        self.assertEqual(walked, [(10, 14, 2), (34, 38, 0)])
+        self.assertEqual([parse(response[start:start + 10]) for start in (14, 24)],
+                         report.parse(response)["tanks"]["01"])
+        self.assertEqual(record.parser(compact=True)(response[14:24]), record.parse(response, 14, compact=True))
+
+    def test_truncated_group(self):
+        """
+        Verify that GroupedReport.parse() stops at a group that claims more records than were sent.
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(10, timestamp(0))
+        response = "2406262103" + "0105" + "2401010101" + "02"
+
+        actual = GroupedReport("tanks", group, "count", record).parse(response)
+
+        self.assertEqual(list(actual["tanks"].keys()), ["01"])
+        self.assertEqual(len(actual["tanks"]["01"]), 1)
+
+    def test_compact_record(self):
+        """
+        Verify that compact records are named tuples that convert back to the default dicts.
+        """
+
+        record = Record(12, [("number", 0, 2, INT), *floats(2, ["value"]), ("label", 10, 2, STR)],
+                        name="Sample")
+
+        actual = record.parse("073F800000AB", compact=True)
+
+        self.assertEqual(type(actual).__name__, "Sample")
+        self.assertEqual(actual.value, 1.0)
+        self.assertEqual(actual.to_dict(), record.parse("073F800000AB"))
+        self.assertEqual(pickle.loads(pickle.dumps(actual)), actual)
+
+        with self.assertRaises(AttributeError):
+            actual.extra = True
+
+    def test_compact_grouped_report(self):
+        """
+        Verify that compact records in grouped reports include inherited group fields.
+        """
+
+        group = Record(6, [("tank_number", 0, 2, STR), ("product_code", 2, 2, STR), ("count", 4, 2, INT)])
+        record = Record(10, timestamp(0), name="Event")
+        report = GroupedReport("tanks", group, "count", record, inherit=["product_code"])
+        response = "2406262103" + "01AB02" + "2401010101" + "2402020202"
+
+        actual = report.parse(response, compact=True)
+        expected = report.parse(response)
+
+        self.assertEqual(actual["tanks"]["01"][0]._fields[0], "product_code")
+        self.assertEqual([event.to_dict() for event in actual["tanks"]["01"]], expected["tanks"]["01"])
+
+    def test_invalid_field_name(self):
+        """
+        Verify that Record() rejects field names that can't be used as attributes.
+        """
+
+        with self.assertRaises(ValueError): Record(2, [("tank number", 0, 2, STR)])
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_flat_report_columns(self):
+        """
+        Verify that FlatReport.parse_columns() returns typed arrays matching parse().
+        """
+
+        record = Record(22, [("tank_number", 0, 2, STR), ("status", 2, 4, HEX), *timestamp(6),
+                             ("label", 16, 6, TEXT)])
+        report = FlatReport("tanks", 10, record)
+        response = "2406262103" + "01FFFF2401020304 ABC  " + "02000A2412312359X     " + "03"
+
+        actual = report.parse_columns(response)["tanks"]
+
+        self.assertEqual(actual["tank_number"].tolist(), ["01", "02"])
+        self.assertEqual(actual["status"].dtype, numpy.uint16)
+        self.assertEqual(actual["status"].tolist(), [0xFFFF, 0x000A])
+        self.assertEqual(actual["label"].tolist(), ["ABC", "X"])
+        self.assertEqual(actual["timestamp"][1], numpy.datetime64("2024-12-31T23:59"))
+        self.assertNotIn("year", actual)
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed.")
+    def test_grouped_report_columns(self):
+        """
+        Verify that GroupedReport.parse_columns() repeats group fields on every record.
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(16, floats(0, ["volume", "height"]))
+        report = GroupedReport("tanks", group, "count", record)
+        response = "2406262103" + "0102" + "3F80000040000000" * 2 + "0200" + "0301" + "C2C7FAE100000000"
+
+        actual = report.parse_columns(response)["tanks"]
+
+        self.assertEqual(actual["tank_number"].tolist(), ["01", "01", "03"])
+        self.assertEqual(actual["volume"].dtype, numpy.float32)
+        self.assertEqual(actual["height"].tolist(), [2.0, 2.0, 0.0])
+        self.assertAlmostEqual(float(actual["volume"][2]), -99.99, places=4)
+        self.assertNotIn("count", actual)
+
+    def test_record_stream(self):
+        """
+        Verify that RecordStream.feed() returns records as soon as they are complete.
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(10, timestamp(0))
+        report = GroupedReport("tanks", group, "count", record)
+        stream = RecordStream(report)
+
+        self.assertEqual(stream.feed("24062621"), [])
+        self.assertIsNone(stream.header)
+        self.assertEqual(stream.feed("03" + "0102" + "24010101"), [])
+        self.assertEqual(stream.header["minute"], 3)
+
+        actual = stream.feed("01" + "24020202") + stream.feed("02" + "0200")
+
+        self.assertEqual([delivery["tank_number"] for delivery in actual], ["01", "01"])
+        self.assertEqual(actual[1]["month"], 2)
+        self.assertNotIn("count", actual[0])
+
+    def test_record_stream_bytes(self):
+        """
+        Verify that RecordStream parses bytes and memoryview chunks the same as strings.
+        """
+
+        group = Record(4, [("tank_number", 0, 2, STR), ("count", 2, 2, INT)])
+        record = Record(10, timestamp(0))
+        report = GroupedReport("tanks", group, "count", record)
+        response = "2406262103" + "0102" + "2401010101" + "2402020202" + "0200"
+
+        expected = list(RecordStream(report, response))
+        chunk = bytearray(7)
+        stream = RecordStream(report)
+        actual = []
+
+        # Reuse a single buffer for every chunk, the way a socket would.
+        for position in range(0, len(response), 7):
+            data = response[position:position + 7].encode("utf-8")
+            chunk[:len(data)] = data
+            actual.extend(stream.feed(memoryview(chunk)[:len(data)]))
+
+        self.assertEqual(actual, expected)
+        self.assertEqual(list(RecordStream(report, response.encode("utf-8"), compact=True)),
+                         list(RecordStream(report, response, compact=True)))
+
+        with self.assertRaises(ValueError):
+            stream = RecordStream(report)
+            stream.feed(b"2406")
+            stream.feed("262103")
+
+if __name__ == "__main__":
+    unittest.main()
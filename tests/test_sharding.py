@@ -0,0 +1,95 @@
+# test_sharding.py - Tests whether or not the ShardedFleetPoller class operates as intended.
+
+import asyncio
+import time
+import unittest
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.sharding import ShardedFleetPoller, _shard
+from veeder_root_tls_socket_library.simulator import start_fleet
+
+class TestShardedFleetPoller(unittest.IsolatedAsyncioTestCase):
+    async def test_poll(self):
+        """
+        Verify that every TLS system is polled once across the worker processes.
+        """
+
+        simulators = await start_fleet(12, seed=1)
+
+        try:
+            gauges = [("127.0.0.1", simulator.port, ["i20100", "i60200"]) for simulator in simulators]
+            gauges.append(("127.0.0.1", 1, ["i20100"]))
+
+            results = await asyncio.to_thread(
+                lambda: list(ShardedFleetPoller(gauges, processes=3, timeout=1, parse=True, compact=True))
+            )
+
+            expected = tls_3xx.function_201(simulators[0].respond("i20100")[7:-7].decode(), compact=True)
+
+        finally:
+            for simulator in simulators: await simulator.close()
+
+        by_port = {result["port"]: result for result in results}
+
+        self.assertEqual(len(results), 13)
+        self.assertFalse(by_port[1]["success"])
+        self.assertIsInstance(by_port[1]["error"], OSError)
+        self.assertTrue(all(by_port[simulator.port]["success"] for simulator in simulators))
+        self.assertEqual(by_port[simulators[0].port]["responses"]["i20100"]["tanks"], expected["tanks"])
+        self.assertEqual(by_port[simulators[0].port]["responses"]["i60200"]["labels"][1], "TANK 1")
+
+    async def test_slow_consumer(self):
+        """
+        Verify that a consumer that is slow to take results doesn't make the workers time out on other TLS systems.
+        """
+
+        # The large reports fill the pipe while the others are still being polled.
+        fast = await start_fleet(2, tanks=16, deliveries=99, seed=1)
+        slow = await start_fleet(4, latency=0.5, seed=1)
+
+        def consume(gauges: list) -> list:
+            results = []
+
+            for result in ShardedFleetPoller(gauges, processes=1, timeout=2, device_timeout=3):
+                if not results: time.sleep(4)
+                results.append(result)
+
+            return results
+
+        try:
+            gauges = [("127.0.0.1", simulator.port, ["i21B00"]) for simulator in fast]
+            gauges += [("127.0.0.1", simulator.port, ["i20100", "i10100"]) for simulator in slow]
+            results = await asyncio.to_thread(consume, gauges)
+
+        finally:
+            for simulator in fast + slow: await simulator.close()
+
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(result["success"] for result in results), [result["error"] for result in results])
+
+    def test_shard(self):
+        """
+        Verify that shards are balanced and keep each TLS system in a single shard.
+        """
+
+        gauges = [(f"10.0.0.{index % 5}", 10001, ["i20100"]) for index in range(0, 20)]
+        shards = _shard(gauges, 3)
+
+        self.assertEqual(sorted(len(shard) for shard in shards), [4, 8, 8])
+
+        for shard in shards:
+            hosts = {host for host, _, _ in shard}
+            self.assertFalse(any(host in hosts for other in shards if other is not shard for host, _, _ in other))
+
+    def test_arguments(self):
+        """
+        Verify that invalid amounts of processes and concurrency are rejected rather than replaced by defaults.
+        """
+
+        for options in ({"processes": 0}, {"processes": -1}, {"concurrency": 0}):
+            with self.assertRaises(ValueError):
+                ShardedFleetPoller([], **options)
+
+        self.assertGreaterEqual(ShardedFleetPoller([]).processes, 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+# test_simulator.py - Tests whether or not the TlsSimulator class operates as intended.
+
+import asyncio
+from datetime import date
+import unittest
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.simulator import TlsSimulator, start_fleet
+from veeder_root_tls_socket_library.socket import TlsSocket
+
+class TestTlsSimulator(unittest.IsolatedAsyncioTestCase):
+    async def test_every_function(self):
+        """
+        Verify that every function in tls_3xx.py can parse the responses of the simulator.
+        """
+
+        codes = [name[9:] for name in dir(tls_3xx) if name.startswith("function_")]
+
+        async with TlsSimulator(tanks=3, deliveries=2, seed=1) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                for code in codes:
+                    response = await tls.execute(f"i{code}00")
+                    actual = getattr(tls_3xx, f"function_{code}")(response)
+
+                    self.assertEqual(actual["year"], date.today().year % 100, code)
+
+                tanks = tls_3xx.function_202(await tls.execute("i20200"))["tanks"]
+
+        self.assertEqual([tank["tank_number"] for tank in tanks], ["01", "02", "03"])
+        self.assertEqual(len(tanks[0]["deliveries"]), 2)
+
+    async def test_single_tank(self):
+        """
+        Verify that the simulator only reports the tank asked for in the command.
+        """
+
+        async with TlsSimulator(tanks=3) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                actual = tls_3xx.function_201(await tls.execute("i20102"))
+
+        self.assertEqual([tank["tank_number"] for tank in actual["tanks"]], ["02"])
+
+    async def test_errors(self):
+        """
+        Verify that unsupported and unknown commands are answered with the generic error.
+        """
+
+        async with TlsSimulator(unsupported=["21B"]) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                responses = await tls.execute_many(["i21B00", "i99900", "i20100"])
+
+        self.assertIsInstance(responses[0], ValueError)
+        self.assertIsInstance(responses[1], ValueError)
+        self.assertIsInstance(responses[2], str)
+
+        async with TlsSimulator(error_rate=1.0) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                with self.assertRaises(ValueError):
+                    await tls.execute("i20100")
+
+    async def test_chunked_replies(self):
+        """
+        Verify that replies written in small chunks arrive intact.
+        """
+
+        async with TlsSimulator(chunk_size=7, chunk_delay=0.001, seed=1) as simulator:
+            expected = simulator.respond("i20200")[7:-7].decode()
+
+            async with AsyncTlsSocket("127.0.0.1", simulator.port) as tls:
+                chunks = [chunk async for chunk in tls.stream("i20200")]
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), expected)
+
+    async def test_synchronous_socket(self):
+        """
+        Verify that TlsSocket can talk to the simulator in both computer and display format.
+        """
+
+        def execute(port: int) -> tuple:
+            tls = TlsSocket("127.0.0.1", port)
+
+            try:
+                return tls.execute("i10100", timeout=1), tls.execute("I10100", timeout=1)
+            finally:
+                tls.close()
+
+        async with TlsSimulator() as simulator:
+            computer, display = await asyncio.to_thread(execute, simulator.port)
+
+        self.assertEqual(computer[:4], date.today().strftime("%y%m"))
+        self.assertIn("I10100", display)
+        self.assertEqual(simulator.commands_received, 2)
+
+    async def test_fleet(self):
+        """
+        Verify that start_fleet() starts simulators on separate ports.
+        """
+
+        simulators = await start_fleet(5)
+
+        try:
+            self.assertEqual(len({simulator.port for simulator in simulators}), 5)
+        finally:
+            for simulator in simulators: await simulator.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,12 @@
 # test_socket.py - Tests whether or not the TlsSocket class operates as intended.
 
+import asyncio
 from datetime import date
 from os import environ
 import unittest
+from veeder_root_tls_socket_library.simulator import TlsSimulator
 from veeder_root_tls_socket_library.socket import TlsSocket
+from veeder_root_tls_socket_library.tls_3xx import function_101
 
 class test_tlsSocket(unittest.TestCase):
     def setUp(self):
@@ -235,5 +238,50 @@ class test_tlsSocket(unittest.TestCase):
 
                 self.assertEqual(actual, expected)
 
+    def test_raw(self):
+        """
+        Verify that tlsSocket.execute() returns the same data as a memoryview when raw is set.
+        """
+
+        with TlsSocket(self.ip, self.port) as tls:
+            expected = tls.execute("i10100")
+            actual = tls.execute("i10100", raw=True)
+
+            self.assertIsInstance(actual, memoryview)
+            self.assertEqual(bytes(actual).decode(), expected)
+
+    def test_execute_and_parse(self):
+        """
+        Verify that tlsSocket.execute_and_parse() returns the same result as parsing execute() by hand.
+        """
+
+        with TlsSocket(self.ip, self.port) as tls:
+            expected = function_101(tls.execute("i10100"))
+            actual = tls.execute_and_parse("I10100")
+
+        self.assertEqual(actual, expected)
+
+class test_tlsSocketBuffer(unittest.IsolatedAsyncioTestCase):
+    async def test_large_response(self):
+        """
+        Verify that responses larger than the receive buffer arrive intact, even while a raw view is held.
+        """
+
+        def execute(port: int) -> tuple:
+            with TlsSocket("127.0.0.1", port) as tls:
+                view = tls.execute("i20101", raw=True)
+                large = tls.execute("i21B00", timeout=1)
+
+                return view, large, tls.execute("i21B00", timeout=1)
+
+        async with TlsSimulator(tanks=8, deliveries=10, chunk_size=1000, seed=1) as simulator:
+            view, large, again = await asyncio.to_thread(execute, simulator.port)
+            expected = simulator.respond("i21B00")[7:-7].decode()
+
+        self.assertEqual(large, expected)
+        self.assertEqual(again, expected)
+        self.assertGreater(len(large), 4096)
+        self.assertIsInstance(view, memoryview)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,143 @@
+# test_storage.py - Tests whether or not the TlsStore class operates as intended.
+
+from datetime import datetime, timedelta
+from os import path
+from tempfile import TemporaryDirectory
+import unittest
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.storage import TlsStore
+
+class TestTlsStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = path.join(self.directory.name, "readings.db")
+        self.simulator = TlsSimulator(tanks=3, deliveries=4, seed=1)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def report(self, code: str, compact: bool = False) -> dict:
+        response = self.simulator.respond(f"i{code}00")[7:-7].decode()
+        return getattr(tls_3xx, f"function_{code}")(response, compact=compact)
+
+    def test_reports(self):
+        """
+        Verify that dict and compact reports are stored once per record and read back as they were parsed.
+        """
+
+        inventory = self.report("201")
+        deliveries = self.report("202")
+        taken = datetime(2000 + inventory["year"], inventory["month"], inventory["day"],
+                         inventory["hour"], inventory["minute"])
+
+        with TlsStore(self.path) as store:
+            self.assertEqual(store.add("site", "201", inventory), 3)
+            self.assertEqual(store.add_many([
+                ("site", "i20100", self.report("201", compact=True)),
+                ("site", "202", deliveries),
+                ("site", "21B", self.report("21B", compact=True)),
+                ("site", "111", self.report("111"))
+            ]), 3 + 12 + 12 + 3)
+
+            readings = store.query("inventory", "site", "02")
+            heights = store.query("inventory", "site", "02", fields=["height"], compact=True)
+            stored = store.query("deliveries", "site", "01")
+            alarms = store.query("alarms", "site", inventory["tanks"][0]["tank_number"])
+
+            self.assertEqual(store.connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+
+        expected = dict(inventory["tanks"][1], timestamp=taken)
+        del expected["tank_number"]
+
+        self.assertEqual(readings, [expected])
+        self.assertEqual(heights[0].height, expected["height"])
+        self.assertEqual(heights[0]._fields, ("timestamp", "height"))
+
+        # Deliveries come back oldest first, with the end as a single timestamp.
+        delivery = deliveries["tanks"][0]["deliveries"][-1]
+
+        self.assertEqual(len(stored), 4)
+        self.assertEqual(stored[0]["product_code"], deliveries["tanks"][0]["product_code"])
+        self.assertEqual(stored[0]["starting_volume"], delivery["starting_volume"])
+        self.assertEqual(stored[0]["end_timestamp"], datetime(
+            2000 + delivery["end_year"], delivery["end_month"], delivery["end_day"],
+            delivery["end_hour"], delivery["end_minute"]
+        ))
+        self.assertEqual([row["timestamp"] for row in stored], sorted(row["timestamp"] for row in stored))
+        self.assertTrue(alarms)
+
+    def test_query_range(self):
+        """
+        Verify that query() returns records from start up to, but not including, end.
+        """
+
+        start = datetime(2026, 3, 1)
+        record = self.report("201")["tanks"][2]
+
+        with TlsStore(self.path) as store:
+            for day in range(0, 10):
+                store.add_records("site", "inventory", [dict(record, height=float(day))], start + timedelta(days=day))
+
+            everything = store.query("inventory", "site", record["tank_number"], fields=["height"])
+            middle = store.query("inventory", "site", record["tank_number"],
+                                 start + timedelta(days=3), start + timedelta(days=6), ["height"])
+
+            self.assertEqual(store.query("inventory", "other", record["tank_number"]), [])
+            self.assertEqual(store.query("inventory", "site", "99"), [])
+
+            with self.assertRaises(ValueError): store.query("tanks", "site", "01")
+            with self.assertRaises(ValueError): store.query("inventory", "site", "01", fields=["depth"])
+            with self.assertRaises(ValueError): store.add("site", "203", self.report("203"))
+            with self.assertRaises(ValueError): store.add_records("site", "inventory", [record])
+
+        self.assertEqual([row["height"] for row in everything], [float(day) for day in range(0, 10)])
+        self.assertEqual([row["height"] for row in middle], [3.0, 4.0, 5.0])
+        self.assertEqual(middle[0]["timestamp"], start + timedelta(days=3))
+
+    def test_history_records(self):
+        """
+        Verify that records with their group fields in front, as HistorySync returns them, can be stored.
+        """
+
+        report = self.report("202")
+        records = [
+            {"tank_number": group["tank_number"], "product_code": group["product_code"], **delivery}
+            for group in report["tanks"] for delivery in group["deliveries"]
+        ]
+
+        with TlsStore(self.path) as store:
+            store.add("site", "202", report)
+            expected = store.query("deliveries", "site", "03")
+
+            self.assertEqual(store.add_records("other", "deliveries", records), 12)
+            self.assertEqual(store.query("deliveries", "other", "03"), expected)
+
+    def test_concurrent_reader(self):
+        """
+        Verify that a second TlsStore on the same file sees records as they are added.
+        """
+
+        with TlsStore(self.path) as writer, TlsStore(self.path) as reader:
+            writer.add("site", "201", self.report("201"))
+
+            self.assertEqual(len(reader.query("inventory", "site", "01")), 1)
+
+    def test_rollback(self):
+        """
+        Verify that a site created in a transaction that is rolled back is created again when it's next used.
+        """
+
+        inventory = self.report("201")
+
+        with TlsStore(self.path) as store:
+            with self.assertRaises(ValueError):
+                store.add_many([("new", "201", inventory), ("new", "999", inventory)])
+
+            self.assertEqual(store.add("new", "201", inventory), 3)
+
+        with TlsStore(self.path) as store:
+            self.assertEqual(len(store.query("inventory", "new", "01")), 1)
+
+if __name__ == "__main__":
+    unittest.main()
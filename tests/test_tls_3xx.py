@@ -0,0 +1,449 @@
+# test_tls_3xx.py - Used to test the functionality of the parsers in tls_3xx.py.
+
+import unittest
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+
+class test_tls_3xx(unittest.TestCase):
+    def test_function_101(self):
+        """
+        Verify that function_101() extracts the timestamp and every alarm.
+        """
+
+        actual = tls_3xx.function_101("2405261614020501")
+        expected = {
+            "year": 24, "month": 5, "day": 26, "hour": 16, "minute": 14,
+            "alarms": [{"alarm_category": 2, "alarm_type": 5, "tank_number": "01"}]
+        }
+
+        self.assertEqual(actual, expected)
+
+    def test_function_201(self):
+        """
+        Verify that function_201() decodes the floats of each tank.
+        """
+
+        tank = "011" + "0000" + "07" + "3F800000" * 6 + "C2C7FAE1"
+        actual = tls_3xx.function_201("2405261614" + tank + tank)
+
+        self.assertEqual(len(actual["tanks"]), 2)
+        self.assertEqual(actual["tanks"][0]["tank_number"], "01")
+        self.assertEqual(actual["tanks"][0]["volume"], 1.0)
+        self.assertEqual(actual["tanks"][1]["water_volume"], -99.99)
+
+    def test_function_202(self):
+        """
+        Verify that function_202() groups deliveries under each tank.
+        """
+
+        delivery = "2405011200" + "2405011230" + "0A" + "3F800000" * 10
+        actual = tls_3xx.function_202("2405261614" + "01102" + delivery * 2 + "02200")
+
+        self.assertEqual(actual["tanks"][0]["tank_number"], "01")
+        self.assertEqual(len(actual["tanks"][0]["deliveries"]), 2)
+        self.assertEqual(actual["tanks"][0]["deliveries"][0]["end_minute"], 30)
+        self.assertEqual(actual["tanks"][1]["deliveries"], [])
+
+    def test_function_202_compact(self):
+        """
+        Verify that function_202() can return deliveries as named tuples.
+        """
+
+        delivery = "2405011200" + "2405011230" + "0A" + "3F800000" * 10
+        response = "2405261614" + "01101" + delivery
+
+        actual = tls_3xx.function_202(response, compact=True)["tanks"][0]["deliveries"][0]
+        expected = tls_3xx.function_202(response)["tanks"][0]["deliveries"][0]
+
+        self.assertEqual(type(actual).__name__, "Delivery")
+        self.assertEqual(actual.ending_height, 1.0)
+        self.assertEqual(actual.to_dict(), expected)
+
+    def test_iter_function_202(self):
+        """
+        Verify that iter_function_202() yields the same deliveries when fed in chunks.
+        """
+
+        delivery = "2405011200" + "2405011230" + "0A" + "3F800000" * 10
+        response = "2405261614" + "01102" + delivery * 2 + "02101" + delivery
+
+        chunks = [response[position:position + 33] for position in range(0, len(response), 33)]
+        actual = list(tls_3xx.iter_function_202(chunks))
+
+        self.assertEqual(actual, list(tls_3xx.iter_function_202(response)))
+        self.assertEqual([delivery["tank_number"] for delivery in actual], ["01", "01", "02"])
+        self.assertEqual(actual[2]["ending_height"], 1.0)
+
+    def test_function_222(self):
+        """
+        Verify that function_222() handles bill of lading numbers of different lengths.
+        """
+
+        deliveries = (
+            "2312011030" + "06" + "BOL123" + "03" + "3F800000" * 3 +
+            "2312021030" + "00" + "03" + "40000000" * 3
+        )
+
+        actual = tls_3xx.function_222("2401011200" + "01102002" + deliveries)
+        tank = actual["tanks"]["01"]
+
+        self.assertEqual(tank[0]["bill_of_lading_number"], "BOL123")
+        self.assertEqual(tank[1]["bill_of_lading_number"], "")
+        self.assertEqual(tank[1]["gauged_tc_volume"], 2.0)
+
+    def test_function_225(self):
+        """
+        Verify that function_225() copies the tank's product and probe into each delivery.
+        """
+
+        delivery = "2312011030" + "03" + "3F800000" * 3
+        actual = tls_3xx.function_225("2401011200" + "01102002" + delivery * 2)
+
+        self.assertEqual(len(actual["tanks"]["01"]), 2)
+        self.assertEqual(actual["tanks"]["01"][0]["probe_type"], "02")
+        self.assertEqual(actual["tanks"]["01"][1]["delivery_variance"], 1.0)
+
+    def test_invalid_response(self):
+        """
+        Verify that parsers reject responses that are neither strings nor bytes.
+        """
+
+        with self.assertRaises(ValueError):
+            tls_3xx.function_201(2405261614)
+
+        with self.assertRaises(ValueError):
+            tls_3xx.function_602(None)
+
+    def test_bytes_response(self):
+        """
+        Verify that every parser returns the same result for bytes and memoryviews as for strings.
+        """
+
+        tank = "011" + "0000" + "07" + "3F800000" * 6 + "C2C7FAE1"
+        delivery = "2312011030" + "2312011130" + "07" + "3F800000" * 10
+        variance = "2312011030" + "03" + "3F800000" * 3
+
+        cases = [
+            (tls_3xx.function_101, "2405261614020501"),
+            (tls_3xx.function_201, "2405261614" + tank + tank),
+            (tls_3xx.function_202, "2405261614" + "01102" + delivery * 2 + "02200"),
+            (tls_3xx.function_225, "2401011200" + "01102002" + variance * 2),
+            (tls_3xx.function_602, "2405261614" + "01" + "REGULAR".ljust(20) + "02" + "DIESEL".ljust(20))
+        ]
+
+        for parser, response in cases:
+            expected = parser(response)
+            encoded = response.encode("utf-8")
+
+            self.assertEqual(parser(encoded), expected)
+            self.assertEqual(parser(memoryview(bytearray(encoded))), expected)
+
+        self.assertEqual(
+            tls_3xx.function_202(cases[2][1].encode("utf-8"), compact=True),
+            tls_3xx.function_202(cases[2][1], compact=True)
+        )
+
+# Responses written out by hand, field by field, from the computer format
+# layouts in Section 7 of the Serial Interface Manual 576013-635, rather than
+# from the report layouts in tls_3xx.py that the simulator shares. Floats count
+# up from 1.0 within each record, so a field read from the wrong offset stands
+# out. Responses exclude the start of header, echoed command and checksum.
+_F = ["3F800000", "40000000", "40400000", "40800000", "40A00000", "40C00000", "40E00000",
+      "41000000", "41100000", "41200000", "41300000", "41400000", "41500000"]
+
+_HEADERS = "MAIN STREET GAS".ljust(20) + "123 MAIN STREET".ljust(20) + "SPRINGFIELD".ljust(20) + "555-0100".ljust(20)
+
+_HEADER_FIELDS = {
+    "station_header_1": "MAIN STREET GAS", "station_header_2": "123 MAIN STREET",
+    "station_header_3": "SPRINGFIELD",     "station_header_4": "555-0100"
+}
+
+_NOW = {"year": 24, "month": 1, "day": 15, "hour": 10, "minute": 30}
+
+def _at(year: int, month: int, day: int, hour: int, minute: int, prefix: str = "") -> dict:
+    return {f"{prefix}year": year, f"{prefix}month": month, f"{prefix}day": day,
+            f"{prefix}hour": hour, f"{prefix}minute": minute}
+
+def _floats(names: list) -> dict:
+    return {name: float(index + 1) for index, name in enumerate(names)}
+
+_TANK_FLOATS = _floats(["volume", "tc_volume", "ullage", "height", "water", "temperature", "water_volume"])
+
+_TANK_INVENTORY = (
+    "2401151030"
+    "01" "R" "0003" "07" + "".join(_F[:7]) +
+    "02" "P" "0000" "07" + "".join(_F[:7]),
+    dict(_NOW, tanks=[
+        {"tank_number": "01", "product_code": "R", "tank_status_bits": 3, **_TANK_FLOATS},
+        {"tank_number": "02", "product_code": "P", "tank_status_bits": 0, **_TANK_FLOATS}
+    ])
+)
+
+_VARIANCE = (
+    "2401151030"
+    "01" "1" "02" "002"
+    "2401101200" "03" + "".join(_F[:3]) +
+    "2401121315" "03" + "".join(_F[:3]),
+    dict(_NOW, tanks={"01": [
+        {"product_code": "1", "probe_type": "02", **_at(24, 1, 10, 12, 0),
+         **_floats(["ticket_volume", "gauged_volume", "delivery_variance"])},
+        {"product_code": "1", "probe_type": "02", **_at(24, 1, 12, 13, 15),
+         **_floats(["ticket_volume", "gauged_volume", "delivery_variance"])}
+    ]})
+)
+
+# The 21B response is the start of a response from a real TLS-350, cut down
+# to its first delivery (the delivery count was 33).
+_FIXTURES = {
+    # The 101 response is the one shown in the README.
+    "101": ("2312301342020402", dict(
+        _at(23, 12, 30, 13, 42), alarms=[{"alarm_category": 2, "alarm_type": 4, "tank_number": "02"}]
+    )),
+    "102": (
+        "2401151030" "02"
+        "01" "0A" + _F[9] + _F[12] +
+        "09" "2C" + _F[0] + _F[1],
+        dict(_NOW, slots=[
+            {"slot_number": 1, "type_of_module": "0A", "power_on_reset": 10.0, "current_io_reading": 13.0},
+            {"slot_number": 9, "type_of_module": "2C", "power_on_reset": 1.0,  "current_io_reading": 2.0}
+        ])
+    ),
+    "111": (
+        "2401151030"
+        "02" "00" "05" "01" "02" "2401141200"
+        "03" "04" "03" "07" "01" "2401131105",
+        dict(_NOW, alarms=[
+            {"alarm_category": 2, "sensor_category": 0, "alarm_type": 5, "tank_number": "01",
+             "alarm_state": 2, **_at(24, 1, 14, 12, 0)},
+            {"alarm_category": 3, "sensor_category": 4, "alarm_type": 3, "tank_number": "07",
+             "alarm_state": 1, **_at(24, 1, 13, 11, 5)}
+        ])
+    ),
+    "113": (
+        "2401151030" + _HEADERS +
+        "02" "00" "05" "01" "2401141200",
+        dict(_NOW, **_HEADER_FIELDS, alarms=[
+            {"alarm_category": 2, "sensor_category": 0, "alarm_type": 5, "tank_number": "01",
+             **_at(24, 1, 14, 12, 0)}
+        ])
+    ),
+    "114": (
+        "2401151030" + _HEADERS +
+        "02" "00" "05" "01" "01" "2401141200",
+        dict(_NOW, **_HEADER_FIELDS, alarms=[
+            {"alarm_category": 2, "sensor_category": 0, "alarm_type": 5, "tank_number": "01",
+             "alarm_state": 1, **_at(24, 1, 14, 12, 0)}
+        ])
+    ),
+    "116": (
+        "2401151030" + _HEADERS + "01"
+        "2401021415" "TECH000042" "00451",
+        dict(_NOW, **_HEADER_FIELDS, number_of_records=1, reports=[
+            {**_at(24, 1, 2, 14, 15), "service_id": "TECH000042", "service_code": "00451"}
+        ])
+    ),
+    "119": (
+        "2401151030" "00002"
+        "2401021415" "0B" "001234"
+        "2401021530" "04" "000042",
+        dict(_NOW, number_of_records=2, records=[
+            {**_at(24, 1, 2, 14, 15), "record_type": "0B", "data_field": "001234"},
+            {**_at(24, 1, 2, 15, 30), "record_type": "04", "data_field": "000042"}
+        ])
+    ),
+    "11A": (
+        "2401151030" "01"
+        "2401021415" "TECH42" "0451",
+        dict(_NOW, number_of_records=1, reports=[
+            {**_at(24, 1, 2, 14, 15), "service_id": "TECH42", "service_code": "0451"}
+        ])
+    ),
+    "11B": (
+        "2401151030" "1" "2401150800" "02"
+        "2401010800" "2401011700"
+        "2401080800" "2401081630",
+        dict(_NOW, service_notice_session=1, **_at(24, 1, 15, 8, 0, "start_"), number_of_records=2, reports=[
+            {**_at(24, 1, 1, 8, 0, "start_"), **_at(24, 1, 1, 17, 0, "end_")},
+            {**_at(24, 1, 8, 8, 0, "start_"), **_at(24, 1, 8, 16, 30, "end_")}
+        ])
+    ),
+    "201": _TANK_INVENTORY,
+    "202": (
+        "2401151030"
+        "01" "R" "01"
+        "2401100800" "2401100845" "0A" + "".join(_F[:10]) +
+        "02" "P" "00",
+        dict(_NOW, tanks=[
+            {"tank_number": "01", "product_code": "R", "deliveries": [{
+                **_at(24, 1, 10, 8, 0, "start_"), **_at(24, 1, 10, 8, 45, "end_"), **_floats([
+                    "starting_volume", "starting_tc_volume", "starting_water", "starting_temp",
+                    "ending_volume", "ending_tc_volume", "ending_water", "ending_temp",
+                    "starting_height", "ending_height"
+                ])
+            }]},
+            {"tank_number": "02", "product_code": "P", "deliveries": []}
+        ])
+    ),
+    "203": (
+        "2401151030"
+        "01" "R" "2401150100" "04" "05" + "".join(_F[:5]),
+        dict(_NOW, tanks=[
+            {"tank_number": "01", "product_code": "R", **_at(24, 1, 15, 1, 0, "start_"), "test_duration": 4,
+             **_floats(["starting_temp", "ending_temp", "starting_volume", "ending_rate", "hourly_changes"])}
+        ])
+    ),
+    "204": (
+        "2401151030"
+        "01" "R" "02" "0D" + "".join(_F[:13]),
+        dict(_NOW, inventory=[
+            {"tank_number": "01", "product_code": "R", "shift_number": "02", **_floats([
+                "start_volume", "start_ullage", "start_tc_volume", "start_height", "start_water",
+                "start_temperature", "end_volume", "end_ullage", "end_tc_volume", "end_height",
+                "end_water", "end_temperature", "total_value"
+            ])}
+        ])
+    ),
+    "205": (
+        "2401151030"
+        "01" "01" "04"
+        "02" "00",
+        dict(_NOW, alarms=[
+            {"tank_number": "01", "number_of_alarms": 1, "alarm_type": "04"},
+            {"tank_number": "02", "number_of_alarms": 0}
+        ])
+    ),
+    "206": (
+        "2401151030"
+        "01" "02"
+        "2401100800" "0002"
+        "2401120930" "001D"
+        "02" "00",
+        dict(_NOW, tanks={
+            "01": [
+                {**_at(24, 1, 10, 8, 0), "alarm_type": "0002"},
+                {**_at(24, 1, 12, 9, 30), "alarm_type": "001D"}
+            ],
+            "02": []
+        })
+    ),
+    "207": (
+        "2401151030"
+        "01" "01"
+        "01" "03" "00" "2401140200" + "".join(_F[:3]),
+        dict(_NOW, tanks={"01": [
+            {"report_type": "01", "leak_history_number": "03", "test_type": "00", **_at(24, 1, 14, 2, 0),
+             **_floats(["duration", "volume", "volume_percentage"])}
+        ]})
+    ),
+    "208": (
+        "2401151030"
+        "01" "01"
+        "02" "01" "2401140200" "01" + "".join(_F[:3]),
+        dict(_NOW, tanks={"01": [
+            {"test_result_type": "02", "test_manifold_status": "01", **_at(24, 1, 14, 2, 0), "test_result": "01",
+             **_floats(["test_rate", "duration", "volume"])}
+        ]})
+    ),
+    "21A": _TANK_INVENTORY,
+    "21B": (
+        "2502090945" "0101"
+        "2303211143" "2303211149" "15"
+        "42CBE1C1" "43D81D45" "43A524D5" "43A63026" "410ACA2A" "42674A0B" "42672304"
+        "42675A60" "4267E23C" "42697538" "42701A23" "41E68154" "4251C8A6" "4251A604"
+        "42563EB5" "425FFF51" "4265B0C0" "426FCB29" "00000000" "426772DB" "42525F83",
+        dict(_at(25, 2, 9, 9, 45), tanks={"01": [{
+            **_at(23, 3, 21, 11, 43, "start_"), **_at(23, 3, 21, 11, 49, "end_"),
+            "start_volume": 101.941, "end_volume": 432.229, "adjusted_delivery_volume": 330.288,
+            "adjusted_temperature_compensated_delivery_volume": 332.376, "start_fuel_height": 8.674,
+            "start_fuel_temperature_1": 57.822, "start_fuel_temperature_2": 57.784,
+            "start_fuel_temperature_3": 57.838, "start_fuel_temperature_4": 57.971,
+            "start_fuel_temperature_5": 58.364, "start_fuel_temperature_6": 60.026,
+            "end_fuel_height": 28.813, "end_fuel_temperature_1": 52.446, "end_fuel_temperature_2": 52.412,
+            "end_fuel_temperature_3": 53.561, "end_fuel_temperature_4": 55.999,
+            "end_fuel_temperature_5": 57.423, "end_fuel_temperature_6": 59.948, "total_dispensed": 0.0,
+            "start_fuel_temperature_average": 57.862, "end_fuel_temperature_average": 52.593
+        }]})
+    ),
+    "221": (
+        "2401151030"
+        "01" "R" "02" "001"
+        "2401101200" "06" + "".join(_F[:6]),
+        dict(_NOW, tanks={"01": [
+            {"product_code": "R", "probe_type": "02", **_at(24, 1, 10, 12, 0), **_floats([
+                "ticket_volume", "gauged_volume", "delivery_variance", "start_fuel_temperature",
+                "end_fuel_temperature", "estimated_delivery_temperature"
+            ])}
+        ]})
+    ),
+    "222": (
+        "2401151030"
+        "01" "1" "02" "002"
+        "2401101200" "06" "BOL123" "03" + "".join(_F[:3]) +
+        "2401121315" "00" "03" + "".join(_F[:3]),
+        dict(_NOW, tanks={"01": [
+            {"product_code": "1", "probe_type": "02", **_at(24, 1, 10, 12, 0), "bill_of_lading_number": "BOL123",
+             **_floats(["ticket_volume", "gauged_volume", "gauged_tc_volume"])},
+            {"product_code": "1", "probe_type": "02", **_at(24, 1, 12, 13, 15), "bill_of_lading_number": "",
+             **_floats(["ticket_volume", "gauged_volume", "gauged_tc_volume"])}
+        ]})
+    ),
+    "225": _VARIANCE,
+    "226": _VARIANCE,
+    "227": _VARIANCE,
+    "251": (
+        "2401151030"
+        "01" "01"
+        "02" "09",
+        dict(_NOW, reports=[
+            {"tank_number": "01", "csld_results": "01"},
+            {"tank_number": "02", "csld_results": "09"}
+        ])
+    ),
+    "602": (
+        "2401151030"
+        "01" + "REGULAR UNLEADED".ljust(20) +
+        "02" + "DIESEL".ljust(20),
+        dict(_NOW, labels={1: "REGULAR UNLEADED", 2: "DIESEL"})
+    )
+}
+
+# Functions 112 and 115 share their layouts with 111 and 113.
+_FIXTURES["112"] = _FIXTURES["111"]
+_FIXTURES["115"] = _FIXTURES["113"]
+
+def _rounded(value):
+    if isinstance(value, dict):  return {key: _rounded(item) for key, item in value.items()}
+    if isinstance(value, list):  return [_rounded(item) for item in value]
+    if isinstance(value, float): return round(value, 3)
+
+    return value
+
+class TestManualFixtures(unittest.TestCase):
+    def test_fixtures(self):
+        """
+        Verify that every parser reads the responses written out from the manual as the manual describes them.
+        """
+
+        for code, (response, expected) in _FIXTURES.items():
+            with self.subTest(code=code):
+                self.assertEqual(_rounded(getattr(tls_3xx, f"function_{code}")(response)), expected)
+
+    def test_simulated_functions(self):
+        """
+        Verify that every function the simulator answers has a fixture, and that it answers in the same shape.
+        """
+
+        simulator = TlsSimulator(tanks=2, deliveries=2, seed=1)
+        codes = {name[9:] for name in dir(tls_3xx) if name.startswith("function_")}
+
+        self.assertEqual(codes, set(_FIXTURES))
+
+        for code in sorted(codes):
+            with self.subTest(code=code):
+                response = simulator.respond(f"i{code}00")[7:-7].decode()
+                actual = getattr(tls_3xx, f"function_{code}")(response)
+
+                self.assertEqual(set(actual), set(_FIXTURES[code][1]))
+
+if __name__ == "__main__":
+    unittest.main()
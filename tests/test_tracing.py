@@ -0,0 +1,60 @@
+# test_tracing.py - Tests whether or not the TracingObserver class operates as intended.
+
+import unittest
+
+try:
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+except ImportError:
+    TracerProvider = None
+
+from veeder_root_tls_socket_library import tls_3xx
+from veeder_root_tls_socket_library.async_socket import AsyncTlsSocket
+from veeder_root_tls_socket_library.simulator import TlsSimulator
+from veeder_root_tls_socket_library.tracing import TracingObserver
+
+@unittest.skipIf(TracerProvider is None, "The OpenTelemetry SDK is not installed.")
+class TestTracingObserver(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.exporter = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(self.exporter))
+
+        self.observer = TracingObserver(provider.get_tracer("test"))
+
+    async def test_spans(self):
+        """
+        Verify that connecting, executing and parsing are recorded as nested spans.
+        """
+
+        async with TlsSimulator(unsupported=["21B"]) as simulator:
+            async with AsyncTlsSocket("127.0.0.1", simulator.port, observer=self.observer) as tls:
+                actual = self.observer.parse(tls_3xx.function_201, await tls.execute("i20100"))
+
+                with self.assertRaises(ValueError):
+                    await tls.execute("i21B00")
+
+        spans = {}
+        for span in self.exporter.get_finished_spans(): spans.setdefault(span.name, []).append(span)
+
+        self.assertIn("tanks", actual)
+        self.assertEqual(len(spans["tls.connect"]), 1)
+        self.assertEqual(len(spans["tls.execute"]), 2)
+
+        execute, failed = spans["tls.execute"]
+        checksum = spans["tls.verify_checksum"][0]
+        parse = spans["tls.parse"][0]
+
+        self.assertEqual(execute.attributes["tls.function_code"], "201")
+        self.assertEqual(execute.attributes["server.port"], simulator.port)
+        self.assertGreater(execute.attributes["tls.bytes_received"], 0)
+        self.assertGreaterEqual(execute.attributes["tls.retries_used"], 1)
+        self.assertEqual(checksum.parent.span_id, execute.context.span_id)
+        self.assertEqual(parse.parent.span_id, execute.context.span_id)
+        self.assertEqual(parse.attributes["tls.parser"], "function_201")
+        self.assertLessEqual(execute.start_time, checksum.start_time)
+        self.assertFalse(failed.status.is_ok)
+
+if __name__ == "__main__":
+    unittest.main()